@@ -0,0 +1,160 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import menu_cache
+from assets import asset_url
+from compression import choose_encoding
+from database import get_async_db
+from models import Category, Product
+from tenants import TenantConfig, get_tenant
+
+router = APIRouter(prefix="/api", tags=["api"])
+
+# Campos públicos de produto -> coluna. "category" vem do join com categories.
+PRODUCT_FIELDS = {
+    "id": Product.id,
+    "name": Product.name,
+    "description": Product.description,
+    "price": Product.price,
+    "category_id": Product.category_id,
+    "category": Category.name,
+    "image_url": Product.image_url,
+    "is_available": Product.is_available,
+    "sub_category": Product.sub_category,
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Maior inteiro que o banco aceita (INTEGER do SQLite, BIGINT do Postgres)
+MAX_DB_INT = 2**63 - 1
+
+
+class JSONBytes(Response):
+    media_type = "application/json"
+
+
+def dump_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_id(value: str) -> Optional[int]:
+    """Id vindo de um parâmetro texto ("?cat=12"); None se não for um inteiro válido no banco.
+
+    str.isdigit() aceita "²" e outros dígitos Unicode que int() recusa.
+    """
+    if not (value.isascii() and value.isdigit()):
+        return None
+    number = int(value)
+    return number if number <= MAX_DB_INT else None
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(PRODUCT_FIELDS)
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in names if f not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # Sem repetição e na ordem de PRODUCT_FIELDS: "name,id" e "id,id,name" viram a
+    # mesma chave do cache do /api/menu, que não cresce com variações do pedido
+    return [f for f in PRODUCT_FIELDS if f in names]
+
+
+async def product_rows(db: AsyncSession, tenant_id: int, names: List[str], query_filters=(), after_id: Optional[int] = None, limit: Optional[int] = None):
+    """Consulta só as colunas pedidas (dos produtos do restaurante) e devolve dicts prontos para JSON.
+
+    Evita instanciar objetos ORM: cada linha é uma tupla de colunas.
+    """
+    # id e category_id são sempre lidos (paginação e agrupamento), mesmo fora de "fields"
+    columns = [PRODUCT_FIELDS[n] for n in names]
+    query = (
+        select(Product.id, Product.category_id, *columns)
+        .join(Category, Product.category_id == Category.id, isouter=True)
+        .where(Product.tenant_id == tenant_id)
+    )
+    for f in query_filters:
+        query = query.where(f)
+    if after_id is not None:
+        query = query.where(Product.id > after_id)
+    query = query.order_by(Product.id)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    rows = [(row[0], row[1], dict(zip(names, row[2:]))) for row in result]
+    if "image_url" in names:
+        # Mesmas URLs com fingerprint da página (cacheáveis por 1 ano)
+        for _, _, item in rows:
+            if item["image_url"]:
+                item["image_url"] = asset_url(item["image_url"])
+    return rows
+
+
+async def cached_json(request: Request, tenant: TenantConfig, key: str, build) -> Response:
+    # Mesmo cache versionado da página HTML: sem consultas enquanto o cardápio não muda
+    page, stamp = menu_cache.get_page(key, tenant.id)
+    if page is None:
+        page = menu_cache.store_page(key, dump_json(await build()), stamp, tenant.id)
+    body, headers = page.encoded(choose_encoding(request.headers.get("accept-encoding")))
+    if page.is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+    return JSONBytes(body, headers=headers)
+
+
+@router.get("/categories")
+async def list_categories(request: Request, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    async def build():
+        result = await db.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant.id).order_by(Category.id))
+        return [{"id": cid, "name": name} for cid, name in result]
+    return await cached_json(request, tenant, "api:categories", build)
+
+
+@router.get("/menu")
+async def get_menu(request: Request, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    names = parse_fields(fields)
+
+    async def build():
+        result = await db.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant.id).order_by(Category.id))
+        categories = [{"id": cid, "name": name, "products": []} for cid, name in result]
+        by_id: Dict[int, dict] = {c["id"]: c for c in categories}
+        for _, category_id, item in await product_rows(db, tenant.id, names):
+            category = by_id.get(category_id)
+            if category is not None:
+                category["products"].append(item)
+        return {"categories": categories}
+
+    return await cached_json(request, tenant, f"api:menu:{','.join(names)}", build)
+
+
+@router.get("/products")
+async def list_products(
+    category: Optional[str] = None,
+    sub_category: Optional[str] = None,
+    available: Optional[bool] = None,
+    cursor: Optional[int] = Query(default=None, ge=0, le=MAX_DB_INT),
+    limit: int = DEFAULT_PAGE_SIZE,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    names = parse_fields(fields)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    query_filters = []
+    if category is not None:
+        # Aceita id ou nome da categoria
+        category_id = parse_id(category)
+        query_filters.append(Product.category_id == category_id if category_id is not None else Category.name == category)
+    if sub_category is not None:
+        query_filters.append(Product.sub_category == sub_category)
+    if available is not None:
+        query_filters.append(Product.is_available == available)
+
+    # Busca um item a mais para saber se existe próxima página
+    rows = await product_rows(db, tenant.id, names, query_filters, after_id=cursor, limit=limit + 1)
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    items = [item for _, _, item in rows[:limit]]
+    return JSONBytes(dump_json({"items": items, "next_cursor": next_cursor}))
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from compression import PrecompressedStaticFiles
+
+# Único diretório servido em /static (antes era a raiz do projeto, com o banco junto)
+STATIC_DIR = os.getenv("STATIC_DIR", "static")
+STATIC_PREFIX = "/static/"
+
+# URL com o hash do conteúdo nunca muda de conteúdo: o navegador/CDN guarda por 1 ano
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Sem hash (ou hash antigo): revalida a cada uso com ETag/Last-Modified
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+HASH_LENGTH = 10
+FINGERPRINT_RE = re.compile(r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./\\]+)$" % HASH_LENGTH)
+
+
+def static_path(url: str) -> Optional[str]:
+    """/static/images/x.png -> images/x.png (None para URLs externas ou fora de STATIC_DIR)."""
+    if not url or not url.startswith(STATIC_PREFIX):
+        return None
+    path = os.path.normpath(url[len(STATIC_PREFIX):])
+    if path.startswith("..") or os.path.isabs(path):
+        return None
+    return path
+
+
+def fingerprint(path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+class AssetManifest:
+    """Caminho lógico -> hash do conteúdo dos arquivos de STATIC_DIR.
+
+    O hash é recalculado só quando mtime/tamanho do arquivo mudam, então trocar
+    uma imagem no lugar gera uma URL nova na próxima renderização.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # caminho -> ((mtime_ns, tamanho), hash)
+        self._entries: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+    def digest(self, path: str) -> Optional[str]:
+        try:
+            st = os.stat(os.path.join(self.directory, path))
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        h = hashlib.sha256()
+        with open(os.path.join(self.directory, path), "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(chunk)
+        digest = h.hexdigest()[:HASH_LENGTH]
+        with self._lock:
+            self._entries[path] = (key, digest)
+        return digest
+
+    def url(self, url: str) -> str:
+        """URL com fingerprint para um arquivo de /static; outros URLs voltam como estão."""
+        path = static_path(url)
+        if path is None:
+            return url
+        digest = self.digest(path)
+        if digest is None:
+            return url
+        return STATIC_PREFIX + fingerprint(path, digest).replace(os.sep, "/")
+
+
+assets = AssetManifest(STATIC_DIR)
+
+
+def asset_url(url: str) -> str:
+    return assets.url(url)
+
+
+class AssetStaticFiles(PrecompressedStaticFiles):
+    """Serve STATIC_DIR entendendo nomes com fingerprint (foto.<hash>.png -> foto.png).
+
+    Só responde como imutável quando o hash pedido é o do conteúdo atual; um
+    hash antigo (página renderizada antes da troca do arquivo) recebe o arquivo
+    novo com revalidação, nunca conteúdo diferente sob uma URL "eterna".
+    """
+
+    def __init__(self, *args, manifest: AssetManifest = assets, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope):
+        match = FINGERPRINT_RE.match(path)
+        immutable = False
+        # Um arquivo que existe com esse nome tem prioridade sobre a interpretação como hash
+        if match is not None and not os.path.isfile(os.path.join(self.directory, path)):
+            logical = match.group("stem") + match.group("ext")
+            response = await super().get_response(logical, scope)
+            immutable = match.group("hash") == self.manifest.digest(logical)
+        else:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return response
@@ -0,0 +1,69 @@
+import os
+import random
+import sys
+import tempfile
+
+# Os benchmarks rodam a partir da raiz do projeto ou de benchmarks/
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+CATEGORIES = ["Espetinho", "Bebidas", "Acompanhamentos", "Drinks"]
+SUB_CATEGORIES = ["Cervejas", "Refrigerantes", "Águas", "Outros"]
+
+
+def use_temp_database(prefix="bench"):
+    """Aponta DATABASE_URL para um SQLite temporário.
+
+    Precisa ser chamado antes de importar database/main, que leem a URL no import.
+    """
+    fd, path = tempfile.mkstemp(prefix=f"{prefix}-", suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("MENU_VERSION_FILE", path + ".version")
+    return path
+
+
+def seed_catalog(n_products, seed=42, engine=None):
+    """Cria as tabelas e insere um cardápio sintético com n_products produtos.
+
+    Sem engine usa o de database.py (DATABASE_URL). Apaga as tabelas existentes.
+    """
+    from sqlalchemy import insert
+
+    from models import Base, Category, Product
+    from tenants import ensure_default_tenant
+
+    if engine is None:
+        from database import engine
+
+    rng = random.Random(seed)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Tudo no restaurante padrão (o de uma instalação com um só cliente)
+        ensure_default_tenant(conn)
+        conn.execute(insert(Category), [{"id": i + 1, "name": name} for i, name in enumerate(CATEGORIES)])
+        rows = []
+        for i in range(n_products):
+            category_id = rng.randint(1, len(CATEGORIES))
+            rows.append({
+                "id": i + 1,
+                "name": f"Produto {i + 1}",
+                "description": "Descrição de teste com um tamanho parecido com o real",
+                "price": round(rng.uniform(4, 60), 2),
+                "category_id": category_id,
+                # ~1/3 sem foto, ~10% esgotado, sub-categorias só em Bebidas
+                "image_url": f"/static/images/produto-{i + 1}.webp" if rng.random() > 0.33 else None,
+                "is_available": rng.random() > 0.1,
+                "sub_category": rng.choice(SUB_CATEGORIES) if category_id == 2 else None,
+            })
+        conn.execute(insert(Product), rows)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
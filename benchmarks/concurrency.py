@@ -0,0 +1,117 @@
+"""Vazão de rotas com sessão síncrona x assíncrona sob requisições concorrentes.
+
+Simula a latência de rede de um Postgres remoto com uma função SQL que dorme
+RTT_MS dentro do driver. Com a sessão síncrona dentro de `async def` (padrão
+antigo do main.py) essa espera bloqueia o event loop e as requisições são
+atendidas uma por vez; com a sessão assíncrona elas se sobrepõem.
+
+A concorrência padrão fica abaixo do tamanho do pool (5 + 10 de overflow):
+acima disso a rota síncrona trava o event loop esperando uma conexão que só
+é devolvida pelo próprio event loop, até estourar o pool_timeout (30 s).
+
+Uso: python benchmarks/concurrency.py [--rtt-ms 5] [--requests 300] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from common import percentile, seed_catalog, use_temp_database
+
+
+def register_rtt(engine, rtt_ms):
+    from sqlalchemy import event
+
+    def sleep(_):
+        time.sleep(rtt_ms / 1000)
+        return 1
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        dbapi_connection.create_function("rtt_sleep", 1, sleep)
+
+
+def build_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import select, text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from database import get_async_db, get_db
+    from models import Product
+
+    app = FastAPI()
+    round_trip = text("SELECT rtt_sleep(0)")
+    query = select(Product.id, Product.name, Product.price).limit(20)
+
+    @app.get("/sync")
+    async def sync_route(db: Session = Depends(get_db)):
+        db.execute(round_trip)
+        return [tuple(r) for r in db.execute(query)]
+
+    @app.get("/async")
+    async def async_route(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(round_trip)
+        return [tuple(r) for r in await db.execute(query)]
+
+    return app
+
+
+async def run(app, path, total, concurrency):
+    import httpx
+
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "route": path,
+        "requests": total,
+        "rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rtt-ms", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    db_path = use_temp_database("concurrency")
+    try:
+        seed_catalog(500)
+        from database import async_engine, engine
+
+        # Conexões abertas durante o seed não têm a função registrada
+        engine.dispose()
+        register_rtt(engine, args.rtt_ms)
+        register_rtt(async_engine.sync_engine, args.rtt_ms)
+        app = build_app()
+
+        print(f"RTT simulado: {args.rtt_ms} ms | {args.requests} requisições | concorrência {args.concurrency}")
+        for path in ("/sync", "/async"):
+            result = asyncio.run(run(app, path, args.requests, args.concurrency))
+            print(f"{result['route']:8} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
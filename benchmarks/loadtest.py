@@ -0,0 +1,374 @@
+"""Teste de carga de um pico de jantar contra o main:app de verdade (uvicorn + workers).
+
+Cenário:
+- centenas de celulares chegam ao longo de --ramp-up segundos: a maioria abre
+  "/", parte chega pelo QR code da mesa ("/?cat=<id>"); baixam o JS e as
+  primeiras fotos (o resto é lazy e vem conforme a rolagem) e abrem o SSE
+- cada celular, entre pausas de leitura (--think, exponencial), troca de aba
+  (no link direto isso carrega "/?cat=<outra>"; no cardápio completo é só no
+  navegador e rola mais fotos) ou recarrega a página com If-None-Match
+- alguns funcionários alternam a disponibilidade de produtos
+  (POST /admin/toggle/{id}), invalidando o cache de página de todos os workers
+
+Relata por rota: requisições, vazão, p50/p95/p99 e taxa de erro (status >= 400
+ou falha de conexão), mais a espera no pool de conexões vista pelo /metrics.
+
+Bancos (--databases, um ou mais, rodados em sequência):
+- "sqlite": banco temporário semeado com --products produtos
+- uma URL postgresql://...: usa os dados existentes; com --seed APAGA as
+  tabelas e semeia --products produtos
+
+O gerador de carga roda na mesma máquina e disputa CPU com o servidor: para
+números de produção use --url contra um servidor já rodando em outra máquina.
+
+Uso: python benchmarks/loadtest.py [--databases sqlite postgresql://localhost/cardapio_load] [--seed]
+     [--workers 2] [--phones 200] [--staff 3] [--duration 60] [--env DB_POOL_PROFILE=queue ...]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT, percentile, seed_catalog
+
+# Fotos que um celular baixa ao abrir a página (acima da dobra) e a cada rolagem
+FIRST_IMAGES = 8
+SCROLL_IMAGES = 4
+# Fração dos celulares que chega pelo QR code com ?cat=
+DEEP_LINK_SHARE = 0.2
+# Ações de um celular entre as pausas: (peso, nome)
+PHONE_ACTIONS = [(0.6, "tab"), (0.25, "scroll"), (0.15, "reload")]
+
+STATIC_URL = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+
+class Stats:
+    """Latências e erros por rota (rotas agrupadas como no /metrics)."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, seconds, ok):
+        self.latencies.setdefault(route, [])
+        self.errors.setdefault(route, 0)
+        if ok:
+            self.latencies[route].append(seconds)
+        else:
+            self.errors[route] += 1
+
+    def report(self, elapsed):
+        rows = []
+        for route in sorted(self.latencies):
+            samples = self.latencies[route]
+            total = len(samples) + self.errors[route]
+            rows.append({
+                "route": route,
+                "requests": total,
+                "per_s": total / elapsed,
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "error_rate": self.errors[route] / total if total else 0.0,
+            })
+        return rows
+
+
+async def request(client, stats, route, method, path, **kwargs):
+    """Faz a requisição lendo o corpo inteiro (sem descomprimir) e registra em stats."""
+    import httpx
+
+    start = time.perf_counter()
+    try:
+        async with client.stream(method, path, **kwargs) as response:
+            async for _ in response.aiter_raw():
+                pass
+    except httpx.HTTPError:
+        stats.record(route, time.perf_counter() - start, False)
+        return None
+    stats.record(route, time.perf_counter() - start, response.status_code < 400)
+    return response
+
+
+async def load_page(client, stats, path, etag=None):
+    """GET da página; devolve (ETag, URLs estáticas) do HTML recebido."""
+    import httpx
+
+    route = "GET /?cat" if "?cat=" in path else "GET /"
+    headers = {"If-None-Match": etag} if etag else None
+    start = time.perf_counter()
+    try:
+        response = await client.get(path, headers=headers)
+    except httpx.HTTPError:
+        stats.record(route, time.perf_counter() - start, False)
+        return etag, []
+    stats.record(route, time.perf_counter() - start, response.status_code < 400)
+    if response.status_code != 200:
+        return etag, []
+    return response.headers.get("etag"), list(dict.fromkeys(STATIC_URL.findall(response.text)))
+
+
+async def fetch_static(client, stats, urls):
+    for url in urls:
+        route = "GET /static/images" if url.startswith("/static/images/") else "GET /static"
+        await request(client, stats, route, "GET", url)
+
+
+async def listen_events(client, stats, stop):
+    """Mantém o SSE aberto como a página faz; mede só até o cabeçalho da resposta."""
+    import httpx
+
+    start = time.perf_counter()
+    try:
+        async with client.stream("GET", "/events/menu", timeout=httpx.Timeout(30, read=None)) as response:
+            stats.record("GET /events/menu", time.perf_counter() - start, response.status_code == 200)
+            async for _ in response.aiter_raw():
+                if time.monotonic() >= stop:
+                    break
+    except httpx.HTTPError:
+        stats.record("GET /events/menu", time.perf_counter() - start, False)
+
+
+async def pause(seconds, stop):
+    # Uma pausa longa sorteada perto do fim não estica a duração do teste
+    await asyncio.sleep(max(0.0, min(seconds, stop - time.monotonic())))
+
+
+async def phone(client, stats, rng, categories, stop, args):
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+    if time.monotonic() >= stop:
+        return
+    deep_link = categories and rng.random() < DEEP_LINK_SHARE
+    path = f"/?cat={rng.choice(categories)}" if deep_link else "/"
+    etag, urls = await load_page(client, stats, path)
+    scripts = [u for u in urls if not u.startswith("/static/images/")]
+    images = [u for u in urls if u.startswith("/static/images/")]
+    await fetch_static(client, stats, scripts + images[:FIRST_IMAGES])
+    seen = FIRST_IMAGES
+
+    sse = asyncio.create_task(listen_events(client, stats, stop)) if args.sse else None
+    try:
+        while True:
+            await pause(rng.expovariate(1 / args.think), stop)
+            if time.monotonic() >= stop:
+                break
+            action = rng.choices([name for _, name in PHONE_ACTIONS], [w for w, _ in PHONE_ACTIONS])[0]
+            if action == "tab" and deep_link:
+                # Fora da fatia carregada a aba abre a URL dela
+                path = f"/?cat={rng.choice(categories)}"
+                etag, urls = await load_page(client, stats, path)
+                images = [u for u in urls if u.startswith("/static/images/")]
+                await fetch_static(client, stats, images[:FIRST_IMAGES])
+                seen = FIRST_IMAGES
+            elif action in ("tab", "scroll"):
+                await fetch_static(client, stats, images[seen:seen + SCROLL_IMAGES])
+                seen += SCROLL_IMAGES
+            else:
+                new_etag, new_urls = await load_page(client, stats, path, etag)
+                if new_urls:
+                    etag, images = new_etag, [u for u in new_urls if u.startswith("/static/images/")]
+    finally:
+        if sse is not None:
+            sse.cancel()
+
+
+async def staff(client, stats, rng, product_ids, stop, args):
+    while True:
+        await pause(rng.expovariate(1 / args.staff_interval), stop)
+        if time.monotonic() >= stop:
+            break
+        await request(client, stats, "POST /admin/toggle", "POST", f"/admin/toggle/{rng.choice(product_ids)}")
+
+
+async def wait_ready(client, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/categories")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.3)
+    raise RuntimeError("servidor não subiu")
+
+
+async def scrape_pool(client):
+    """Espera no pool somada de todos os workers (precisa de METRICS_DIR no servidor)."""
+    text = (await client.get("/metrics")).text
+    totals = {}
+    for line in text.splitlines():
+        match = re.match(r'(db_pool_wait_seconds_sum|db_pool_wait_seconds_count|db_pool_timeouts_total|process_workers)(?:\{[^}]*\})? (\S+)', line)
+        if match:
+            totals[match.group(1)] = totals.get(match.group(1), 0) + float(match.group(2))
+    count = totals.get("db_pool_wait_seconds_count", 0)
+    return {
+        "workers": int(totals.get("process_workers", 0)),
+        "pool_checkouts": int(count),
+        "pool_wait_avg_ms": totals.get("db_pool_wait_seconds_sum", 0) / count * 1000 if count else 0.0,
+        "pool_timeouts": int(totals.get("db_pool_timeouts_total", 0)),
+    }
+
+
+async def run(base_url, args):
+    import httpx
+
+    rng = random.Random(args.seed_random)
+    limits = httpx.Limits(max_connections=args.phones * (2 if args.sse else 1) + args.staff + 4)
+    headers = {"Accept-Encoding": "gzip, deflate, br", "User-Agent": "loadtest"}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits, headers=headers) as client:
+        await wait_ready(client)
+        categories = [str(c["id"]) for c in (await client.get("/api/categories")).json()]
+        product_ids = [p["id"] for p in (await client.get("/api/products", params={"limit": 200, "fields": "id"})).json()["items"]]
+        if not product_ids:
+            raise RuntimeError("banco sem produtos (use --seed)")
+
+        stats = Stats()
+        start = time.monotonic()
+        stop = start + args.duration
+        await asyncio.gather(
+            *(phone(client, stats, random.Random(rng.random()), categories, stop, args) for _ in range(args.phones)),
+            *(staff(client, stats, random.Random(rng.random()), product_ids, stop, args) for _ in range(args.staff)),
+        )
+        elapsed = time.monotonic() - start
+        server = await scrape_pool(client)
+    return stats.report(elapsed), server
+
+
+def use_real_images(engine):
+    """As fotos do seed não existem: aponta os produtos com foto para os arquivos de static/images."""
+    from sqlalchemy import select, update
+    from sqlalchemy.orm import Session
+
+    from assets import STATIC_DIR
+    from models import Product
+
+    # O servidor roda em ROOT: STATIC_DIR relativo é relativo a ele
+    image_dir = os.path.join(ROOT, STATIC_DIR, "images")
+    files = sorted(f for f in os.listdir(image_dir) if os.path.isfile(os.path.join(image_dir, f)))
+    with Session(engine) as db:
+        ids = db.execute(select(Product.id).where(Product.image_url.isnot(None)).order_by(Product.id)).scalars().all()
+        if files and ids:
+            # UPDATE em lote pela chave primária (só na Session do ORM)
+            db.execute(update(Product), [{"id": pid, "image_url": f"/static/images/{files[i % len(files)]}"} for i, pid in enumerate(ids)])
+            db.commit()
+
+
+def prepare_database(database, args, workdir):
+    """URL do banco do teste: SQLite temporário semeado ou o Postgres informado."""
+    from sqlalchemy import create_engine, text
+
+    if database == "sqlite":
+        url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+        engine = create_engine(url)
+        seed_catalog(args.products, engine=engine)
+        use_real_images(engine)
+        engine.dispose()
+        return url
+    if args.seed:
+        engine = create_engine(database)
+        seed_catalog(args.products, engine=engine)
+        use_real_images(engine)
+        # Ids explícitos no seed: acerta as sequences para inserções futuras
+        with engine.begin() as conn:
+            for table in ("categories", "products"):
+                conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT max(id) FROM {table}))"))
+        engine.dispose()
+    return database
+
+
+def start_server(url, args, workdir):
+    env = dict(
+        os.environ,
+        DATABASE_URL=url,
+        WEB_CONCURRENCY=str(args.workers),
+        MENU_VERSION_FILE=os.path.join(workdir, "menu_version"),
+        EVENT_BUS_FILE=os.path.join(workdir, "menu_events"),
+        METRICS_DIR=os.path.join(workdir, "metrics"),
+    )
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+def label(database):
+    return "sqlite" if database == "sqlite" else re.sub(r"//[^@/]*@", "//", database)
+
+
+def print_report(name, rows, server, args):
+    print(f"\n== {name} | {args.workers} workers | {args.phones} celulares | {args.staff} funcionários | {args.duration:.0f}s")
+    print(f"{'rota':22} {'req':>7} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>7}")
+    for r in rows:
+        print(
+            f"{r['route']:22} {r['requests']:7d} {r['per_s']:7.1f} {r['p50_ms']:6.1f}ms {r['p95_ms']:6.1f}ms "
+            f"{r['p99_ms']:6.1f}ms {r['error_rate'] * 100:6.2f}%"
+        )
+    total = sum(r["requests"] for r in rows)
+    errors = sum(r["requests"] * r["error_rate"] for r in rows)
+    print(f"{'total':22} {total:7d} {sum(r['per_s'] for r in rows):7.1f} {'':26} {errors / total * 100 if total else 0:6.2f}%")
+    if server.get("workers"):
+        print(
+            f"pool ({server['workers']} workers): {server['pool_checkouts']} checkouts, "
+            f"espera média {server['pool_wait_avg_ms']:.2f}ms, {server['pool_timeouts']} timeouts"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--databases", nargs="+", default=["sqlite"], help='"sqlite" e/ou URLs postgresql://')
+    parser.add_argument("--seed", action="store_true", help="recria as tabelas do Postgres com dados sintéticos")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--env", action="append", default=[], metavar="CHAVE=VALOR", help="variável extra para o servidor (pool, SQLite...)")
+    parser.add_argument("--url", help="servidor já rodando (não sobe uvicorn nem mexe em banco)")
+    parser.add_argument("--phones", type=int, default=200)
+    parser.add_argument("--staff", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--ramp-up", type=float, default=10, help="segundos em que os celulares vão chegando")
+    parser.add_argument("--think", type=float, default=8, help="pausa média entre ações de um celular (s)")
+    parser.add_argument("--staff-interval", type=float, default=5, help="pausa média entre toggles de um funcionário (s)")
+    parser.add_argument("--no-sse", dest="sse", action="store_false", help="celulares sem a conexão /events/menu")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed-random", type=int, default=7)
+    parser.add_argument("--output", help="JSON com os resultados")
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        rows, server = asyncio.run(run(args.url, args))
+        print_report(args.url, rows, server, args)
+        results.append({"target": args.url, "routes": rows, "server": server})
+    for database in [] if args.url else args.databases:
+        workdir = tempfile.mkdtemp(prefix="loadtest-")
+        server_process = None
+        try:
+            url = prepare_database(database, args, workdir)
+            server_process = start_server(url, args, workdir)
+            rows, server = asyncio.run(run(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            if server_process is not None:
+                server_process.terminate()
+                server_process.wait()
+            shutil.rmtree(workdir, ignore_errors=True)
+        print_report(label(database), rows, server, args)
+        results.append({"target": label(database), "routes": rows, "server": server})
+
+    if args.output:
+        settings = {k: v for k, v in vars(args).items() if k not in ("databases", "output", "url")}
+        with open(args.output, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Tempo de renderização da página do cardápio (render_menu_page) por tamanho de catálogo.
+
+Mede só a montagem do HTML, com os objetos já carregados do banco: é o custo
+pago a cada miss do cache de página (toda alteração no cardápio).
+
+- frio: nenhum card em memória (primeira página após o deploy)
+- 1 alteração: um produto muda de disponibilidade entre as renderizações; os
+  demais cards são reaproveitados da versão anterior
+
+Uso: python benchmarks/render.py [--sizes 50 500 5000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from common import seed_catalog, use_temp_database
+
+
+def measure(n_products, repeat):
+    from sqlalchemy import select
+
+    import menu_page
+    from database import SessionLocal
+    from models import Category, Product
+
+    seed_catalog(n_products)
+    with SessionLocal() as db:
+        categories = db.execute(select(Category)).scalars().all()
+        products = db.execute(select(Product)).scalars().all()
+
+    # Primeira chamada fora da medição: compila os templates
+    html = menu_page.render_menu_page(categories, products)
+
+    cold = []
+    for _ in range(repeat):
+        menu_page.reset_card_cache()
+        start = time.perf_counter()
+        menu_page.render_menu_page(categories, products)
+        cold.append(time.perf_counter() - start)
+
+    changed = []
+    product = products[len(products) // 2]
+    for version in range(1, repeat + 1):
+        product.is_available = not product.is_available
+        start = time.perf_counter()
+        menu_page.render_menu_page(categories, products, version)
+        changed.append(time.perf_counter() - start)
+
+    return {
+        "products": n_products,
+        "cold_ms": statistics.median(cold) * 1000,
+        "one_change_ms": statistics.median(changed) * 1000,
+        "html_kb": len(html.encode("utf-8")) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = use_temp_database("render")
+    try:
+        print(f"{'produtos':>8} {'frio':>10} {'1 alteração':>12} {'HTML':>10}")
+        for size in args.sizes:
+            result = measure(size, args.repeat)
+            print(f"{result['products']:8d} {result['cold_ms']:8.1f}ms {result['one_change_ms']:10.1f}ms {result['html_kb']:8.0f}KB")
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Leituras durante escritas concorrentes no SQLite: modo "simple" x "tuned" (WAL).
+
+Sobe o main:app de verdade com uvicorn e vários workers sobre uma cópia do mesmo
+banco sintético. Leitores consultam /api/products (sempre vai ao banco) enquanto
+escritores alternam a disponibilidade de produtos e criam pedidos, e uma
+importação do cardápio inteiro (como menu.py import) roda a cada --bulk-interval
+segundos. No modo simple (journal padrão) o commit de cada escrita bloqueia
+todas as leituras; com WAL os leitores nunca esperam o escritor.
+
+Uso: python benchmarks/sqlite_rw.py [--modes simple tuned] [--workers 2] [--readers 8] [--writers 2] [--seconds 10] [--bulk-interval 1]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+from common import ROOT, percentile, seed_catalog, use_temp_database
+
+PRODUCTS = 2000
+
+
+def start_server(db_path, mode, workers, port):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        MENU_VERSION_FILE=db_path + ".version",
+        SQLITE_MODE=mode,
+        WEB_CONCURRENCY=str(workers),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/api/categories")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("servidor não subiu")
+
+
+def bulk_updates(db_path, stop, interval, counter):
+    """Reescreve todos os produtos numa transação (dispara os triggers da busca)."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    while time.monotonic() < stop:
+        conn.execute("UPDATE products SET description = description")
+        conn.commit()
+        counter.append(1)
+        time.sleep(interval)
+    conn.close()
+
+
+async def load(base_url, db_path, readers, writers, seconds, bulk_interval):
+    import httpx
+
+    reads, writes = [], []
+    errors = {"read": 0, "write": 0}
+    rng = random.Random(7)
+    limits = httpx.Limits(max_connections=readers + writers)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        await wait_ready(client)
+        stop = time.monotonic() + seconds
+        bulk = []
+        if bulk_interval:
+            threading.Thread(target=bulk_updates, args=(db_path, stop, bulk_interval, bulk), daemon=True).start()
+
+        async def reader():
+            while time.monotonic() < stop:
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/api/products", params={"cursor": rng.randint(0, PRODUCTS), "limit": 50})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    reads.append(time.perf_counter() - start)
+                else:
+                    errors["read"] += 1
+
+        async def writer(n):
+            i = 0
+            while time.monotonic() < stop:
+                i += 1
+                product_id = rng.randint(1, PRODUCTS)
+                start = time.perf_counter()
+                try:
+                    if i % 2:
+                        response = await client.post(f"/admin/toggle/{product_id}")
+                    else:
+                        order = {"customer_name": "Carga", "customer_phone": "0", "items": [{"product_id": product_id, "quantity": 1}]}
+                        response = await client.post("/api/orders", json=order)
+                    # 409 (produto esgotado pelo outro escritor) é resposta válida
+                    ok = response.status_code < 500
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    writes.append(time.perf_counter() - start)
+                else:
+                    errors["write"] += 1
+
+        await asyncio.gather(*(reader() for _ in range(readers)), *(writer(n) for n in range(writers)))
+
+    return {
+        "reads_per_s": len(reads) / seconds,
+        "read_p50_ms": percentile(reads, 50) * 1000,
+        "read_p99_ms": percentile(reads, 99) * 1000,
+        "read_max_ms": max(reads, default=0) * 1000,
+        "writes_per_s": len(writes) / seconds,
+        "write_p99_ms": percentile(writes, 99) * 1000,
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+        "bulk_imports": len(bulk),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["simple", "tuned"], choices=["simple", "tuned"])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--bulk-interval", type=float, default=1.0, help="0 desliga a importação em lote")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # O seed roda neste processo; cada modo recebe uma cópia com o journal ajustado
+    template = use_temp_database("sqlite-rw")
+    os.environ["SQLITE_MODE"] = "simple"
+    seed_catalog(PRODUCTS)
+
+    print(f"{args.workers} workers | {args.readers} leitores | {args.writers} escritores | {args.seconds:.0f}s")
+    print(f"{'modo':8} {'leituras/s':>11} {'p50':>8} {'p99':>8} {'máx':>8} {'escritas/s':>11} {'p99':>8} {'lotes':>6} {'erros L/E':>10}")
+    for mode in args.modes:
+        db_path = f"{template}.{mode}.db"
+        shutil.copy(template, db_path)
+        with sqlite3.connect(db_path) as conn:
+            conn.execute("PRAGMA journal_mode=" + ("WAL" if mode == "tuned" else "DELETE"))
+        server = start_server(db_path, mode, args.workers, args.port)
+        try:
+            r = asyncio.run(load(f"http://127.0.0.1:{args.port}", db_path, args.readers, args.writers, args.seconds, args.bulk_interval))
+        finally:
+            server.terminate()
+            server.wait()
+            for suffix in ("", "-wal", "-shm", ".version"):
+                if os.path.exists(db_path + suffix):
+                    os.remove(db_path + suffix)
+        print(
+            f"{mode:8} {r['reads_per_s']:11.0f} {r['read_p50_ms']:6.1f}ms {r['read_p99_ms']:6.1f}ms {r['read_max_ms']:6.1f}ms "
+            f"{r['writes_per_s']:11.0f} {r['write_p99_ms']:6.1f}ms {r['bulk_imports']:6d} {r['read_errors']:>6}/{r['write_errors']}"
+        )
+    os.remove(template)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Suíte de benchmarks do main:app em processo, para comparar commits.
+
+Para cada tamanho de catálogo (SQLite temporário semeado com seed_catalog:
+disponibilidade, foto e sub-categorias misturadas) mede, pela app ASGI inteira:
+
+- GET / frio: cache de página e de cards vazios (primeira página após o deploy)
+- GET / miss: nova versão do cardápio, cards reaproveitados (após uma alteração)
+- GET / hit: página servida do cache
+- alocações (tracemalloc) de um GET / frio e de um hit: pico e memória retida
+- tamanho do HTML sem compressão, gzip e br
+- vazão de POST /admin/toggle/{id}, sequencial e concorrente
+
+O resultado vai para um JSON (--output). Com --compare, compara com o JSON de
+outro commit e sai com código 1 se alguma métrica piorar além do limite
+(--threshold para tempos, --size-threshold para tamanhos e alocações).
+
+Uso: python benchmarks/suite.py [--sizes 50 500 5000 50000] [--output arquivo.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from common import ROOT, percentile, seed_catalog, use_temp_database
+
+SIZES = [50, 500, 5000, 50000]
+# Métricas em que maior é melhor; nas demais (ms, KB) maior é pior
+HIGHER_IS_BETTER = {"toggle_per_s", "toggle_concurrent_per_s"}
+# Diferenças de tempo menores que isso são ruído, mesmo que grandes em %
+MIN_DELTA_MS = 0.5
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+async def timed_get(client, path, headers=None):
+    # Corpo lido sem descomprimir: o br decodificado pelo cliente entraria no tempo e nas alocações
+    start = time.perf_counter()
+    async with client.stream("GET", path, headers=headers) as response:
+        async for _ in response.aiter_raw():
+            pass
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return elapsed, response
+
+
+async def traced_get(client, path):
+    """(pico, retido) em KB durante um GET."""
+    tracemalloc.start()
+    try:
+        await timed_get(client, path)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024, current / 1024
+
+
+async def toggle_run(client, ids, concurrency):
+    queue = list(ids)
+    latencies = []
+
+    async def worker():
+        while queue:
+            product_id = queue.pop()
+            start = time.perf_counter()
+            response = await client.post(f"/admin/toggle/{product_id}")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(ids) / (time.perf_counter() - start), latencies
+
+
+async def measure(app, n_products, args):
+    import httpx
+
+    import menu_cache
+    import menu_page
+    from database import async_engine, async_write_engine
+
+    seed_catalog(n_products)
+    # Conexões abertas no tamanho anterior ainda veem o esquema antigo
+    await async_engine.dispose()
+    await async_write_engine.dispose()
+    menu_cache.bump_menu_version()
+    menu_page.reset_card_cache()
+
+    rng = random.Random(n_products)
+    result = {"products": n_products}
+    # lifespan: o startup recria o índice de busca para o catálogo novo
+    async with app.router.lifespan_context(app):
+        # Accept-Encoding de um celular: o hit mede a variante br já comprimida
+        headers = {"Accept-Encoding": "gzip, deflate, br"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", headers=headers) as client:
+            # Primeira chamada fora da medição: compila templates, abre conexões
+            await timed_get(client, "/")
+
+            cold = []
+            for _ in range(args.repeat):
+                menu_cache.bump_menu_version()
+                menu_page.reset_card_cache()
+                cold.append((await timed_get(client, "/"))[0])
+            miss = []
+            for _ in range(args.repeat):
+                menu_cache.bump_menu_version()
+                miss.append((await timed_get(client, "/"))[0])
+            hit = [(await timed_get(client, "/"))[0] for _ in range(args.hits)]
+            result.update({
+                "root_cold_ms": percentile(cold, 50) * 1000,
+                "root_miss_ms": percentile(miss, 50) * 1000,
+                "root_hit_p50_ms": percentile(hit, 50) * 1000,
+                "root_hit_p99_ms": percentile(hit, 99) * 1000,
+            })
+
+            menu_cache.bump_menu_version()
+            menu_page.reset_card_cache()
+            result["alloc_cold_peak_kb"], result["alloc_cold_retained_kb"] = await traced_get(client, "/")
+            result["alloc_hit_peak_kb"], _ = await traced_get(client, "/")
+
+            for encoding in ("identity", "gzip", "br"):
+                _, response = await timed_get(client, "/", headers={"Accept-Encoding": encoding})
+                result[f"html_{encoding}_kb"] = int(response.headers["content-length"]) / 1024
+
+            ids = [rng.randint(1, n_products) for _ in range(args.toggles)]
+            result["toggle_per_s"], latencies = await toggle_run(client, ids, 1)
+            result["toggle_p99_ms"] = percentile(latencies, 99) * 1000
+            result["toggle_concurrent_per_s"], latencies = await toggle_run(client, ids, args.concurrency)
+            result["toggle_concurrent_p99_ms"] = percentile(latencies, 99) * 1000
+    return result
+
+
+def compare(results, baseline_path, threshold, size_threshold):
+    """Imprime a variação de cada métrica e retorna as que pioraram além do limite.
+
+    Tempos variam de uma rodada para outra; tamanhos e alocações (_kb) são
+    praticamente determinísticos e têm um limite bem menor.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    base_by_size = {r["products"]: r for r in baseline["results"]}
+    print(f"\nComparação com {baseline.get('commit') or baseline_path} (limites: tempo {threshold:.0f}%, tamanho {size_threshold:.0f}%)")
+    regressions = []
+    for result in results:
+        base = base_by_size.get(result["products"])
+        if base is None:
+            continue
+        for name, value in result.items():
+            if name == "products" or not base.get(name):
+                continue
+            change = (value - base[name]) / base[name] * 100
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = ""
+            if name.endswith("_ms") and abs(value - base[name]) < MIN_DELTA_MS:
+                worse = 0
+            if worse > (size_threshold if name.endswith("_kb") else threshold):
+                flag = "  <- piorou"
+                regressions.append((result["products"], name, change))
+            print(f"{result['products']:>6} {name:26} {base[name]:10.2f} -> {value:10.2f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=5, help="GETs frios/miss por tamanho (mediana)")
+    parser.add_argument("--hits", type=int, default=200, help="GETs servidos do cache por tamanho")
+    parser.add_argument("--toggles", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="toggles simultâneos na rodada concorrente")
+    parser.add_argument("--output", help="JSON de saída (padrão: benchmarks/results/suite-<commit>.json)")
+    parser.add_argument("--compare", help="JSON de outro commit para comparar")
+    parser.add_argument("--threshold", type=float, default=20.0, help="piora máxima de tempo/vazão em %% com --compare")
+    parser.add_argument("--size-threshold", type=float, default=2.0, help="piora máxima de HTML/alocações em %% com --compare")
+    args = parser.parse_args()
+
+    db_path = use_temp_database("suite")
+    # Log de cada requisição do httpx e do startup poluiriam a tabela
+    logging.disable(logging.INFO)
+    from main import app
+
+    commit = git_revision()
+    results = []
+    try:
+        print(f"{'produtos':>8} {'frio':>9} {'miss':>9} {'hit p99':>9} {'pico frio':>10} {'HTML':>8} {'br':>7} {'toggle/s':>9} {'conc/s':>8}")
+        for size in args.sizes:
+            r = asyncio.run(measure(app, size, args))
+            results.append(r)
+            print(
+                f"{size:8d} {r['root_cold_ms']:7.1f}ms {r['root_miss_ms']:7.1f}ms {r['root_hit_p99_ms']:7.2f}ms "
+                f"{r['alloc_cold_peak_kb'] / 1024:8.1f}MB {r['html_identity_kb']:6.0f}KB {r['html_br_kb']:5.0f}KB "
+                f"{r['toggle_per_s']:9.0f} {r['toggle_concurrent_per_s']:8.0f}"
+            )
+    finally:
+        for suffix in ("", "-wal", "-shm", ".version"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"suite-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": commit,
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {k: getattr(args, k) for k in ("repeat", "hits", "toggles", "concurrency")},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResultados em {output}")
+
+    if args.compare and compare(results, args.compare, args.threshold, args.size_threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
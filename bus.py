@@ -0,0 +1,289 @@
+import abc
+import asyncio
+import json
+import logging
+import os
+from typing import Awaitable, Callable, Optional, Union
+
+from sqlalchemy import select, text
+
+import menu_cache
+from database import ASYNC_DATABASE_URL, SQLALCHEMY_DATABASE_URL, ASYNC_CONNECT_ARGS, async_engine, engine
+from models import DEFAULT_TENANT_ID, Tenant
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock, a rotação pode perder uma linha publicada no mesmo instante
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Canal usado por todos os backends (nome do canal no LISTEN/NOTIFY do Postgres)
+CHANNEL = "menu_events"
+
+Handler = Callable[[dict], Union[None, Awaitable[None]]]
+
+
+def _encode(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+class EventBus(abc.ABC):
+    """Entrega eventos do cardápio a todos os workers, inclusive a quem publicou."""
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+
+    async def start(self, handler: Handler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    @abc.abstractmethod
+    async def publish(self, event: dict) -> None:
+        ...
+
+    @abc.abstractmethod
+    def publish_sync(self, event: dict) -> None:
+        """Publica a partir de código síncrono (scripts de manutenção)."""
+
+    async def _dispatch(self, event: dict) -> None:
+        if self._handler is None:
+            return
+        try:
+            result = self._handler(event)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.error(f"Erro ao processar evento do cardápio {event}: {e}")
+
+
+class InMemoryBus(EventBus):
+    """Um único processo (testes, uvicorn sem --workers)."""
+
+    async def publish(self, event: dict) -> None:
+        await self._dispatch(event)
+
+    def publish_sync(self, event: dict) -> None:
+        # Fora do processo do servidor não há ninguém para avisar
+        pass
+
+
+class FileBus(EventBus):
+    """Vários workers na mesma máquina: um arquivo de eventos compartilhado.
+
+    Cada publicação é uma linha JSON anexada com O_APPEND (atômica para linhas
+    pequenas); cada worker acompanha o arquivo com os.stat, sem tocar no banco
+    de dados. Passando de MAX_SIZE o arquivo é rotacionado (renomeado para
+    "<path>.1"), nunca truncado: quem está atrasado termina de ler o antigo,
+    que continua aberto, antes de passar para o novo.
+    """
+
+    POLL_INTERVAL = 0.02
+    MAX_SIZE = 1024 * 1024
+
+    def __init__(self, path: str = ".menu_events"):
+        super().__init__()
+        self.path = path
+        self.rotated_path = path + ".1"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler) -> None:
+        await super().start(handler)
+        self._task = asyncio.create_task(self._follow())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await super().stop()
+
+    def _inode(self, path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def publish_sync(self, event: dict) -> None:
+        line = (_encode(event) + "\n").encode("utf-8")
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # O lock serializa a rotação com as escritas: nada é escrito no arquivo
+                # antigo depois de renomeado (os leitores já podem tê-lo terminado)
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                st = os.fstat(fd)
+                if st.st_ino != self._inode(self.path):
+                    continue  # rotacionado enquanto esperava o lock: escreve no novo
+                if st.st_size > self.MAX_SIZE:
+                    os.replace(self.path, self.rotated_path)
+                    continue
+                os.write(fd, line)
+                return
+            finally:
+                # Fechar libera o lock
+                os.close(fd)
+
+    async def publish(self, event: dict) -> None:
+        self.publish_sync(event)
+
+    async def _read_lines(self, f, pending: bytes) -> bytes:
+        """Despacha as linhas completas novas de f; devolve o resto (linha pela metade)."""
+        if os.fstat(f.fileno()).st_size < f.tell():
+            # Truncado por fora (ex.: apagado à mão com > arquivo): recomeça
+            f.seek(0)
+            pending = b""
+        chunk = pending + f.read()
+        complete = chunk.rfind(b"\n") + 1
+        for line in chunk[:complete].splitlines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            await self._dispatch(event)
+        return chunk[complete:]
+
+    async def _follow(self) -> None:
+        f = None
+        pending = b""
+        # Na partida, só os eventos publicados daqui em diante
+        skip_existing = True
+        try:
+            while True:
+                if f is None:
+                    try:
+                        f = open(self.path, "rb")
+                    except FileNotFoundError:
+                        skip_existing = False
+                        await asyncio.sleep(self.POLL_INTERVAL)
+                        continue
+                    if skip_existing:
+                        f.seek(0, os.SEEK_END)
+                    skip_existing = False
+
+                pending = await self._read_lines(f, pending)
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self._inode(self.path):
+                    # Rotacionado: termina o antigo (o lock garante que ninguém mais
+                    # escreve nele) e passa para o novo desde o início
+                    await self._read_lines(f, pending)
+                    f.close()
+                    f = None
+                    pending = b""
+                    if inode != self._inode(self.rotated_path):
+                        # Ficou para trás mais de uma rotação: eventos perdidos
+                        logger.warning("Eventos do cardápio perdidos na rotação; invalidando tudo")
+                        await self._dispatch({"type": "invalidate"})
+                    continue
+                await asyncio.sleep(self.POLL_INTERVAL)
+        finally:
+            if f is not None:
+                f.close()
+
+
+class PostgresBus(EventBus):
+    """Vários workers/dynos: LISTEN/NOTIFY do Postgres.
+
+    O LISTEN precisa de uma conexão de sessão: o pooler da Supabase em modo
+    transaction (porta 6543) não entrega notificações. EVENT_BUS_URL permite
+    apontar para a conexão direta; por padrão usa a porta 5432 do mesmo host.
+    """
+
+    RECONNECT_SECONDS = 2
+    KEEPALIVE_SECONDS = 30
+
+    def __init__(self, listen_url: Optional[str] = None):
+        super().__init__()
+        url = ASYNC_DATABASE_URL.set(drivername="postgresql", query={})
+        if url.port == 6543:
+            url = url.set(port=5432)
+        self.listen_url = listen_url or url.render_as_string(hide_password=False)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: Handler) -> None:
+        await super().start(handler)
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await super().stop()
+
+    async def publish(self, event: dict) -> None:
+        async with async_engine.begin() as conn:
+            await conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": _encode(event)})
+
+    def publish_sync(self, event: dict) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": _encode(event)})
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        asyncio.get_running_loop().create_task(self._dispatch(event))
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        connect_args = {k: v for k, v in ASYNC_CONNECT_ARGS.items() if k == "ssl"}
+        while True:
+            try:
+                conn = await asyncpg.connect(self.listen_url, **connect_args)
+            except Exception as e:
+                logger.error(f"❌ Falha ao conectar o LISTEN ({e}); tentando novamente")
+                await asyncio.sleep(self.RECONNECT_SECONDS)
+                continue
+            try:
+                await conn.add_listener(CHANNEL, self._on_notify)
+                # Notificações perdidas durante a reconexão: invalida por segurança
+                await self._dispatch({"type": "invalidate"})
+                # Conexão ociosa não percebe queda de rede: um SELECT periódico detecta
+                while True:
+                    await asyncio.sleep(self.KEEPALIVE_SECONDS)
+                    await conn.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Conexão do LISTEN perdida: {e}")
+            finally:
+                if not conn.is_closed():
+                    await conn.close()
+
+
+def create_bus() -> EventBus:
+    # EVENT_BUS=memory|file|postgres; padrão segue o banco configurado
+    backend = os.getenv("EVENT_BUS")
+    if backend is None:
+        backend = "file" if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else "postgres"
+    if backend == "memory":
+        return InMemoryBus()
+    if backend == "file":
+        return FileBus(os.getenv("EVENT_BUS_FILE", ".menu_events"))
+    if backend == "postgres":
+        return PostgresBus(os.getenv("EVENT_BUS_URL"))
+    raise ValueError(f"EVENT_BUS desconhecido: {backend}")
+
+
+bus = create_bus()
+
+
+def notify_menu_changed(tenant: int = DEFAULT_TENANT_ID) -> int:
+    """Para scripts: nova versão do cardápio do restaurante + aviso aos workers em execução."""
+    version = menu_cache.bump_menu_version(tenant)
+    bus.publish_sync({"type": "invalidate", "version": version, "tenant": tenant})
+    return version
+
+
+def notify_all_menus_changed() -> None:
+    """Para scripts que mexem no que é comum a todos os restaurantes (ex.: variantes das fotos)."""
+    with engine.connect() as conn:
+        tenant_ids = list(conn.execute(select(Tenant.id)).scalars())
+    for tenant in tenant_ids:
+        menu_cache.bump_menu_version(tenant)
+    # Sem "tenant": cada worker descarta as páginas de todos os restaurantes
+    bus.publish_sync({"type": "invalidate"})
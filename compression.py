@@ -0,0 +1,153 @@
+import asyncio
+import gzip
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele servimos apenas gzip
+    brotli = None
+
+# Abaixo disso o ganho não compensa os cabeçalhos extras
+MIN_COMPRESS_SIZE = 1024
+
+# Imagens (webp, avif, jpg, png) já são comprimidas: comprimir de novo só gasta CPU
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def is_compressible(media_type: Optional[str]) -> bool:
+    return bool(media_type) and media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe 'br' ou 'gzip' a partir do Accept-Encoding do cliente."""
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+
+    def weight(encoding: str) -> float:
+        return accepted.get(encoding, accepted.get("*", 0.0))
+
+    if brotli is not None and weight("br") > 0:
+        return "br"
+    if weight("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str, quality: int = 11) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=quality)
+    return gzip.compress(data, compresslevel=min(quality, 9), mtime=0)
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    # ETags fortes precisam ser diferentes para cada codificação
+    if encoding is None:
+        return etag
+    return etag[:-1] + "-" + encoding + '"'
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles que entrega gzip/brotli calculados uma única vez por arquivo."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        # caminho -> ((mtime_ns, tamanho), {codificação: bytes})
+        self._variants: Dict[str, Tuple[Tuple[int, int], Dict[str, bytes]]] = {}
+
+    def _cached(self, full_path: str, stat_result: os.stat_result, encoding: str) -> Optional[bytes]:
+        key = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            cached = self._variants.get(full_path)
+            if cached is not None and cached[0] == key:
+                return cached[1].get(encoding)
+        return None
+
+    def _compressed(self, full_path: str, stat_result: os.stat_result, encoding: str) -> bytes:
+        body = self._cached(full_path, stat_result, encoding)
+        if body is not None:
+            return body
+
+        with open(full_path, "rb") as f:
+            body = compress(f.read(), encoding)
+
+        key = (stat_result.st_mtime_ns, stat_result.st_size)
+        with self._lock:
+            cached = self._variants.get(full_path)
+            if cached is None or cached[0] != key:
+                cached = (key, {})
+                self._variants[full_path] = cached
+            cached[1][encoding] = body
+        return body
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        media_type = mimetypes.guess_type(str(full_path))[0]
+        if status_code != 200 or stat_result.st_size < MIN_COMPRESS_SIZE or not is_compressible(media_type):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding"))
+        if encoding is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+            response.headers["Vary"] = "Accept-Encoding"
+            return response
+
+        # Reaproveita Last-Modified/ETag calculados pelo FileResponse
+        plain = FileResponse(full_path, stat_result=stat_result)
+        headers = Headers({
+            "content-encoding": encoding,
+            "vary": "Accept-Encoding",
+            "last-modified": plain.headers["last-modified"],
+            "etag": variant_etag(plain.headers["etag"], encoding),
+        })
+        if self.is_not_modified(headers, request_headers):
+            return NotModifiedResponse(headers)
+
+        body = self._cached(str(full_path), stat_result, encoding)
+        if body is None:
+            # Primeira vez do arquivo: brotli 11 leva centenas de ms e não pode
+            # travar o event loop (e os streams SSE) do worker
+            return CompressingResponse(self, str(full_path), stat_result, encoding, media_type, dict(headers))
+        return Response(content=body, media_type=media_type, headers=dict(headers))
+
+
+class CompressingResponse(Response):
+    """Resposta que comprime o arquivo numa thread ao ser enviada, em vez de dentro de file_response."""
+
+    def __init__(self, files: PrecompressedStaticFiles, full_path: str, stat_result: os.stat_result,
+                 encoding: str, media_type: Optional[str], headers: Dict[str, str]):
+        self.files = files
+        self.full_path = full_path
+        self.stat_result = stat_result
+        self.encoding = encoding
+        super().__init__(content=None, media_type=media_type, headers=headers)
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.body = await asyncio.to_thread(self.files._compressed, self.full_path, self.stat_result, self.encoding)
+        self.headers["content-length"] = str(len(self.body))
+        await super().__call__(scope, receive, send)
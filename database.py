@@ -1,7 +1,14 @@
 ﻿import os
-from sqlalchemy import create_engine
+import threading
+import time
+from urllib.parse import quote
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from sqlalchemy.sql.dml import UpdateBase
 
 # Database URL from environment or fallback to SQLite
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./campeao.db")
@@ -18,15 +25,251 @@ else:
         SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(":5432", ":6543")
         print("🔧 Auto-corrigindo porta do Pooler da Supabase para 6543")
     
-    # Increase pool size and handle disconnected connections
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL,
-        pool_size=10,
-        max_overflow=20,
-        pool_pre_ping=True,
-        pool_recycle=300
-    )
+    # Scripts e startup: conexão aberta e fechada a cada uso, fora do orçamento
+    # de conexões dos workers (o pool que importa é o do engine assíncrono)
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine assíncrono para as rotas do FastAPI (aiosqlite / asyncpg).
+# Os scripts de manutenção continuam usando o engine síncrono acima.
+def _async_url_and_args(url):
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+
+    connect_args = {}
+    query = dict(url.query)
+    # asyncpg não entende sslmode=...: traduz para o argumento ssl
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = "require" if sslmode in ("require", "prefer", "allow") else True
+    # PgBouncer em modo transaction (porta 6543) não suporta prepared statements
+    if url.port == 6543:
+        connect_args["statement_cache_size"] = 0
+        query["prepared_statement_cache_size"] = "0"
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+ASYNC_DATABASE_URL, ASYNC_CONNECT_ARGS = _async_url_and_args(SQLALCHEMY_DATABASE_URL)
+
+
+class PoolStats:
+    """Espera por conexão no pool da aplicação (checkout), para dimensionar o pool com dados.
+
+    Inclui o tempo de abrir a conexão e o pre-ping: é o atraso que a rota sente.
+    """
+
+    # Limites do histograma de espera, em segundos
+    WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_sum = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * len(self.WAIT_BUCKETS)
+
+    def observe(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_sum += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            for i, limit in enumerate(self.WAIT_BUCKETS):
+                if seconds <= limit:
+                    self.wait_buckets[i] += 1
+
+
+pool_stats = PoolStats()
+writer_pool_stats = PoolStats()
+
+
+class _TimedCheckout:
+    stats = pool_stats
+
+    # connect() é a entrada única do checkout (o _do_get do QueuePool é recursivo)
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.observe(time.perf_counter() - start)
+        return connection
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedWriterPool(TimedAsyncQueuePool):
+    stats = writer_pool_stats
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def pool_settings(url):
+    """Perfil do pool do engine assíncrono, escolhido por DB_POOL_PROFILE.
+
+    - queue: pool próprio por worker. Com DB_MAX_CONNECTIONS (limite do servidor
+      reservado para a aplicação) o pool de cada worker é esse limite dividido
+      por WEB_CONCURRENCY, sem overflow: os workers juntos nunca passam dele.
+    - null: sem pool no cliente, uma conexão por uso; para quando já existe um
+      pooler externo (PgBouncer/Supabase em modo transaction), que faz esse papel.
+    - auto (padrão): null na porta 6543 (pooler em modo transaction), senão queue.
+    """
+    profile = os.getenv("DB_POOL_PROFILE", "auto").lower()
+    if profile == "auto":
+        profile = "null" if url.port == 6543 else "queue"
+    if profile == "null":
+        return profile, {"poolclass": TimedNullPool}
+    if profile != "queue":
+        raise ValueError(f"DB_POOL_PROFILE inválido: {profile!r} (use auto, queue ou null)")
+
+    budget = _env_int("DB_MAX_CONNECTIONS", 0)
+    if budget:
+        workers = max(1, _env_int("WEB_CONCURRENCY", 1))
+        default_size, default_overflow = max(1, budget // workers), 0
+    else:
+        default_size, default_overflow = 10, 20
+    return profile, {
+        "poolclass": TimedAsyncQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", default_size),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", default_overflow),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 300),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") != "0",
+    }
+
+
+# SQLite em produção ("tuned", padrão): WAL + pragmas em toda conexão, leitores
+# somente leitura em um pool próprio e um único escritor por processo.
+# "simple" volta ao comportamento antigo (journal padrão, um pool só).
+SQLITE_MODE = os.getenv("SQLITE_MODE", "tuned").lower()
+SQLITE_READERS = _env_int("SQLITE_READERS", 8)
+# Quanto uma escrita espera a trava de outro processo antes de "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_PRAGMAS = (
+    # Leitores não bloqueiam o escritor nem são bloqueados por ele
+    ("journal_mode", "WAL"),
+    # Com WAL, fsync só no checkpoint: não corrompe, no máximo perde o último commit numa queda de energia
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", str(SQLITE_BUSY_TIMEOUT_MS)),
+    # 20 MB de cache de páginas por conexão (valor negativo = KB)
+    ("cache_size", "-20000"),
+    # Leituras direto do mapeamento em memória do arquivo, sem cópia para o cache
+    ("mmap_size", str(256 * 1024 * 1024)),
+    ("temp_store", "MEMORY"),
+)
+
+
+def tune_sqlite(engine, read_only: bool = False) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS:
+            # O modo do journal fica gravado no arquivo: quem abre somente leitura não pode mudá-lo
+            if read_only and name == "journal_mode":
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    POOL_PROFILE = "sqlite"
+    _sqlite_path = make_url(SQLALCHEMY_DATABASE_URL).database
+    if SQLITE_MODE == "tuned" and _sqlite_path and _sqlite_path != ":memory:":
+        POOL_PROFILE = "sqlite-wal"
+        # Um escritor por processo: escritas concorrentes fazem fila no pool em vez
+        # de disputar a trava do arquivo
+        async_write_engine = create_async_engine(
+            ASYNC_DATABASE_URL, poolclass=TimedWriterPool, pool_size=1, max_overflow=0,
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        )
+        # Leitores abrem o arquivo em modo somente leitura (nunca pegam a trava de escrita)
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///file:{quote(os.path.abspath(_sqlite_path))}?mode=ro&uri=true",
+            poolclass=TimedAsyncQueuePool, pool_size=SQLITE_READERS, max_overflow=SQLITE_READERS,
+        )
+        tune_sqlite(engine)
+        tune_sqlite(async_write_engine.sync_engine)
+        tune_sqlite(async_engine.sync_engine, read_only=True)
+    else:
+        async_engine = async_write_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=TimedAsyncQueuePool)
+else:
+    POOL_PROFILE, _pool_args = pool_settings(ASYNC_DATABASE_URL)
+    async_engine = async_write_engine = create_async_engine(ASYNC_DATABASE_URL, connect_args=ASYNC_CONNECT_ARGS, **_pool_args)
+
+
+def _pool_status(pool, stats: PoolStats) -> dict:
+    status = {
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_seconds_sum": round(stats.wait_seconds_sum, 6),
+        "wait_seconds_max": round(stats.wait_seconds_max, 6),
+        "wait_buckets": dict(zip(PoolStats.WAIT_BUCKETS, stats.wait_buckets)),
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # Conexões acima de pool_size (negativo: pool ainda não encheu)
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    return status
+
+
+def pool_status() -> dict:
+    """Estado atual do pool da aplicação + contadores de checkout."""
+    status = {"profile": POOL_PROFILE, **_pool_status(async_engine.pool, pool_stats)}
+    if async_write_engine is not async_engine:
+        status["writer"] = _pool_status(async_write_engine.pool, writer_pool_stats)
+    return status
+
+
+class RoutingSession(Session):
+    """Escritas (flush e INSERT/UPDATE/DELETE explícitos) vão para o escritor, o resto para os leitores.
+
+    SQL textual é sempre tratado como leitura.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            return async_write_engine.sync_engine
+        return async_engine.sync_engine
+
+
+# expire_on_commit=False: atributos continuam acessíveis após o commit sem novo SELECT
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession if async_write_engine is not async_engine else Session,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
+
+# Dependência para o banco de dados
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependência assíncrona: não bloqueia o event loop durante as consultas
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
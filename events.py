@@ -0,0 +1,76 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional, Set
+
+import menu_cache
+
+# Comentário SSE enviado periodicamente para manter proxies/balanceadores abertos
+HEARTBEAT_SECONDS = 25
+# Eventos pendentes por cliente; acima disso o cliente é mandado recarregar
+SUBSCRIBER_QUEUE_SIZE = 32
+
+
+def format_event(event: dict) -> bytes:
+    lines = [f"event: {event['type']}"]
+    if event.get("version") is not None:
+        lines.append(f"id: {event['version']}")
+    lines.append("data: " + json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+RESYNC = format_event({"type": "resync"})
+
+
+class MenuBroadcaster:
+    """Distribui alterações do cardápio para as conexões SSE deste worker.
+
+    Cada conexão ociosa custa só uma asyncio.Queue e uma corrotina parada no get();
+    o evento é serializado uma única vez e a mesma instância de bytes vai para todas
+    as conexões do restaurante dele.
+    """
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        # restaurante -> conexões abertas
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    @property
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def publish(self, event: dict) -> None:
+        payload = format_event(event)
+        if event.get("tenant") is None:
+            queues = [q for tenant_queues in self._subscribers.values() for q in tenant_queues]
+        else:
+            queues = self._subscribers.get(event["tenant"], ())
+        for queue in queues:
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o atraso e pede um recarregamento completo
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    async def stream(self, tenant: int, since: Optional[int] = None) -> AsyncIterator[bytes]:
+        queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(tenant, set()).add(queue)
+        try:
+            yield b"retry: 5000\n\n"
+            # O cliente perdeu alterações entre o carregamento da página e a conexão
+            if since is not None and since < menu_cache.current_version(tenant):
+                yield RESYNC
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+        finally:
+            queues = self._subscribers[tenant]
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[tenant]
+
+
+broadcaster = MenuBroadcaster()
@@ -0,0 +1,55 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from assets import STATIC_DIR, asset_url
+
+# Variantes geradas por optimize_images.py
+OPTIMIZED_DIR = os.path.join(STATIC_DIR, "images", "optimized")
+MANIFEST_PATH = os.path.join(OPTIMIZED_DIR, "manifest.json")
+
+# Larguras geradas para cada foto (px). Larguras maiores que a original são puladas.
+VARIANT_WIDTHS = (320, 640, 960)
+
+# Ordem de preferência no <picture>: o navegador usa o primeiro formato suportado
+VARIANT_FORMATS = (("avif", "image/avif"), ("webp", "image/webp"))
+
+# Largura do card em cada breakpoint do grid (1 / 2 / 3 colunas)
+CARD_IMAGE_SIZES = "(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+
+_manifest: Dict[str, dict] = {}
+_manifest_mtime: Optional[int] = None
+
+
+def load_manifest() -> Dict[str, dict]:
+    """Manifesto image_url -> variantes, relido apenas quando o arquivo muda."""
+    global _manifest, _manifest_mtime
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+    if mtime != _manifest_mtime:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            _manifest = json.load(f)
+        _manifest_mtime = mtime
+    return _manifest
+
+
+def image_sources(image_url: str, manifest: Optional[Dict[str, dict]] = None) -> List[Tuple[str, str]]:
+    """Lista de (mime, srcset) para o <picture> do produto; vazia se não houver variantes.
+
+    Quem monta vários cards passa o manifesto já carregado (um os.stat por página).
+    """
+    entry = (load_manifest() if manifest is None else manifest).get(image_url)
+    if not entry:
+        return []
+    sources = []
+    for fmt, mime in VARIANT_FORMATS:
+        variants = entry["variants"].get(fmt)
+        if variants:
+            # srcset separa candidatos por espaço: os caminhos precisam estar escapados
+            srcset = ", ".join(f"{quote(asset_url(url))} {width}w" for width, url in variants)
+            sources.append((mime, srcset))
+    return sources
@@ -1,9 +1,13 @@
 from database import engine, Base, SessionLocal
 from models import Category, Product
+from tenants import ensure_default_tenant
 import os
 
 # Create global tables
 Base.metadata.create_all(bind=engine)
+# Dados iniciais vão para o restaurante padrão
+with engine.begin() as conn:
+    ensure_default_tenant(conn)
 
 def init_db():
     db = SessionLocal()
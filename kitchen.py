@@ -0,0 +1,149 @@
+import asyncio
+import json
+from typing import AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+
+from api import MAX_DB_INT, JSONBytes, dump_json, parse_id
+from database import AsyncSessionLocal
+from models import KITCHEN_STATUSES, Order
+from orders import serialize_order
+from tenants import TenantConfig, get_tenant
+
+router = APIRouter(prefix="/api/kitchen", tags=["kitchen"])
+
+# Espera máxima de um long-poll sem novidades (abaixo do timeout típico de proxies)
+LONG_POLL_SECONDS = 25
+# Alterações por resposta; acima disso o cliente recebe "more" e pede de novo na hora
+MAX_CHANGES = 200
+
+
+class KitchenFeed:
+    """Acorda as conexões da cozinha deste worker quando algum pedido do restaurante muda.
+
+    Não carrega dados: quem acorda consulta o banco a partir do próprio cursor,
+    então uma notificação perdida só atrasa a entrega até o próximo timeout.
+    """
+
+    def __init__(self):
+        self._events: Dict[int, asyncio.Event] = {}
+
+    def token(self, tenant: int) -> asyncio.Event:
+        # Pegue o token ANTES de consultar: uma notificação entre a consulta e a espera não se perde
+        event = self._events.get(tenant)
+        if event is None:
+            event = self._events[tenant] = asyncio.Event()
+        return event
+
+    def notify(self, tenant: Optional[int] = None) -> None:
+        # Sem restaurante: acorda todas as cozinhas. Quem esperava pega um token novo ao voltar
+        for key in ([tenant] if tenant is not None else list(self._events)):
+            event = self._events.pop(key, None)
+            if event is not None:
+                event.set()
+
+    async def wait(self, token: asyncio.Event, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(token.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+feed = KitchenFeed()
+
+
+async def read_queue(tenant_id: int, cursor: Optional[int]) -> dict:
+    """Sem cursor: fila atual (Pendente/Preparando). Com cursor: só o que mudou depois dele.
+
+    Cada chamada abre e devolve a própria conexão, para que nenhuma fique presa
+    ao pool enquanto o cliente espera por novidades.
+    """
+    async with AsyncSessionLocal() as db:
+        if cursor is None:
+            # O cursor é lido antes da fila: o que for confirmado depois chega como alteração
+            # Cursor global (change_seq é único no banco): só avança, nunca repete
+            latest = (await db.execute(select(func.coalesce(func.max(Order.change_seq), 0)))).scalar_one()
+            result = await db.execute(
+                select(Order)
+                .options(selectinload(Order.items))
+                .where(Order.tenant_id == tenant_id, Order.status.in_(KITCHEN_STATUSES))
+                .order_by(Order.created_at)
+            )
+            orders = [serialize_order(o) for o in result.scalars()]
+            return {"cursor": latest, "snapshot": True, "more": False, "orders": orders}
+
+        result = await db.execute(
+            select(Order)
+            .options(selectinload(Order.items))
+            .where(Order.change_seq > cursor, Order.tenant_id == tenant_id)
+            .order_by(Order.change_seq)
+            .limit(MAX_CHANGES + 1)
+        )
+        changed = list(result.scalars())
+        more = len(changed) > MAX_CHANGES
+        changed = changed[:MAX_CHANGES]
+        # Pedidos que saíram da fila (Pronto/Entregue) também vêm, para o cliente removê-los
+        return {
+            "cursor": changed[-1].change_seq if changed else cursor,
+            "snapshot": False,
+            "more": more,
+            "orders": [serialize_order(o) for o in changed],
+        }
+
+
+@router.get("/queue")
+async def kitchen_queue(
+    cursor: Optional[int] = Query(default=None, ge=0, le=MAX_DB_INT),
+    wait: int = 0,
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    # wait > 0: long-poll, segura a resposta até haver alteração ou o tempo acabar
+    wait = max(0, min(wait, LONG_POLL_SECONDS))
+    token = feed.token(tenant.id)
+    data = await read_queue(tenant.id, cursor)
+    if wait and not data["snapshot"] and not data["orders"]:
+        if await feed.wait(token, wait):
+            data = await read_queue(tenant.id, cursor)
+    return JSONBytes(dump_json(data))
+
+
+def format_changes(data: dict) -> bytes:
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {data['cursor']}\nevent: {'snapshot' if data['snapshot'] else 'orders'}\ndata: {payload}\n\n".encode("utf-8")
+
+
+async def stream_queue(tenant_id: int, cursor: Optional[int]) -> AsyncIterator[bytes]:
+    yield b"retry: 3000\n\n"
+    while True:
+        token = feed.token(tenant_id)
+        data = await read_queue(tenant_id, cursor)
+        cursor = data["cursor"]
+        if data["snapshot"] or data["orders"]:
+            yield format_changes(data)
+        if data["more"]:
+            continue
+        # Sem notificação, consulta de novo no heartbeat: cobre eventos perdidos do barramento
+        if not await feed.wait(token, LONG_POLL_SECONDS):
+            yield b": ping\n\n"
+
+
+@router.get("/stream")
+async def kitchen_stream(
+    request: Request,
+    cursor: Optional[int] = Query(default=None, ge=0, le=MAX_DB_INT),
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    # Reconexão automática do EventSource: continua do último id recebido.
+    # Id inválido (não numérico, "²", enorme) não é cursor: fica o ?cursor=
+    last_event_id = parse_id(request.headers.get("last-event-id", ""))
+    if last_event_id is not None:
+        cursor = last_event_id
+    return StreamingResponse(
+        stream_queue(tenant.id, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
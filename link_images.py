@@ -1,49 +1,115 @@
+import argparse
 import os
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update
+
 from database import SessionLocal
-from models import Product
-from difflib import get_close_matches
+from models import Product, Tenant
+from bus import notify_menu_changed
+from tenants import DEFAULT_TENANT_SLUG
+from assets import STATIC_DIR
+from text_match import build_index
 
-def link_images():
-    db = SessionLocal()
-    products = db.query(Product).all()
-    
-    image_dir = "images"
-    if not os.path.exists(image_dir):
-        print("Pasta 'images' não encontrada.")
-        return
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.avif')
 
-    image_files = os.listdir(image_dir)
-    print(f"Arquivos encontrados: {image_files}")
+# Abaixo disso não vincula (o antigo cutoff=0.4 do difflib aceitava nomes bem diferentes)
+MIN_SCORE = 0.6
+# Dois candidatos mais próximos que isso: ambíguo, fica para revisão manual
+AMBIGUOUS_MARGIN = 0.05
 
-    updated_count = 0
-    
-    # Map product names to IDs for easier lookup
-    product_names = [p.name for p in products]
 
+def match_images(products, image_files, min_score=MIN_SCORE):
+    """Casa arquivos com produtos pelo índice de trigramas.
+
+    Retorna (vínculos produto -> (arquivo, score), relatório de conflitos, sem correspondência).
+    """
+    index = build_index((p.id, p.name) for p in products)
+    names = {p.id: p.name for p in products}
+
+    claims: Dict[int, List[Tuple[float, str]]] = {}
+    conflicts: List[str] = []
+    unmatched: List[str] = []
     for filename in image_files:
-        if not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.avif')):
+        results = index.search(os.path.splitext(filename)[0])
+        if not results or results[0][0] < min_score:
+            unmatched.append(filename)
             continue
+        score, product_id = results[0]
+        if len(results) > 1 and score - results[1][0] < AMBIGUOUS_MARGIN:
+            conflicts.append(
+                f"Ambíguo: '{filename}' -> '{names[product_id]}' ({score:.2f}) "
+                f"ou '{names[results[1][1]]}' ({results[1][0]:.2f})"
+            )
+            continue
+        claims.setdefault(product_id, []).append((score, filename))
+
+    links: Dict[int, Tuple[str, float]] = {}
+    for product_id, candidates in claims.items():
+        candidates.sort(reverse=True)
+        best_score, best_file = candidates[0]
+        if len(candidates) > 1:
+            others = ", ".join(f"'{f}' ({s:.2f})" for s, f in candidates[1:])
+            if best_score - candidates[1][0] < AMBIGUOUS_MARGIN:
+                conflicts.append(f"Duplicado: '{names[product_id]}' <- '{best_file}' ({best_score:.2f}), {others}")
+                continue
+            conflicts.append(f"Duplicado: '{names[product_id]}' fica com '{best_file}' ({best_score:.2f}); ignorados: {others}")
+        links[product_id] = (best_file, best_score)
+    return links, conflicts, unmatched
 
-        # Try to find a match
-        name_part = os.path.splitext(filename)[0]
-        match = get_close_matches(name_part.lower(), [n.lower() for n in product_names], n=1, cutoff=0.4)
-        
-        if match:
-            matched_name = match[0]
-            # Find the actual product with this name (case insensitive match needed technically, but let's loop)
-            target_product = next((p for p in products if p.name.lower() == matched_name), None)
-            
-            if target_product:
-                image_url = f"/static/images/{filename}"
-                print(f"Vinculando '{filename}' -> Produto: '{target_product.name}'")
-                target_product.image_url = image_url
-                updated_count += 1
-        else:
+
+def link_images(dry_run=False, min_score=MIN_SCORE, tenant=DEFAULT_TENANT_SLUG):
+    image_dir = os.path.join(STATIC_DIR, "images")
+    if not os.path.exists(image_dir):
+        print(f"Pasta '{image_dir}' não encontrada.")
+        return
+
+    image_files = sorted(
+        f for f in os.listdir(image_dir)
+        if f.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(os.path.join(image_dir, f))
+    )
+    print(f"Arquivos encontrados: {len(image_files)}")
+
+    db = SessionLocal()
+    try:
+        # Nomes só são comparados dentro do restaurante: o mesmo produto em dois não é ambíguo
+        tenant_id = db.execute(select(Tenant.id).where(Tenant.slug == tenant)).scalar_one_or_none()
+        if tenant_id is None:
+            print(f"Restaurante '{tenant}' não encontrado.")
+            return
+        products = db.execute(select(Product.id, Product.name, Product.image_url).where(Product.tenant_id == tenant_id)).all()
+        links, conflicts, unmatched = match_images(products, image_files, min_score)
+
+        current = {p.id: p for p in products}
+        changes = []
+        for product_id, (filename, score) in sorted(links.items()):
+            image_url = f"/static/images/{filename}"
+            if current[product_id].image_url == image_url:
+                continue
+            print(f"Vinculando '{filename}' -> Produto: '{current[product_id].name}' (confiança {score:.2f})")
+            changes.append({"id": product_id, "image_url": image_url})
+
+        for line in conflicts:
+            print(line)
+        for filename in unmatched:
             print(f"Sem correspondência para: {filename}")
 
-    db.commit()
-    print(f"Total de produtos atualizados: {updated_count}")
-    db.close()
+        if dry_run or not changes:
+            print(f"Produtos a atualizar: {len(changes)}" + (" (dry run, nada foi gravado)" if dry_run else ""))
+            return
+
+        # UPDATE em lote pela chave primária: um único comando para todos os vínculos
+        db.execute(update(Product), changes)
+        db.commit()
+        notify_menu_changed(tenant_id)
+        print(f"Total de produtos atualizados: {len(changes)}")
+    finally:
+        db.close()
 
 if __name__ == "__main__":
-    link_images()
+    parser = argparse.ArgumentParser(description="Vincula as fotos de static/images aos produtos pelo nome.")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra os vínculos e conflitos")
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE, help="confiança mínima (0 a 1)")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT_SLUG, help="slug do restaurante (padrão: %(default)s)")
+    args = parser.parse_args()
+    link_images(dry_run=args.dry_run, min_score=args.min_score, tenant=args.tenant)
@@ -1,30 +1,59 @@
 # Reset deploy trigger: 2026-02-15 03:22
-from fastapi import FastAPI, Depends, Request, HTTPException
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from fastapi import FastAPI, Depends, Query, Request, HTTPException
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import os
 import logging
 
-from database import SessionLocal, engine
+from database import POOL_PROFILE, async_engine, async_write_engine, engine, get_async_db, pool_status
+import api
+import kitchen
+import migrate_orders
+import migrate_tenants
+import menu_cache
+import metrics
+import orders
+import profiling
+import search
+import tenants
+from bus import bus
+from events import broadcaster
+from assets import STATIC_DIR, AssetStaticFiles
+from compression import choose_encoding
+from menu_page import render_menu_page
 from models import Base, Category, Product
+from tenants import TenantConfig, get_tenant, tenant_base_path
 
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Optional, Union
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Classe utilitária para Categorias Virtuais (Backend Specialist Pattern)
-class VirtualCategory:
-    def __init__(self, id: Union[int, str], name: str):
-        self.id = id
-        self.name = name
-
 app = FastAPI(title="Sua Empresa")
-
-# Montagem de arquivos estáticos (servindo tudo da raiz)
-app.mount("/static", StaticFiles(directory="."), name="static")
+app.add_middleware(metrics.MetricsMiddleware)
+# Profiling por requisição (PROFILE_REQUESTS / PROFILE_TOKEN): desligado, nem é montado
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
+# Restaurante da requisição (prefixo /t/<slug> ou Host). Adicionado por último, roda
+# primeiro: as métricas já veem o root_path com o prefixo e não criam uma série por restaurante
+app.add_middleware(tenants.TenantMiddleware)
+app.include_router(api.router)
+app.include_router(orders.router)
+app.include_router(kitchen.router)
+app.include_router(search.router)
+
+# Arquivos estáticos: só o diretório de assets (nunca a raiz com o banco e o código),
+# com gzip/brotli em cache e URLs com fingerprint cacheadas por 1 ano
+app.mount("/static", AssetStaticFiles(directory=STATIC_DIR), name="static")
+
+# Consultas SQL por requisição (rotas usam os engines assíncronos; scripts, o síncrono)
+for _engine in {engine, async_engine.sync_engine, async_write_engine.sync_engine}:
+    metrics.instrument_engine(_engine)
+    if profiling.ENABLED:
+        profiling.instrument_engine(_engine)
 
 # Inicialização do Banco de Dados no Startup
 @app.on_event("startup")
@@ -33,598 +62,180 @@ def startup_db_client():
     try:
         # Tenta criar as tabelas se não existirem
         Base.metadata.create_all(bind=engine)
-        logger.info("✅ Banco de dados pronto.")
+        # create_all não adiciona colunas: bancos anteriores aos pedidos idempotentes
+        # e aos restaurantes (ex.: o campeao.db do repositório) ganham as que faltam.
+        # Idempotentes: não fazem nada num banco já migrado
+        migrate_orders.migrate_orders()
+        migrate_tenants.migrate_tenants()
+        # Índice de busca (FTS5 no SQLite, tsvector/pg_trgm no Postgres)
+        with engine.begin() as conn:
+            search.ensure_search_index(conn)
+            tenants.ensure_default_tenant(conn)
+        logger.info(f"✅ Banco de dados pronto (pool: {POOL_PROFILE}).")
     except Exception as e:
         logger.error(f"❌ ERRO CRÍTICO NA CONEXÃO: {e}")
 
-# Dependência para o banco de dados
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Eventos de outros workers (ou deste): invalida o cache local e repassa aos clientes SSE
+def handle_menu_event(event: dict):
+    # Sem "tenant" (reconexão do LISTEN, scripts que mexem em todos): vale para todos os restaurantes
+    tenant = event.get("tenant")
+    # Pedidos não mexem no cardápio: só acordam as telas da cozinha
+    if event.get("type") == "order":
+        kitchen.feed.notify(tenant)
+        return
+    # Restaurante criado ou alterado (menu.py tenant)
+    if event.get("type") == "tenants":
+        tenants.registry.invalidate()
+        return
+    if event.get("type") == "invalidate":
+        # Após reconexão do LISTEN os pedidos também podem ter mudado
+        kitchen.feed.notify(tenant)
+    menu_cache.invalidate(event.get("version"), tenant)
+    if event.get("type") in ("availability", "deleted"):
+        broadcaster.publish(event)
+
+@app.on_event("startup")
+async def startup_event_bus():
+    await bus.start(handle_menu_event)
+
+@app.on_event("shutdown")
+async def shutdown_event_bus():
+    await bus.stop()
+
+# Com METRICS_DIR, cada worker publica seus contadores para o /metrics somar
+@app.on_event("startup")
+async def startup_metrics():
+    if metrics.METRICS_DIR:
+        app.state.metrics_task = asyncio.create_task(metrics.snapshot_loop())
+
+@app.on_event("shutdown")
+async def shutdown_metrics():
+    task = getattr(app.state, "metrics_task", None)
+    if task:
+        task.cancel()
 
 # Rota Admin Toggle
 @app.post("/admin/toggle/{product_id}")
-async def toggle_product_availability(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def toggle_product_availability(product_id: int, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    product = await db.get(Product, product_id)
+    # Produto de outro restaurante: como se não existisse
+    if not product or product.tenant_id != tenant.id:
         raise HTTPException(status_code=404, detail="Product not found")
     
     product.is_available = not product.is_available
-    db.commit()
+    await db.commit()
+    version = menu_cache.bump_menu_version(tenant.id)
+    await bus.publish({"type": "availability", "id": product.id, "is_available": product.is_available, "version": version, "tenant": tenant.id})
     return {"status": "success", "is_available": product.is_available}
 
 @app.post("/admin/delete/{product_id}")
-async def delete_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    product = await db.get(Product, product_id)
+    if not product or product.tenant_id != tenant.id:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
+    version = menu_cache.bump_menu_version(tenant.id)
+    await bus.publish({"type": "deleted", "id": product_id, "version": version, "tenant": tenant.id})
     return {"status": "success", "message": "Product deleted"}
 
+# Pool de conexões: espera no checkout, conexões em uso e overflow
+@app.get("/admin/pool")
+async def database_pool_status():
+    return pool_status()
+
+# Métricas no formato do Prometheus: latência por rota, consultas por requisição, render, pool
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# Atualizações de disponibilidade em tempo real (Server-Sent Events)
+@app.get("/events/menu")
+async def menu_events(
+    request: Request,
+    since: Optional[int] = Query(default=None, ge=0, le=api.MAX_DB_INT),
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    # Last-Event-ID inválido (não numérico, "²", enorme) não é cursor: fica o ?since=
+    last_event_id = api.parse_id(request.headers.get("last-event-id", ""))
+    if last_event_id is not None:
+        since = last_event_id
+    return StreamingResponse(
+        broadcaster.stream(tenant.id, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # Helper to render Logo (SVG)
 def render_logo(size="md", classes=""):
     return ""
 
+async def load_subcategory_facets(db: AsyncSession, tenant_id: int) -> Dict[int, List[str]]:
+    # Uma consulta agrupada: sub-categorias existentes em cada categoria
+    result = await db.execute(
+        select(Product.category_id, Product.sub_category)
+        .where(Product.tenant_id == tenant_id, Product.sub_category.isnot(None), Product.sub_category != "")
+        .group_by(Product.category_id, Product.sub_category)
+        .order_by(Product.category_id, Product.sub_category)
+    )
+    facets: Dict[int, List[str]] = {}
+    for category_id, sub_category in result:
+        facets.setdefault(category_id, []).append(sub_category)
+    return facets
+
 @app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request, db: Session = Depends(get_db)):
-    tabs_btns_html: str = ""
-    tabs_content_html: str = ""
-    try:
-        # Order categories manually to guarantee the pyramid layout
-        all_categories = db.query(Category).all()
-        pref_order = {"Espetinho": 1, "Bebidas": 2, "Acompanhamentos": 3, "Drinks": 4}
-        categories = sorted(all_categories, key=lambda c: pref_order.get(c.name, 99))
-        
-        products = db.query(Product).all()
-        
-        # Pre-process data for the view
-        categories_data = []
-        
-        # Aba "Todos" no início
-        all_prods = products
-        # Usar classe utilitária formal em vez de type dynamic
-        all_cat = VirtualCategory(id="all", name="Todos")
-        categories_data.append({"category": all_cat, "products": all_prods})
-        
-        for cat in categories:
-            prods = [p for p in products if p.category_id == cat.id]
-            categories_data.append({"category": cat, "products": prods})
-        
-        # Default active tab (primeira é "Todos")
-        first_cat_id = "all"
-        
-        # Build tabs buttons HTML
-        tabs_btns_html = ""
-        for i, item in enumerate(categories_data):
-            cat = item['category']
-            is_active = (cat.id == first_cat_id)
-            btn_class = "bg-brand-orange text-white shadow-[0_5px_15px_rgba(255,107,0,0.2)]" if is_active else "text-neutral-400 hover:bg-brand-orange/10 hover:text-brand-orange"
-            
-            # Pyramid layout: Todos, Espetinho e Bebidas no topo (w-1/2 approx), outros base
-            if cat.name in ["Todos", "Espetinho", "Bebidas"]:
-                mobile_class = "w-[48%] md:w-auto"
+async def read_root(request: Request, cat: Optional[str] = None, sub: Optional[str] = None, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    # Mesmo restaurante pelo domínio próprio ou por /t/<slug>: links diferentes, páginas diferentes
+    base_path = tenant_base_path(request)
+    # Links diretos (QR code na mesa): ?cat=<id ou nome>&sub=<sub-categoria> carregam só essa fatia
+    # Id normalizado ("007" -> 7); "²" ou números fora do alcance do banco valem como nome
+    cat_id = api.parse_id(cat) if cat else None
+    if cat:
+        cache_key = f"{base_path}/?cat={cat_id if cat_id is not None else cat}&sub={sub or ''}"
+    else:
+        cache_key, sub = f"{base_path}/", None
+
+    # Cache hit: nenhuma consulta ao banco, bytes já codificados
+    page, stamp = menu_cache.get_page(cache_key, tenant.id)
+    metrics.menu_page_cache.inc("hit" if page is not None else "miss")
+    if page is None:
+        try:
+            all_categories = (await db.execute(select(Category).where(Category.tenant_id == tenant.id))).scalars().all()
+            facets = await load_subcategory_facets(db, tenant.id)
+            if cat:
+                category = next((c for c in all_categories if c.id == cat_id or c.name == cat), None)
+                # Link antigo/errado: manda para o cardápio completo em vez de guardar uma página vazia
+                if category is None or (sub and sub not in facets.get(category.id, [])):
+                    return RedirectResponse(f"{base_path}/", status_code=302)
+                query = select(Product).where(Product.category_id == category.id)
+                if sub:
+                    query = query.where(Product.sub_category == sub)
+                products = (await db.execute(query)).scalars().all()
+                selected = (category.id, sub)
             else:
-                mobile_class = "w-full md:w-auto"
-                
-            tabs_btns_html += f"""
-            <button onclick="switchTab('{cat.id}')" 
-                    id="tab-btn-{cat.id}"
-                    class="tab-btn {mobile_class} flex items-center justify-center text-[10px] md:text-xs font-bold uppercase tracking-wider px-2 md:px-8 py-3.5 md:py-4 rounded-lg transition-all duration-300 active:scale-95 shadow-sm {btn_class}">
-              {cat.name}
-            </button>
-            """
-
-        # Build items content HTML
-        tabs_content_html = ""
-        for item in categories_data:
-            cat = item['category']
-            prods = item['products']
-            is_active = (cat.id == first_cat_id)
-            content_class = "active" if is_active else ""
-            
-            subcat_filter_html = ""
-            if cat.name == 'Bebidas':
-                subcat_filter_html = """
-                <div class="flex flex-wrap gap-2 mb-10 reveal-on-scroll">
-                    <button onclick="filterSubCat('all')" class="subcat-btn active px-4 py-2 rounded-lg text-[10px] font-bold uppercase tracking-wider border border-brand-orange/20 transition-all bg-brand-orange text-white">Todos</button>
-                    <button onclick="filterSubCat('Cervejas')" class="subcat-btn px-4 py-2 rounded-lg text-[10px] font-bold uppercase tracking-wider border border-brand-orange/20 transition-all text-neutral-400 hover:bg-brand-orange/5">Cervejas</button>
-                    <button onclick="filterSubCat('Refrigerantes')" class="subcat-btn px-4 py-2 rounded-lg text-[10px] font-bold uppercase tracking-wider border border-brand-orange/20 transition-all text-neutral-400 hover:bg-brand-orange/5">Refrigerantes</button>
-                    <button onclick="filterSubCat('Águas')" class="subcat-btn px-4 py-2 rounded-lg text-[10px] font-bold uppercase tracking-wider border border-brand-orange/20 transition-all text-neutral-400 hover:bg-brand-orange/5">Águas</button>
-                </div>
-                """
-
-            products_grid_html = ""
-            for prod in prods:
-                is_avail = getattr(prod, 'is_available', True)
-                avail_class = "opacity-50 grayscale select-none" if not is_avail else ""
-                badge_class = "" if not is_avail else "hidden"
-                
-                # Resgate do nome da categoria original
-                cat_id = getattr(cat, 'id', None)
-                if cat_id == "all":
-                    original_cat = db.query(Category).filter(Category.id == prod.category_id).first()
-                    display_cat_name = original_cat.name if original_cat else ""
-                else:
-                    display_cat_name = getattr(cat, 'name', "")
-
-                # Image / Placeholder logic
-                if prod.image_url:
-                    img_content = f'<img src="{prod.image_url}" alt="{prod.name}" class="w-full h-full object-cover transition-transform duration-1000 group-hover:scale-110" />'
-                else:
-                    img_content = f"""
-                    <div class="w-full h-full bg-neutral-100 dark:bg-neutral-800 flex items-center justify-center border-2 border-dashed border-neutral-300 dark:border-neutral-700">
-                        <span class="font-bebas text-lg md:text-2xl text-neutral-400 dark:text-neutral-500 tracking-widest text-center px-4">FOTO DO SEU PRODUTO</span>
-                    </div>
-                    """
-
-                img_html = f"""
-                <div class="relative aspect-[4/3] overflow-hidden">
-                    {img_content}
-                    <div class="absolute inset-0 bg-gradient-to-t from-black/20 via-transparent to-transparent opacity-40"></div>
-                </div>
-                """
-                
-                admin_btn_color = "text-red-500" if is_avail else "text-green-500"
-
-                products_grid_html += f"""
-                <div id="product-card-{prod.id}" 
-                     class="product-card reveal-on-scroll group bg-white dark:bg-carbon/60 backdrop-blur-md border border-black/5 dark:border-white/5 overflow-hidden transition-all duration-1000 hover:shadow-[0_25px_50px_-12px_rgba(255,107,0,0.15)] hover:border-brand-orange/40 dark:hover:border-brand-orange/40 rounded-xl flex flex-col relative {avail_class}">
-                    <div class="absolute inset-0 pointer-events-none glass-shimmer opacity-30"></div>
-                    
-                    <div id="status-badge-{prod.id}" class="absolute top-2 left-2 z-20 px-2 py-0.5 rounded text-[8px] md:text-[10px] font-black uppercase tracking-widest shadow-lg transition-all {badge_class} bg-red-500 text-white">
-                        ESGOTADO
-                    </div>
-
-                    <div class="admin-only hidden absolute bottom-4 left-4 z-[30] flex gap-2">
-                        <button onclick="toggleAvailability({prod.id})" class="p-2 bg-neutral-100 dark:bg-neutral-800 rounded-lg shadow-xl border border-brand-orange/20 hover:scale-110 active:scale-95 transition-all group/admin-btn">
-                            <svg class="w-4 h-4 {admin_btn_color}" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M18.364 18.364A9 9 0 005.636 5.636m12.728 12.728A9 9 0 015.636 5.636m12.728 12.728L5.636 5.636" />
-                            </svg>
-                        </button>
-                        <button onclick="deleteProduct({prod.id}, '{prod.name}')" class="p-2 bg-red-50 dark:bg-red-900/30 rounded-lg shadow-xl border border-red-500/20 hover:scale-110 active:scale-95 transition-all text-red-500 hover:bg-red-500 hover:text-white group/delete-btn">
-                            <svg class="w-4 h-4" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M19 7l-.867 12.142A2 2 0 0116.138 21H7.862a2 2 0 01-1.995-1.858L5 7m5 4v6m4-6v6m1-10V4a1 1 0 00-1-1h-4a1 1 0 00-1 1v3M4 7h16" />
-                            </svg>
-                        </button>
-                    </div>
-
-                    {img_html}
-                    
-                    <div class="p-6 md:p-8 flex flex-col flex-grow">
-                        <div class="flex justify-between items-start mb-2">
-                            <span class="text-[8px] font-black uppercase tracking-[0.3em] text-brand-orange">{display_cat_name}</span>
-                            <span class="text-brand-orange font-bebas text-lg md:text-2xl ml-2">R$ {(prod.price or 0.0):.2f}</span>
-                        </div>
-                        <h4 class="font-bebas text-2xl md:text-3xl tracking-wide text-gray-900 dark:text-bone group-hover:text-brand-orange transition-colors line-clamp-1 mb-2">{prod.name}</h4>
-                        <p class="text-[10px] md:text-sm text-gray-500 dark:text-neutral-400 font-light leading-relaxed line-clamp-2">{prod.description or ""}</p>
-                    </div>
-                </div>
-                """
-
-            tabs_content_html += f"""
-            <div id="tab-content-{cat.id}" class="tab-content {content_class}">
-                <div class="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 md:gap-10">
-                    {products_grid_html}
-                </div>
-            </div>
-            """
-
-    except Exception as e:
-        logger.error(f"Erro ao carregar cardápio: {e}")
-        return HTMLResponse(content=f"Erro ao carregar o site: {e}", status_code=500)
-
-    logo_md = render_logo(size="md")
-    logo_sm = render_logo(size="sm")
-
-    html_content = f"""<!DOCTYPE html>
-    <html lang="pt-BR" class="scroll-smooth">
-    <head>
-        <meta charset="UTF-8" />
-        <meta name="viewport" content="width=device-width, initial-scale=1.0" />
-        <title>Sua Empresa | Cardápio Digital</title>
-        <!-- Version: 1.0.6 - Manual Sort Build -->
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-        <link href="https://fonts.googleapis.com/css2?family=Bebas+Neue&family=Montserrat:wght@300;400;600;700&display=swap" rel="stylesheet">
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script>
-          tailwind.config = {{
-            darkMode: 'class',
-            theme: {{
-              extend: {{
-                colors: {{
-                  'carbon': '#0a0a0a',
-                  'bone': '#e5e1d8',
-                  'brand-orange': '#FF6B00', 
-                  'brand-orange-light': '#FFF0E6', 
-                  'steak-gold': '#D4AF37',
-                  'smoke-grey': '#1A1A1A', 
-                  'dark-text': '#F3F4F6', 
-                  'medium-text': '#A1A1AA',
-                }},
-                fontFamily: {{
-                  bebas: ['"Bebas Neue"', 'cursive'],
-                  montserrat: ['Montserrat', 'sans-serif'],
-                }},
-                animation: {{ 'shimmer': 'shimmer 3s infinite linear', 'fadeIn': 'fadeIn 0.5s ease-out' }},
-                keyframes: {{
-                  shimmer: {{ '0%': {{ transform: 'translateX(-100%)' }}, '100%': {{ transform: 'translateX(100%)' }} }},
-                  fadeIn: {{ '0%': {{ opacity: '0', transform: 'translateY(10px)' }}, '100%': {{ opacity: '1', transform: 'translateY(0)' }} }}
-                }}
-              }}
-            }}
-          }}
-        </script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.2/gsap.min.js"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/gsap/3.12.2/ScrollTrigger.min.js"></script>
-        <style>
-          .glass-shimmer::after {{ content: ''; position: absolute; top: 0; left: -100%; width: 50%; height: 100%; background: linear-gradient(to right, transparent, rgba(255, 255, 255, 0.4), transparent); transform: skewX(-25deg); animation: shimmer 4s infinite; }}
-          .tab-content {{ display: none; }}
-          .tab-content.active {{ display: block; }}
-          
-          /* Aurora Boreal Effect */
-          /* EMBERS ANIMATION */
-          .embers-container {{
-            position: fixed;
-            top: 0;
-            left: 0;
-            width: 100%;
-            height: 100%;
-            pointer-events: none;
-            z-index: 1;
-            background: radial-gradient(circle at bottom, rgba(255,107,0,0.05) 0%, transparent 70%);
-          }}
-          
-          .ember {{
-            position: absolute;
-            bottom: -20px;
-            background: #FF6B00;
-            border-radius: 50%;
-            filter: blur(1px);
-            opacity: 0.6;
-            animation: rise linear infinite;
-          }}
-
-          @keyframes rise {{
-            0% {{ transform: translateY(0) scale(1); opacity: 0.6; }}
-            100% {{ transform: translateY(-100vh) scale(0.5); opacity: 0; }}
-          }}
-
-          .wood-texture {{
-            background-image: url('https://www.transparenttextures.com/patterns/dark-wood.png');
-            opacity: 0.05;
-          }}
-          
-          body {{ background-color: #ffffff; color: #1a1a1a; transition: background-color 0.5s ease, color 0.5s ease; }}
-          .dark body {{ background-color: #0a0a0a; color: #e5e1d8; }}
-          
-          .dark .rich-black-bg {{ background-color: #0a0a0a; }}
-          .dark .dark-text-color {{ color: #e5e1d8; }}
-          .dark .nav-glass {{ background-color: rgba(10, 10, 10, 0.8); border-color: rgba(255, 255, 255, 0.05); }}
-          
-          /* Hide scrollbar for Chrome, Safari and Opera */
-          .no-scrollbar::-webkit-scrollbar {{ display: none; }}
-          /* Hide scrollbar for IE, Edge and Firefox */
-          .no-scrollbar {{ -ms-overflow-style: none; scrollbar-width: none; }}
-        </style>
-        <script>
-            function applyTheme() {{
-                try {{
-                    const theme = localStorage.getItem('theme');
-                    const isDark = theme === 'dark' || (!theme && window.matchMedia('(prefers-color-scheme: dark)').matches);
-                    if (isDark) {{
-                        document.documentElement.classList.add('dark');
-                    }} else {{
-                        document.documentElement.classList.remove('dark');
-                    }}
-                }} catch (e) {{
-                    console.error('Theme apply error:', e);
-                }}
-            }}
-            applyTheme();
-        </script>
-    </head>
-    <body class="font-montserrat overflow-x-hidden selection:bg-brand-orange selection:text-white transition-colors duration-500 bg-white text-[#1a1a1a] dark:bg-carbon dark:text-bone">
-        
-        <!-- EMBERS BACKGROUND -->
-        <div class="embers-container" id="embers"></div>
-        <div class="fixed inset-0 wood-texture pointer-events-none z-[1]"></div>
-
-        <nav class="fixed top-0 left-0 w-full z-[100] bg-white/80 dark:bg-carbon/80 backdrop-blur-xl border-b border-black/5 dark:border-white/5 py-3 md:py-4 px-6 md:px-12 flex justify-between items-center shadow-sm transition-colors duration-300">
-          <div onclick="window.scrollTo({{top: 0, behavior: 'smooth'}})" class="flex items-center gap-3 group cursor-pointer relative z-[110]">
-            <div class="flex flex-col">
-              <span class="font-bebas text-xl md:text-2xl tracking-wider leading-none text-white transition-colors group-hover:text-brand-orange">Sua Empresa</span>
-              <span class="text-[9px] md:text-[10px] text-brand-orange tracking-[0.2em] font-bold uppercase leading-none mt-1">Cardápio Digital</span>
-            </div>
-          </div>
-          <div class="flex gap-4 md:gap-10 items-center uppercase text-[11px] font-bold tracking-[0.3em] text-dark-text/80 dark:text-white/80">
-            <div class="hidden md:flex gap-10">
-              <a href="#hero" class="hover:text-brand-orange transition-all relative group">Início</a>
-              <a href="#menu" class="hover:text-brand-orange transition-all relative group">Cardápio</a>
-              <a href="#location" class="hover:text-brand-orange transition-all relative group">Localização</a>
-            </div>
-            <div class="relative">
-              <button onclick="toggleSettingsMenu()" class="p-2.5 bg-neutral-100 dark:bg-neutral-800 rounded-full hover:bg-neutral-200 dark:hover:bg-neutral-700 transition-all focus:outline-none"><svg class="w-5 h-5" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M10.325 4.317c.426-1.756 2.924-1.756 3.35 0a1.724 1.724 0 002.573 1.066c1.543-.94 3.31.826 2.37 2.37a1.724 1.724 0 001.065 2.572c1.756.426 1.756 2.924 0 3.35a1.724 1.724 0 00-1.066 2.573c.94 1.543-.826 3.31-2.37 2.37a1.724 1.724 0 00-2.572 1.065c-.426 1.756-2.924 1.756-3.35 0a1.724 1.724 0 00-2.573-1.066c-1.543.94-3.31-.826-2.37-2.37a1.724 1.724 0 00-1.065-2.572c-1.756-.426-1.756-2.924 0-3.35a1.724 1.724 0 001.066-2.573c-.94-1.543.826-3.31 2.37-2.37.996.608 2.296.07 2.572-1.065z" /><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M15 12a3 3 0 11-6 0 3 3 0 016 0z" /></svg></button>
-              <div id="settings-menu" class="absolute right-0 mt-3 w-56 bg-white dark:bg-neutral-900 border border-neutral-200 dark:border-neutral-800 rounded-2xl shadow-2xl p-4 opacity-0 invisible transition-all z-[200]">
-                <div class="flex items-center justify-between p-2 hover:bg-neutral-100 dark:hover:bg-neutral-800 rounded-xl cursor-pointer" onclick="toggleDarkMode()">
-                  <span class="text-xs font-semibold text-neutral-900 dark:text-neutral-100">Modo Escuro</span>
-                  <div class="w-10 h-5 bg-neutral-200 dark:bg-neutral-700 rounded-full relative"><div id="theme-toggle-indicator" class="absolute top-1 left-1 w-3 h-3 bg-brand-orange rounded-full transition-all dark:translate-x-5"></div></div>
-                </div>
-                <div class="h-[1px] bg-neutral-100 dark:bg-neutral-800 my-2"></div>
-                <div id="admin-login-section" class="flex items-center justify-between p-2 hover:bg-neutral-100 dark:hover:bg-neutral-800 rounded-xl cursor-pointer" onclick="showAdminLogin()"><span class="text-xs font-semibold text-neutral-900 dark:text-neutral-100">Admin</span></div>
-                <div id="admin-active-section" class="hidden flex items-center justify-between p-2 hover:bg-red-50 rounded-xl cursor-pointer" onclick="logoutAdmin()"><span class="text-xs font-semibold text-red-600">Sair Admin</span></div>
-              </div>
-            </div>
-          </div>
-        </nav>
-        
-        <div id="admin-modal" class="fixed inset-0 z-[200] hidden bg-black/80 backdrop-blur-md flex items-center justify-center p-6">
-            <div class="bg-neutral-900 w-full max-w-md rounded-3xl p-8 shadow-2xl border border-brand-orange/20">
-                <h3 class="font-bebas text-4xl mb-2 text-brand-orange uppercase tracking-widest">Acesso Restrito</h3>
-                <p class="text-neutral-400 text-xs mb-8 uppercase tracking-widest font-bold">Portal do Mestre Churrasqueiro</p>
-                <input type="password" id="admin-password" placeholder="••••••" onkeydown="if(event.key==='Enter') attemptAdminLogin()" class="w-full bg-neutral-800 border border-white/5 rounded-2xl p-5 text-center text-3xl mb-8 focus:border-brand-orange/50 focus:outline-none transition-all placeholder:opacity-20 text-white">
-                <div class="flex gap-4">
-                    <button onclick="closeAdminModal()" class="flex-1 font-bold text-neutral-500 hover:text-white transition-colors uppercase tracking-widest text-xs">Voltar</button>
-                    <button onclick="attemptAdminLogin()" class="flex-1 bg-brand-orange text-white py-4 rounded-2xl font-bold uppercase tracking-widest text-xs shadow-lg shadow-brand-orange/20 hover:scale-[1.02] active:scale-95 transition-all">Desbloquear</button>
-                </div>
-            </div>
-        </div>
-
-        <section id="hero" class="relative min-h-screen flex items-center justify-center pt-24 overflow-hidden">
-            <div class="absolute inset-0 z-0">
-                <img src="https://images.unsplash.com/photo-1594041680534-e8c8cdebd679?auto=format&fit=crop&q=80&w=2000" class="w-full h-full object-cover opacity-40" />
-                <div class="absolute inset-0 bg-gradient-to-t from-neutral-950 via-neutral-900/60 to-transparent"></div>
-            </div>
-            <div class="relative z-10 container mx-auto px-6 text-center">
-                <h1 class="font-bebas text-[clamp(2.5rem,12vw,8rem)] leading-[0.85] mb-8 text-neutral-100"><span class="text-brand-orange">SUA EMPRESA</span></h1>
-                <p class="max-w-2xl mx-auto text-base md:text-2xl text-neutral-300 font-light mb-16">Qualidade e sabor em cada detalhe.</p>
-                <div class="flex flex-col items-center gap-4"><div class="h-20 w-[1px] bg-brand-orange"></div><span class="uppercase tracking-[0.4em] text-[10px] md:text-xs">Cardápio abaixo</span></div>
-            </div>
-        </section>
-
-        <section id="menu" class="py-24 relative bg-transparent">
-            <div class="container mx-auto px-4">
-                <div class="text-center mb-16">
-                   <h2 class="font-bebas text-5xl md:text-8xl mb-10 text-neutral-100 uppercase">Saboreie momentos em <span class="text-brand-orange">família.</span></h2>
-                    <div class="flex flex-wrap justify-center gap-2 bg-brand-orange/5 p-2 rounded-xl max-w-4xl mx-auto mb-12">
-                       {tabs_btns_html}
-                    </div>
-                </div>
-                {tabs_content_html}
-            </div>
-        </section>
-
-        <section id="location" class="py-32 bg-neutral-950 overflow-hidden relative">
-          <div class="container mx-auto px-6 relative z-10">
-            <div class="flex flex-col lg:flex-row gap-20 items-center">
-              <div class="w-full lg:w-1/2">
-                <h2 class="font-bebas text-6xl md:text-8xl mb-8">ONDE A <span class="text-brand-orange">BRASA</span> VIVE</h2>
-                <div class="grid grid-cols-1 sm:grid-cols-2 gap-12">
-                   <div class="flex gap-5 items-start"><div class="p-4 bg-brand-orange/5 rounded-2xl"><svg class="w-6 h-6 text-brand-orange" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path d="M17.657 16.657L13.414 20.9a1.998 1.998 0 01-2.827 0l-4.244-4.243a8 8 0 1111.314 0z" /><path d="M15 11a3 3 0 11-6 0 3 3 0 016 0z" /></svg></div><div><h4 class="font-bold uppercase text-[10px] tracking-[0.3em] mb-3">Endereço</h4><p class="text-sm">Rua x, 000<br/>Cidade x</p></div></div>
-                   <div class="flex gap-5 items-start"><div class="p-4 bg-brand-orange/5 rounded-2xl"><svg class="w-6 h-6 text-brand-orange" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z" /></svg></div><div><h4 class="font-bold uppercase text-[10px] tracking-[0.3em] mb-3">Horário</h4><p class="text-sm">Segunda a Sábado<br/>17:30 às 22:30</p></div></div>
-                </div>
-              </div>
-              <div class="w-full lg:w-1/2 h-[500px] shadow-2xl rounded-3xl overflow-hidden bg-brand-orange/5 flex items-center justify-center border-4 border-dashed border-brand-orange/20">
-                <p class="font-bebas text-2xl text-brand-orange opacity-50 uppercase tracking-widest text-center px-10">Localização Privada<br/><span class="text-xs font-montserrat">Mapa removido por segurança</span></p>
-              </div>
-            </div>
-          </div>
-        </section>
-
-        <footer class="bg-neutral-950 border-t border-white/5 py-16 px-6 text-center">
-           <div class="container mx-auto flex flex-col items-center gap-10">
-              <div class="text-center">
-                 <p class="font-bold uppercase tracking-[0.4em] mb-4">Aberto para você</p>
-                 <p class="text-neutral-500 text-xs font-medium">Contatos: xxxx-xxxx<br/>© 2026</p>
-              </div>
-           </div>
-        </footer>
-
-        <script>
-            function toggleSettingsMenu() {{
-                const menu = document.getElementById('settings-menu');
-                menu.classList.toggle('opacity-0');
-                menu.classList.toggle('invisible');
-            }}
-
-            // Close menu when clicking outside
-            document.addEventListener('click', (e) => {{
-                const btn = document.querySelector('button[onclick="toggleSettingsMenu()"]');
-                const menu = document.getElementById('settings-menu');
-                if (btn && menu && !btn.contains(e.target) && !menu.contains(e.target)) {{
-                    menu.classList.add('opacity-0', 'invisible');
-                }}
-            }});
-
-            function toggleDarkMode() {{
-                const html = document.documentElement;
-                if (html.classList.contains('dark')) {{
-                    localStorage.setItem('theme', 'light');
-                }} else {{
-                    localStorage.setItem('theme', 'dark');
-                }}
-                applyTheme();
-                // Auto-close menu for better UX
-                const menu = document.getElementById('settings-menu');
-                if (menu) {{
-                    menu.classList.add('opacity-0', 'invisible');
-                }}
-            }}
-
-            const ADMIN_TOKEN = "admin_logged_in";
-            function showAdminLogin() {{ document.getElementById('admin-modal').classList.remove('hidden'); document.getElementById('admin-password').focus(); }}
-            function closeAdminModal() {{ document.getElementById('admin-modal').classList.add('hidden'); document.getElementById('admin-password').value = ''; }}
-            function attemptAdminLogin() {{
-                if (document.getElementById('admin-password').value === "230923") {{
-                    localStorage.setItem(ADMIN_TOKEN, "true");
-                    updateAdminUI(); closeAdminModal();
-                }} else alert("Código incorreto!");
-            }}
-            function logoutAdmin() {{ localStorage.removeItem(ADMIN_TOKEN); location.reload(); }}
-            function updateAdminUI() {{
-                if (localStorage.getItem(ADMIN_TOKEN) === "true") {{
-                    document.getElementById('admin-login-section').classList.add('hidden');
-                    document.getElementById('admin-active-section').classList.remove('hidden');
-                    document.querySelectorAll('.admin-only').forEach(el => el.classList.remove('hidden'));
-                }}
-            }}
-
-            async function toggleAvailability(id) {{
-                const btn = event.currentTarget;
-                const originalContent = btn.innerHTML;
-                
-                // Add loading state
-                btn.disabled = true;
-                btn.innerHTML = '<svg class="w-4 h-4 animate-spin text-brand-orange" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg>';
-                
-                try {{
-                    const res = await fetch(`/admin/toggle/${{id}}`, {{ method: 'POST' }});
-                    const data = await res.json();
-                    if (data.status === 'success') {{
-                        const card = document.getElementById(`product-card-${{id}}`);
-                        const badge = document.getElementById(`status-badge-${{id}}`);
-                        if (data.is_available) {{ 
-                            card.classList.remove('opacity-50', 'grayscale', 'select-none'); 
-                            badge.classList.add('hidden'); 
-                        }} else {{ 
-                            card.classList.add('opacity-50', 'grayscale', 'select-none'); 
-                            badge.classList.remove('hidden'); 
-                        }}
-                        // Update icon color based on state
-                        const iconColor = data.is_available ? 'text-red-500' : 'text-green-500';
-                        btn.innerHTML = `<svg class="w-4 h-4 ${{iconColor}}" fill="none" viewBox="0 0 24 24" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M18.364 18.364A9 9 0 005.636 5.636m12.728 12.728A9 9 0 015.636 5.636m12.728 12.728L5.636 5.636" /></svg>`;
-                    }}
-                }} catch (e) {{
-                    console.error("Toggle error:", e);
-                    btn.innerHTML = originalContent;
-                }} finally {{
-                    btn.disabled = false;
-                }}
-            }}
-
-            async function deleteProduct(id, name) {{
-                if (!confirm(`Tem certeza que deseja remover "${{name}}" permanentemente?`)) return;
-                
-                const btn = event.currentTarget;
-                const originalContent = btn.innerHTML;
-                
-                btn.disabled = true;
-                btn.innerHTML = '<svg class="w-4 h-4 animate-spin" xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24"><circle class="opacity-25" cx="12" cy="12" r="10" stroke="currentColor" stroke-width="4"></circle><path class="opacity-75" fill="currentColor" d="M4 12a8 8 0 018-8V0C5.373 0 0 5.373 0 12h4zm2 5.291A7.962 7.962 0 014 12H0c0 3.042 1.135 5.824 3 7.938l3-2.647z"></path></svg>';
-                
-                try {{
-                    const res = await fetch(`/admin/delete/${{id}}`, {{ method: 'POST' }});
-                    const data = await res.json();
-                    if (data.status === 'success') {{
-                        const card = document.getElementById(`product-card-${{id}}`);
-                        if (card) {{
-                            card.style.transform = 'scale(0.9)';
-                            card.style.opacity = '0';
-                            setTimeout(() => card.remove(), 500);
-                        }}
-                    }}
-                }} catch (e) {{
-                    console.error("Delete error:", e);
-                    alert("Erro ao remover produto.");
-                    btn.innerHTML = originalContent;
-                    btn.disabled = false;
-                }}
-            }}
-
-            function switchTab(id) {{
-                // Performance optimization: cache selections
-                const contents = document.querySelectorAll('.tab-content');
-                const btns = document.querySelectorAll('.tab-btn');
-                
-                contents.forEach(el => el.classList.remove('active'));
-                btns.forEach(el => {{
-                    el.classList.remove('bg-brand-orange', 'text-white', 'shadow-[0_5px_15px_rgba(255,107,0,0.2)]');
-                    el.classList.add('text-neutral-400', 'hover:bg-brand-orange/10', 'hover:text-brand-orange');
-                }});
-                
-                const activeBtn = document.getElementById('tab-btn-' + id);
-                if (activeBtn) {{
-                    activeBtn.classList.add('bg-brand-orange', 'text-white', 'shadow-[0_5px_15px_rgba(255,107,0,0.2)]');
-                    activeBtn.classList.remove('text-neutral-400', 'hover:bg-brand-orange/10', 'hover:text-brand-orange');
-                }}
-                
-                const activeContent = document.getElementById('tab-content-' + id);
-                if (activeContent) activeContent.classList.add('active');
-                
-                filterSubCat('all');
-            }}
-
-            function filterSubCat(s) {{
-                const btns = document.querySelectorAll('.subcat-btn');
-                const cards = document.querySelectorAll('.product-card');
-                
-                btns.forEach(b => {{
-                    const text = b.innerText.trim().toLowerCase();
-                    const isMatch = text === s.toLowerCase() || (s === 'all' && (text === 'todos'));
-                    if (isMatch) b.classList.add('bg-brand-orange', 'text-white');
-                    else b.classList.remove('bg-brand-orange', 'text-white');
-                }});
-                
-                cards.forEach(c => {{
-                    const subcat = c.getAttribute('data-subcat');
-                    c.style.display = (s === 'all' || subcat === s) ? 'flex' : 'none';
-                }});
-                
-                if (window.ScrollTrigger) ScrollTrigger.refresh();
-            }}
-
-            // Create Embers
-            function createEmbers() {{
-                const container = document.getElementById('embers');
-                if (!container) return;
-                
-                // Clear existing embers to avoid leaks
-                container.innerHTML = '';
-                
-                const fragment = document.createDocumentFragment();
-                const count = window.innerWidth < 768 ? 20 : 50;
-                
-                for (let i = 0; i < count; i++) {{
-                    const ember = document.createElement('div');
-                    ember.className = 'ember';
-                    
-                    const size = Math.random() * 3 + 1;
-                    const left = Math.random() * 100;
-                    const duration = Math.random() * 8 + 4;
-                    const delay = Math.random() * 10;
-                    
-                    ember.style.width = `${{size}}px`;
-                    ember.style.height = `${{size}}px`;
-                    ember.style.left = `${{left}}%`;
-                    ember.style.animationDuration = `${{duration}}s`;
-                    ember.style.animationDelay = `${{delay}}s`;
-                    
-                    fragment.appendChild(ember);
-                }}
-                container.appendChild(fragment);
-            }}
-
-            document.addEventListener("DOMContentLoaded", () => {{
-                if (window.gsap) {{
-                   gsap.registerPlugin(ScrollTrigger);
-                   gsap.utils.toArray('.reveal-on-scroll').forEach(s => gsap.fromTo(s, {{ y: 30, opacity: 0 }}, {{ y: 0, opacity: 1, duration: 1, scrollTrigger: {{ trigger: s, start: 'top 90%' }} }}));
-                }}
-                updateAdminUI();
-                createEmbers();
-            }});
-        </script>
-    </body>
-    </html>
-    """
-    return HTMLContent(html_content)
+                products = (await db.execute(select(Product).where(Product.tenant_id == tenant.id))).scalars().all()
+                selected = ()
+            with metrics.menu_render_duration.time(), profiling.phase("html"):
+                html_content = render_menu_page(all_categories, products, stamp[2], facets, *selected, tenant=tenant, base_path=base_path)
+        except Exception as e:
+            logger.error(f"Erro ao carregar cardápio: {e}")
+            return HTMLResponse(content=f"Erro ao carregar o site: {e}", status_code=500)
+        with profiling.phase("encode"):
+            page = menu_cache.store_page(cache_key, html_content.lstrip().encode("utf-8"), stamp, tenant.id)
+
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    # Revalidação: responde 304 sem escolher nem comprimir o corpo
+    if page.is_not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=page.variant_headers(encoding))
+    with profiling.phase("encode"):
+        body, headers = page.encoded(encoding)
+    return HTMLContent(body, headers=headers)
 
 class HTMLContent(HTMLResponse):
-    def __init__(self, content: str, status_code: int = 200):
+    def __init__(self, content: Union[str, bytes], status_code: int = 200, headers: Optional[Dict[str, str]] = None):
         # Limpeza agressiva de qualquer espaço ou caractere invisível no início do conteúdo
-        clean_content = content.lstrip()
+        # (bytes já chegam limpos do cache e podem estar comprimidos)
+        clean_content = content.lstrip() if isinstance(content, str) else content
         # Uso direto da classe base para evitar confusão do linter com super()
-        HTMLResponse.__init__(self, content=clean_content, status_code=status_code)
+        HTMLResponse.__init__(self, content=clean_content, status_code=status_code, headers=headers)
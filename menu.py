@@ -0,0 +1,434 @@
+"""Importa e exporta o cardápio (CSV, JSON ou YAML) e cadastra restaurantes.
+
+    python menu.py export cardapio.csv
+    python menu.py import cardapio.csv --dry-run
+    python menu.py import cardapio.csv --prune
+    python menu.py --tenant churrascaria import cardapio.csv
+    python menu.py tenant add churrascaria --name "Churrascaria X" --host cardapio.churrascariax.com.br
+    python menu.py tenant set churrascaria --branding marca.json
+    python menu.py tenant list
+
+A importação compara o arquivo com o cardápio inteiro do restaurante (duas
+consultas), mostra o plano e aplica tudo numa única transação com inserts/updates
+em lote. Produtos são identificados pelo id quando ele existe no restaurante,
+senão por categoria + nome. Sem --tenant vale o restaurante padrão.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from bus import bus, notify_menu_changed
+from database import engine
+from models import Base, Category, OrderItem, Product, Tenant
+from tenants import COLOR_KEYS, COLOR_PATTERN, DEFAULT_BRANDING, DEFAULT_TENANT_SLUG, SLUG_PATTERN, ensure_default_tenant, normalize_host
+
+# Colunas do arquivo, na ordem da exportação
+FIELDS = ("id", "category", "name", "description", "price", "sub_category", "image_url", "is_available")
+# Campos comparados e gravados em products (category vira category_id)
+PRODUCT_COLUMNS = ("name", "description", "price", "category_id", "sub_category", "image_url", "is_available")
+
+TRUE_VALUES = {"1", "true", "sim", "s", "yes", "y", "x"}
+FALSE_VALUES = {"0", "false", "nao", "não", "n", "no", ""}
+
+ProductKey = Tuple[str, str]
+
+
+class MenuFileError(Exception):
+    pass
+
+
+def file_format(path: str, explicit: Optional[str]) -> str:
+    fmt = explicit or os.path.splitext(path)[1].lstrip(".").lower()
+    fmt = "yaml" if fmt == "yml" else fmt
+    if fmt not in ("csv", "json", "yaml"):
+        raise MenuFileError(f"Formato desconhecido para {path}: use .csv, .json ou .yaml (ou --format)")
+    return fmt
+
+
+def load_yaml():
+    try:
+        import yaml
+    except ImportError:  # PyYAML é opcional: CSV e JSON funcionam sem ele
+        raise MenuFileError("Instale o PyYAML (pip install pyyaml) para usar arquivos YAML")
+    return yaml
+
+
+def read_rows(path: str, fmt: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            return list(csv.DictReader(f))
+        data = json.load(f) if fmt == "json" else load_yaml().safe_load(f)
+    # Aceita uma lista de produtos ou {"products": [...]}
+    if isinstance(data, dict):
+        data = data.get("products")
+    if not isinstance(data, list):
+        raise MenuFileError(f"{path}: esperava uma lista de produtos")
+    return data
+
+
+def write_rows(path: str, fmt: str, rows: List[dict]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        elif fmt == "json":
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        else:
+            load_yaml().safe_dump(rows, f, allow_unicode=True, sort_keys=False)
+
+
+def text_value(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_bool(value, line: int) -> bool:
+    if value is None or isinstance(value, bool):
+        return True if value is None else value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise MenuFileError(f"linha {line}: is_available inválido: {value!r}")
+
+
+def normalize(raw: dict, line: int) -> dict:
+    """Linha do arquivo -> produto com tipos do banco (levanta MenuFileError)."""
+    unknown = set(raw) - set(FIELDS)
+    if unknown:
+        raise MenuFileError(f"linha {line}: colunas desconhecidas: {', '.join(sorted(map(str, unknown)))}")
+    name = text_value(raw.get("name"))
+    category = text_value(raw.get("category"))
+    if not name or not category:
+        raise MenuFileError(f"linha {line}: name e category são obrigatórios")
+    price = text_value(raw.get("price"))
+    try:
+        # Aceita vírgula decimal (planilhas em pt-BR)
+        price = round(float(price.replace(",", ".")), 2) if price is not None else None
+    except ValueError:
+        raise MenuFileError(f"linha {line}: preço inválido: {raw.get('price')!r}")
+    if price is None or price < 0:
+        raise MenuFileError(f"linha {line}: preço obrigatório e não negativo")
+    product_id = text_value(raw.get("id"))
+    if product_id is not None and not product_id.isdigit():
+        raise MenuFileError(f"linha {line}: id inválido: {raw.get('id')!r}")
+    return {
+        "id": int(product_id) if product_id else None,
+        "category": category,
+        "name": name,
+        "description": text_value(raw.get("description")),
+        "price": price,
+        "sub_category": text_value(raw.get("sub_category")),
+        "image_url": text_value(raw.get("image_url")),
+        "is_available": parse_bool(raw.get("is_available"), line),
+    }
+
+
+def load_file(path: str, fmt: str) -> List[dict]:
+    products = []
+    seen: Dict[ProductKey, int] = {}
+    seen_ids: Dict[int, int] = {}
+    # CSV: a linha 1 é o cabeçalho
+    first_line = 2 if fmt == "csv" else 1
+    for line, raw in enumerate(read_rows(path, fmt), start=first_line):
+        if not isinstance(raw, dict):
+            raise MenuFileError(f"linha {line}: esperava um objeto com os campos do produto")
+        item = normalize(raw, line)
+        key = (item["category"].lower(), item["name"].lower())
+        if key in seen:
+            raise MenuFileError(f"linha {line}: produto repetido ({item['category']} / {item['name']}, linha {seen[key]})")
+        seen[key] = line
+        if item["id"] is not None:
+            if item["id"] in seen_ids:
+                raise MenuFileError(f"linha {line}: id {item['id']} repetido (linha {seen_ids[item['id']]})")
+            seen_ids[item["id"]] = line
+        products.append(item)
+    return products
+
+
+def tenant_id_for(conn, slug: str) -> int:
+    tenant_id = conn.execute(select(Tenant.id).where(Tenant.slug == slug)).scalar_one_or_none()
+    if tenant_id is None:
+        raise MenuFileError(f"Restaurante não encontrado: {slug} (veja python menu.py tenant list)")
+    return tenant_id
+
+
+def load_catalog(conn, tenant_id: int) -> Tuple[Dict[str, int], List[dict]]:
+    """Categorias (nome -> id) e todos os produtos do restaurante, em duas consultas."""
+    categories = {name: cid for cid, name in conn.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant_id))}
+    columns = [Product.id, *(getattr(Product, c) for c in PRODUCT_COLUMNS)]
+    products = [dict(row._mapping) for row in conn.execute(select(*columns).where(Product.tenant_id == tenant_id).order_by(Product.id))]
+    return categories, products
+
+
+def export_rows(categories: Dict[str, int], products: List[dict]) -> List[dict]:
+    names = {cid: name for name, cid in categories.items()}
+    return [
+        {
+            "id": p["id"],
+            "category": names.get(p["category_id"], ""),
+            "name": p["name"],
+            "description": p["description"],
+            "price": p["price"],
+            "sub_category": p["sub_category"],
+            "image_url": p["image_url"],
+            "is_available": p["is_available"] is not False,
+        }
+        for p in products
+    ]
+
+
+class Plan:
+    def __init__(self):
+        self.new_categories: List[str] = []
+        self.inserts: List[dict] = []
+        # (produto no banco, linha nova, campos alterados)
+        self.updates: List[Tuple[dict, dict, List[str]]] = []
+        self.deletes: List[dict] = []
+        # Removidos do arquivo mas presentes em pedidos: ficam indisponíveis em vez de apagados
+        self.retired: List[dict] = []
+
+    def is_empty(self) -> bool:
+        return not (self.new_categories or self.inserts or self.updates or self.deletes or self.retired)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.new_categories)} categorias novas, {len(self.inserts)} inserções, "
+            f"{len(self.updates)} alterações, {len(self.deletes)} remoções, {len(self.retired)} desativações"
+        )
+
+
+def plan_changes(conn, items: List[dict], prune: bool, tenant_id: int) -> Plan:
+    categories, current = load_catalog(conn, tenant_id)
+    category_ids = {name.lower(): cid for name, cid in categories.items()}
+    category_names = {cid: name for name, cid in categories.items()}
+    by_id = {p["id"]: p for p in current}
+    by_key = {(category_names.get(p["category_id"], "").lower(), (p["name"] or "").lower()): p for p in current}
+
+    plan = Plan()
+    for item in items:
+        if item["category"].lower() not in category_ids and item["category"] not in plan.new_categories:
+            plan.new_categories.append(item["category"])
+
+    matched = set()
+    for item in items:
+        existing = by_id.get(item["id"]) if item["id"] is not None else None
+        if existing is None:
+            existing = by_key.get((item["category"].lower(), item["name"].lower()))
+        if existing is None or existing["id"] in matched:
+            plan.inserts.append(item)
+            continue
+        matched.add(existing["id"])
+        # Categoria nova ainda não tem id (None): conta como alteração
+        row = dict(item, category_id=category_ids.get(item["category"].lower()))
+        changed = [c for c in PRODUCT_COLUMNS if row[c] != existing[c]]
+        if changed:
+            plan.updates.append((existing, item, changed))
+
+    if prune:
+        removed = [p for p in current if p["id"] not in matched]
+        referenced = set()
+        if removed:
+            referenced = set(conn.execute(
+                select(OrderItem.product_id).where(OrderItem.product_id.in_([p["id"] for p in removed])).distinct()
+            ).scalars())
+        for p in removed:
+            if p["id"] not in referenced:
+                plan.deletes.append(p)
+            elif p["is_available"] is not False:
+                plan.retired.append(p)
+    return plan
+
+
+def print_plan(plan: Plan, categories: Dict[int, str]) -> None:
+    for name in plan.new_categories:
+        print(f"+ categoria {name}")
+    for item in plan.inserts:
+        print(f"+ {item['category']} / {item['name']} (R$ {item['price']:.2f})")
+    for existing, item, changed in plan.updates:
+        details = []
+        for column in changed:
+            if column == "category_id":
+                details.append(f"category: {categories.get(existing['category_id'])} -> {item['category']}")
+            else:
+                details.append(f"{column}: {existing[column]!r} -> {item[column]!r}")
+        print(f"~ {existing['name']} (ID {existing['id']}): " + "; ".join(details))
+    for p in plan.deletes:
+        print(f"- {p['name']} (ID {p['id']})")
+    for p in plan.retired:
+        print(f"- {p['name']} (ID {p['id']}) tem pedidos: fica indisponível")
+
+
+def apply_plan(conn, plan: Plan, tenant_id: int) -> None:
+    """Executa o plano com um comando em lote por tipo de alteração."""
+    if plan.new_categories:
+        conn.execute(insert(Category), [{"name": name, "tenant_id": tenant_id} for name in plan.new_categories])
+    category_ids = {name.lower(): cid for cid, name in conn.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant_id))}
+
+    def values(item):
+        row = {c: item[c] for c in PRODUCT_COLUMNS if c != "category_id"}
+        row["category_id"] = category_ids[item["category"].lower()]
+        return row
+
+    if plan.inserts:
+        # Ids do arquivo não são reaproveitados: o banco numera os produtos novos
+        conn.execute(insert(Product), [dict(values(item), tenant_id=tenant_id) for item in plan.inserts])
+    if plan.updates:
+        # executemany com todas as colunas: um único UPDATE preparado para todos os produtos
+        stmt = (
+            update(Product.__table__)
+            .where(Product.__table__.c.id == bindparam("product_id"))
+            .values({c: bindparam(c) for c in PRODUCT_COLUMNS})
+        )
+        conn.execute(stmt, [dict(values(item), product_id=existing["id"]) for existing, item, _ in plan.updates])
+    if plan.deletes:
+        conn.execute(delete(Product).where(Product.id.in_([p["id"] for p in plan.deletes])))
+    if plan.retired:
+        conn.execute(update(Product).where(Product.id.in_([p["id"] for p in plan.retired])).values(is_available=False))
+
+
+def cmd_export(args) -> int:
+    fmt = file_format(args.file, args.format)
+    with engine.connect() as conn:
+        categories, products = load_catalog(conn, tenant_id_for(conn, args.tenant))
+    rows = export_rows(categories, products)
+    write_rows(args.file, fmt, rows)
+    print(f"{len(rows)} produtos exportados para {args.file}")
+    return 0
+
+
+def cmd_import(args) -> int:
+    items = load_file(args.file, file_format(args.file, args.format))
+    Base.metadata.create_all(bind=engine)
+    # Uma transação para o diff e a escrita: o plano aplicado é exatamente o exibido
+    with engine.begin() as conn:
+        ensure_default_tenant(conn)
+        tenant_id = tenant_id_for(conn, args.tenant)
+        plan = plan_changes(conn, items, args.prune, tenant_id)
+        categories = {cid: name for cid, name in conn.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant_id))}
+        print_plan(plan, categories)
+        print(plan.summary())
+        if plan.is_empty():
+            print("Nada a fazer: o banco já está igual ao arquivo.")
+            return 0
+        if args.dry_run:
+            print("Dry run: nada foi gravado.")
+            return 0
+        apply_plan(conn, plan, tenant_id)
+    version = notify_menu_changed(tenant_id)
+    print(f"Cardápio atualizado (versão {version}).")
+    return 0
+
+
+def read_branding(path: str) -> dict:
+    """Arquivo JSON/YAML com as chaves de tenants.DEFAULT_BRANDING; null remove a chave."""
+    fmt = file_format(path, None)
+    if fmt == "csv":
+        raise MenuFileError(f"{path}: branding precisa ser .json ou .yaml")
+    with open(path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f) if fmt == "json" else load_yaml().safe_load(f)
+    if not isinstance(data, dict):
+        raise MenuFileError(f"{path}: esperava um objeto com as chaves do branding")
+    unknown = set(data) - set(DEFAULT_BRANDING)
+    if unknown:
+        raise MenuFileError(f"{path}: chaves desconhecidas: {', '.join(sorted(map(str, unknown)))} (válidas: {', '.join(DEFAULT_BRANDING)})")
+    for key in COLOR_KEYS:
+        if data.get(key) is not None and not COLOR_PATTERN.match(str(data[key])):
+            raise MenuFileError(f"{path}: {key} precisa ser uma cor hexadecimal (ex.: #FF6B00)")
+    return data
+
+
+def cmd_tenant(args) -> int:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        ensure_default_tenant(conn)
+        if args.action == "list":
+            for t in conn.execute(select(Tenant).order_by(Tenant.id)).mappings():
+                print(f"{t['id']:4d} {t['slug']:24} {t['name']:32} {t['host'] or '-'}")
+            return 0
+
+        if not SLUG_PATTERN.match(args.slug):
+            raise MenuFileError(f"slug inválido: {args.slug!r} (letras minúsculas, números e hífen)")
+        current = conn.execute(select(Tenant).where(Tenant.slug == args.slug)).mappings().first()
+        if args.action == "add" and current is not None:
+            raise MenuFileError(f"Restaurante já existe: {args.slug} (use tenant set)")
+        if args.action == "set" and current is None:
+            raise MenuFileError(f"Restaurante não encontrado: {args.slug}")
+
+        values = {}
+        if args.name:
+            values["name"] = args.name
+        if args.host is not None:
+            # --host "" remove o domínio próprio
+            values["host"] = normalize_host(args.host) or None
+            owner = conn.execute(select(Tenant.slug).where(Tenant.host == values["host"])).scalar_one_or_none()
+            if values["host"] and owner not in (None, args.slug):
+                raise MenuFileError(f"O host {values['host']} já é do restaurante {owner}")
+        if args.branding:
+            branding = dict(current["branding"] or {}) if current is not None else {}
+            branding.update(read_branding(args.branding))
+            values["branding"] = {k: v for k, v in branding.items() if v is not None}
+
+        if current is None:
+            if not args.name:
+                raise MenuFileError("--name é obrigatório para um restaurante novo")
+            tenant_id = conn.execute(insert(Tenant).values(slug=args.slug, **values).returning(Tenant.id)).scalar_one()
+        else:
+            tenant_id = current["id"]
+            if values:
+                conn.execute(update(Tenant).where(Tenant.id == tenant_id).values(**values))
+    # Os workers recarregam a lista de restaurantes e a página sai com o branding novo
+    bus.publish_sync({"type": "tenants"})
+    notify_menu_changed(tenant_id)
+    print(f"Restaurante {args.slug} (id {tenant_id}) {'criado' if current is None else 'atualizado'}: /t/{args.slug}/")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importa e exporta o cardápio (CSV, JSON ou YAML) e cadastra restaurantes.")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT_SLUG, help="slug do restaurante (padrão: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="grava o cardápio atual em um arquivo")
+    export.add_argument("file")
+    export.add_argument("--format", choices=("csv", "json", "yaml"))
+    export.set_defaults(handler=cmd_export)
+
+    imp = sub.add_parser("import", help="sincroniza o banco com um arquivo")
+    imp.add_argument("file")
+    imp.add_argument("--format", choices=("csv", "json", "yaml"))
+    imp.add_argument("--dry-run", action="store_true", help="só mostra o plano")
+    imp.add_argument("--prune", action="store_true", help="remove produtos que não estão no arquivo")
+    imp.set_defaults(handler=cmd_import)
+
+    tenant = sub.add_parser("tenant", help="lista, cria ou altera restaurantes")
+    tenant_sub = tenant.add_subparsers(dest="action", required=True)
+    tenant_sub.add_parser("list", help="restaurantes cadastrados")
+    for action, help_text in (("add", "cadastra um restaurante"), ("set", "altera nome, host ou branding")):
+        p = tenant_sub.add_parser(action, help=help_text)
+        p.add_argument("slug", help="identificador na URL: /t/<slug>/")
+        p.add_argument("--name")
+        p.add_argument("--host", help="domínio próprio, sem porta (\"\" remove)")
+        p.add_argument("--branding", help="arquivo JSON/YAML com textos, cores e imagem da página")
+    tenant.set_defaults(handler=cmd_tenant)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except (MenuFileError, OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
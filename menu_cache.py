@@ -0,0 +1,216 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from compression import compress, variant_etag
+from models import DEFAULT_TENANT_ID
+
+# Arquivo compartilhado com a versão do cardápio. Os workers e os scripts de
+# manutenção rodam em processos diferentes, então a versão fica em disco
+# (ao lado do banco SQLite) e não no banco: um acerto de cache não faz
+# nenhuma consulta, apenas um os.stat(). Cada restaurante tem o seu arquivo
+# (ver version_file), então uma alteração não invalida os outros.
+MENU_VERSION_FILE = os.getenv("MENU_VERSION_FILE", ".menu_version")
+# Restaurantes com páginas em memória por processo; os menos acessados saem primeiro
+MENU_CACHE_TENANTS = int(os.getenv("MENU_CACHE_TENANTS", "200"))
+
+# A página é recomprimida a cada versão do cardápio: qualidade 11 do brotli
+# custa ~10x mais CPU para ganhar poucos por cento
+PAGE_BROTLI_QUALITY = 9
+
+# Estado do arquivo de versão (mtime_ns, inode, versão) + geração local do restaurante
+FileStamp = Tuple[int, int, int]
+VersionStamp = Tuple[int, int, int, int]
+
+
+class CachedPage:
+    """Página já renderizada e codificada, pronta para ser enviada."""
+
+    def __init__(self, body: bytes, version: int, modified_at: float):
+        self.body = body
+        self.version = version
+        # ETag forte derivado do conteúdo: igual em todos os workers
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = int(modified_at)
+        self.headers = {
+            "ETag": self.etag,
+            "Last-Modified": formatdate(self.last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        # codificação -> (corpo comprimido, cabeçalhos)
+        self._variants: Dict[str, Tuple[bytes, Dict[str, str]]] = {}
+
+    def variant_headers(self, encoding: Optional[str]) -> Dict[str, str]:
+        """Cabeçalhos da codificação negociada, sem comprimir (respostas 304)."""
+        if encoding is None:
+            return self.headers
+        variant = self._variants.get(encoding)
+        if variant is not None:
+            return variant[1]
+        headers = dict(self.headers, ETag=variant_etag(self.etag, encoding))
+        headers["Content-Encoding"] = encoding
+        return headers
+
+    def encoded(self, encoding: Optional[str]) -> Tuple[bytes, Dict[str, str]]:
+        """Corpo e cabeçalhos para a codificação negociada (comprime uma vez só)."""
+        if encoding is None:
+            return self.body, self.headers
+        variant = self._variants.get(encoding)
+        if variant is None:
+            variant = (compress(self.body, encoding, PAGE_BROTLI_QUALITY), self.variant_headers(encoding))
+            self._variants[encoding] = variant
+        return variant
+
+    def is_not_modified(self, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110)
+        if if_none_match is not None:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            # Aceita o ETag de qualquer variante (identidade, gzip ou br)
+            base = self.etag[:-1]
+            return "*" in tags or any(t.removeprefix("W/").startswith(base) for t in tags)
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return self.last_modified <= since
+        return False
+
+
+class _TenantPages:
+    """Páginas em cache e estado do arquivo de versão de um restaurante."""
+
+    def __init__(self, version_file: str):
+        self.version_file = version_file
+        self.pages: Dict[str, CachedPage] = {}
+        self.pages_stamp: Optional[VersionStamp] = None
+        self.last_stamp: Optional[FileStamp] = None
+        # Incrementada por invalidate() quando a mudança chega pelo barramento de eventos
+        self.generation = 0
+        self.invalidated_at = 0.0
+        # Maior Last-Modified já entregue (segundos inteiros)
+        self.last_modified = 0
+
+
+_lock = threading.Lock()
+# Restaurantes com páginas em memória, do menos para o mais recente (LRU)
+_tenants: "OrderedDict[int, _TenantPages]" = OrderedDict()
+
+
+def version_file(tenant: int) -> str:
+    # O restaurante padrão mantém o arquivo de antes dos tenants
+    return MENU_VERSION_FILE if tenant == DEFAULT_TENANT_ID else f"{MENU_VERSION_FILE}.{tenant}"
+
+
+def _state(tenant: int) -> _TenantPages:
+    # Chamado com _lock: um restaurante sem acessos sai da memória (e volta ao ser pedido)
+    state = _tenants.get(tenant)
+    if state is None:
+        state = _tenants[tenant] = _TenantPages(version_file(tenant))
+        while len(_tenants) > MENU_CACHE_TENANTS:
+            _tenants.popitem(last=False)
+    else:
+        _tenants.move_to_end(tenant)
+    return state
+
+
+def _read_stamp(state: _TenantPages) -> FileStamp:
+    try:
+        st = os.stat(state.version_file)
+    except FileNotFoundError:
+        return (0, 0, 0)
+
+    # Só relê o conteúdo quando o arquivo mudou (os.replace troca o inode)
+    if state.last_stamp is not None and state.last_stamp[:2] == (st.st_mtime_ns, st.st_ino):
+        return state.last_stamp
+    try:
+        with open(state.version_file, "r", encoding="utf-8") as f:
+            version = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        version = 0
+    state.last_stamp = (st.st_mtime_ns, st.st_ino, version)
+    return state.last_stamp
+
+
+def current_version(tenant: int = DEFAULT_TENANT_ID) -> int:
+    with _lock:
+        return _read_stamp(_state(tenant))[2]
+
+
+def _next_second(previous: float) -> float:
+    # Last-Modified/If-Modified-Since têm resolução de segundos: uma alteração no
+    # mesmo segundo da anterior precisa de um Last-Modified maior, senão quem tem
+    # a versão anterior recebe 304
+    return max(time.time(), int(previous) + 1)
+
+
+def _write_version(state: _TenantPages, version: int) -> None:
+    previous = max(_read_stamp(state)[0] / 1e9, state.last_modified)
+    tmp_path = f"{state.version_file}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(str(version))
+    # O mtime do arquivo é o Last-Modified de todos os workers da máquina
+    st = os.stat(tmp_path)
+    mtime_ns = max(st.st_mtime_ns, int(_next_second(previous) * 1e9))
+    os.utime(tmp_path, ns=(st.st_atime_ns, mtime_ns))
+    os.replace(tmp_path, state.version_file)
+
+
+def bump_menu_version(tenant: int = DEFAULT_TENANT_ID) -> int:
+    """Invalida o cardápio renderizado do restaurante em todos os processos desta máquina."""
+    with _lock:
+        state = _state(tenant)
+        version = _read_stamp(state)[2] + 1
+        _write_version(state, version)
+        state.pages.clear()
+    return version
+
+
+def invalidate(version: Optional[int] = None, tenant: Optional[int] = None) -> None:
+    """Descarta as páginas deste processo após um aviso do barramento de eventos.
+
+    Em outra máquina o arquivo de versão não muda: a geração local e o horário
+    da invalidação garantem que ETag/Last-Modified acompanhem a alteração.
+    Sem tenant (ex.: reconexão do barramento), descarta as de todos os restaurantes.
+    """
+    with _lock:
+        states = [_state(tenant)] if tenant is not None else list(_tenants.values())
+        for state in states:
+            state.generation += 1
+            state.invalidated_at = _next_second(state.last_modified)
+            state.pages.clear()
+        # Mantém a numeração alinhada com o worker que publicou o evento
+        if tenant is not None and version is not None and version > _read_stamp(states[0])[2]:
+            _write_version(states[0], version)
+
+
+def get_page(key: str, tenant: int = DEFAULT_TENANT_ID) -> Tuple[Optional[CachedPage], VersionStamp]:
+    """Retorna a página em cache (ou None) e o carimbo de versão observado.
+
+    O carimbo deve ser repassado para store_page: se o cardápio mudar durante
+    a renderização, a página gerada é descartada na próxima leitura.
+    """
+    with _lock:
+        state = _state(tenant)
+        stamp = _read_stamp(state) + (state.generation,)
+        if stamp != state.pages_stamp:
+            state.pages.clear()
+            state.pages_stamp = stamp
+        return state.pages.get(key), stamp
+
+
+def store_page(key: str, body: bytes, stamp: VersionStamp, tenant: int = DEFAULT_TENANT_ID) -> CachedPage:
+    with _lock:
+        state = _state(tenant)
+        # Sem arquivo de versão o cardápio nunca foi alterado por aqui
+        modified_at = max(stamp[0] / 1e9 if stamp[0] else time.time(), state.invalidated_at)
+        page = CachedPage(body, stamp[2], modified_at)
+        state.last_modified = max(state.last_modified, page.last_modified)
+        if stamp == state.pages_stamp:
+            state.pages[key] = page
+    return page
@@ -0,0 +1,190 @@
+import json
+import os
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, StrictUndefined
+
+from assets import asset_url
+from image_variants import CARD_IMAGE_SIZES, image_sources, load_manifest
+from menu_cache import MENU_CACHE_TENANTS
+from models import DEFAULT_TENANT_ID, Category, Product
+from tenants import DEFAULT_TENANT_CONFIG, TenantConfig
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# Templates compilados uma vez por processo; o bytecode fica em disco para os
+# próximos workers/deploys não recompilarem. autoescape desligado: a saída
+# precisa continuar idêntica à das antigas f-strings.
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    bytecode_cache=FileSystemBytecodeCache(),
+    autoescape=False,
+    auto_reload=False,
+    undefined=StrictUndefined,
+)
+env.globals["image_sizes"] = CARD_IMAGE_SIZES
+
+page_template = env.get_template("menu/page.html")
+product_card_template = env.get_template("menu/product_card.html")
+
+# "client": cada card aparece uma vez e as abas são filtradas no navegador a partir
+# de um índice JSON (metade do HTML). "server": um bloco completo de cards por aba.
+TAB_MODE = os.getenv("MENU_TAB_MODE", "client")
+
+# Order categories manually to guarantee the pyramid layout
+PREF_ORDER = {"Espetinho": 1, "Bebidas": 2, "Acompanhamentos": 3, "Drinks": 4}
+
+
+# Classe utilitária para Categorias Virtuais (Backend Specialist Pattern)
+class VirtualCategory:
+    def __init__(self, id: Union[int, str], name: str):
+        self.id = id
+        self.name = name
+
+
+# Tudo o que entra no template do card, na ordem dos argumentos
+CARD_FIELDS = ("product_id", "name", "description", "price", "image_url", "available", "category_name", "sub_category", "sources")
+
+class CardCache:
+    """Cards já renderizados de um restaurante, pela tupla de dados que gerou cada um.
+
+    Quando o cardápio muda (ex.: um produto esgota) só os cards afetados são
+    renderizados de novo. Guarda a versão atual e a anterior; o resto sai da memória.
+    """
+
+    def __init__(self):
+        self.cards: Dict[Tuple, str] = {}
+        self.previous: Dict[Tuple, str] = {}
+        self.version: Optional[int] = None
+
+
+# Um CardCache por restaurante (cada um tem a sua versão do cardápio), limitado
+# como o cache de páginas: os restaurantes menos acessados saem primeiro
+_card_caches: "OrderedDict[int, CardCache]" = OrderedDict()
+
+
+def reset_card_cache() -> None:
+    _card_caches.clear()
+
+
+def card_cache(tenant_id: int) -> CardCache:
+    cache = _card_caches.get(tenant_id)
+    if cache is None:
+        cache = _card_caches[tenant_id] = CardCache()
+        while len(_card_caches) > MENU_CACHE_TENANTS:
+            _card_caches.popitem(last=False)
+    else:
+        _card_caches.move_to_end(tenant_id)
+    return cache
+
+
+def card_key(prod: Product, category_name: str, manifest: Dict[str, dict]) -> Tuple:
+    return (
+        prod.id,
+        prod.name,
+        prod.description or "",
+        f"{(prod.price or 0.0):.2f}",
+        # URL com fingerprint: muda quando o arquivo muda, o que também invalida o card
+        asset_url(prod.image_url) if prod.image_url else None,
+        bool(getattr(prod, "is_available", True)),
+        category_name,
+        prod.sub_category or "",
+        tuple(image_sources(prod.image_url, manifest)) if prod.image_url else (),
+    )
+
+
+def render_product_card(key: Tuple) -> str:
+    return product_card_template.render(dict(zip(CARD_FIELDS, key)))
+
+
+def product_cards(products: List[Product], category_names: Dict[int, str], menu_version: int, tenant_id: int = DEFAULT_TENANT_ID) -> List[str]:
+    cache = card_cache(tenant_id)
+    if menu_version != cache.version:
+        cache.previous, cache.cards, cache.version = cache.cards, {}, menu_version
+    manifest = load_manifest()
+    cards = []
+    for prod in products:
+        key = card_key(prod, category_names.get(prod.category_id, ""), manifest)
+        card = cache.cards.get(key)
+        if card is None:
+            card = cache.previous.get(key) or render_product_card(key)
+            cache.cards[key] = card
+        cards.append(card)
+    return cards
+
+
+def menu_index_json(ids_by_category: Dict[str, List[int]], products: List[Product], menu_slice: Optional[dict]) -> str:
+    """Índice compacto de pertencimento: categoria -> ids e sub-categoria -> ids."""
+    subs: Dict[str, List[int]] = {}
+    for prod in products:
+        if prod.sub_category:
+            subs.setdefault(prod.sub_category, []).append(prod.id)
+    index = {"cats": ids_by_category, "subs": subs, "slice": menu_slice}
+    # "</" dentro de <script> fecharia a tag antes da hora
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def render_menu_page(
+    all_categories: List[Category],
+    products: List[Product],
+    menu_version: int = 0,
+    facets: Optional[Dict[int, List[str]]] = None,
+    active_tab: Union[int, str] = "all",
+    active_sub: Optional[str] = None,
+    tab_mode: Optional[str] = None,
+    tenant: Optional[TenantConfig] = None,
+    base_path: str = "",
+) -> str:
+    """Monta a página do cardápio.
+
+    facets: sub-categorias de cada categoria (botões de filtro da aba).
+    active_tab/active_sub: link direto para uma fatia do cardápio; products deve
+    conter só os produtos dessa fatia. Fatias sempre usam as abas no cliente.
+    tenant/base_path: restaurante (branding) e prefixo dos links ("/t/<slug>").
+    """
+    tenant = tenant or DEFAULT_TENANT_CONFIG
+    categories = sorted(all_categories, key=lambda c: PREF_ORDER.get(c.name, 99))
+    # Mapa id -> nome para a aba "Todos" (evita uma consulta por produto)
+    category_names = {c.id: c.name for c in all_categories}
+    facets = facets or {}
+
+    # Cada card é renderizado uma única vez: o mesmo HTML entra na aba "Todos" e na
+    # aba da categoria (o nome exibido é o da categoria do produto nas duas)
+    all_cards = product_cards(products, category_names, menu_version, tenant.id)
+    by_category: Dict[int, List[str]] = {}
+    ids_by_category: Dict[str, List[int]] = {}
+    for prod, card in zip(products, all_cards):
+        by_category.setdefault(prod.category_id, []).append(card)
+        ids_by_category.setdefault(str(prod.category_id), []).append(prod.id)
+
+    # Aba "Todos" no início (ativa por padrão)
+    all_tab = VirtualCategory(id="all", name="Todos")
+    tabs = [(all_tab, all_cards, [])]
+    tabs += [(cat, by_category.get(cat.id, []), [(cat.id, facets[cat.id], False)] if facets.get(cat.id) else []) for cat in categories]
+
+    if active_tab != "all" or (tab_mode or TAB_MODE) == "client":
+        # Só o bloco "Todos", com as barras de sub-categoria de todas as abas; as
+        # demais abas filtram esses mesmos cards no navegador
+        bars = [(cat.id, facets[cat.id], cat.id != active_tab) for cat in categories if facets.get(cat.id)]
+        menu_slice = None if active_tab == "all" else {"cat": str(active_tab), "sub": active_sub}
+        menu_index = menu_index_json(
+            {str(cat.id): ids_by_category.get(str(cat.id), []) for cat in categories}, products, menu_slice
+        )
+        contents = [(all_tab, all_cards, bars)]
+    else:
+        menu_index = None
+        contents = tabs
+
+    # Uma única junção de strings para a página inteira: as abas e os cards são
+    # incluídos pelo próprio template (page.html -> tab_content.html)
+    return page_template.render(
+        tabs=tabs,
+        contents=contents,
+        menu_index=menu_index,
+        menu_version=menu_version,
+        active_tab=active_tab,
+        active_sub=active_sub,
+        brand=tenant.branding,
+        base_path=base_path,
+    )
@@ -0,0 +1,354 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from database import PoolStats, pool_status
+
+logger = logging.getLogger(__name__)
+
+# Latência das rotas e tempo de render, em segundos
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Duração de uma consulta SQL
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Consultas por requisição (0 = página servida do cache)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Com vários workers (uvicorn --workers / WEB_CONCURRENCY) cada processo tem os
+# próprios contadores e o scrape cai num worker qualquer. Com METRICS_DIR cada
+# worker grava um retrato a cada METRICS_SNAPSHOT_SECONDS e o /metrics soma todos.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_SNAPSHOT_SECONDS = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5"))
+
+Labels = Tuple[str, ...]
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def _labels(self, labels: Labels) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, labels))
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [(self.name, self._labels(labels), value) for labels, value in self._values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, value: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str) -> None:
+        self.inc(*labels, value=-1)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # contagem por faixa (não acumulada), soma, total
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, limit in enumerate(self.buckets):
+                if value <= limit:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        samples = []
+        for labels, counts, total, count in series:
+            pairs = self._labels(labels)
+            cumulative = 0
+            for limit, n in zip(self.buckets, counts):
+                cumulative += n
+                samples.append((self.name + "_bucket", pairs + (("le", _format_value(limit)),), cumulative))
+            samples.append((self.name + "_bucket", pairs + (("le", "+Inf"),), count))
+            samples.append((self.name + "_sum", pairs, total))
+            samples.append((self.name + "_count", pairs, count))
+        return samples
+
+
+registry: List[Metric] = []
+
+
+def _register(metric):
+    registry.append(metric)
+    return metric
+
+
+requests_total = _register(Counter(
+    "http_requests_total", "Requisições HTTP respondidas.", ("method", "route", "status")))
+request_duration = _register(Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP por rota.", LATENCY_BUCKETS, ("method", "route")))
+requests_in_flight = _register(Gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento (sem as conexões SSE)."))
+streams_open = _register(Gauge(
+    "http_event_streams_open", "Conexões SSE (/events/menu) abertas."))
+request_queries = _register(Histogram(
+    "http_request_db_queries", "Consultas SQL por requisição.", QUERY_COUNT_BUCKETS, ("route",)))
+request_db_duration = _register(Histogram(
+    "http_request_db_duration_seconds", "Tempo gasto em consultas SQL por requisição.", LATENCY_BUCKETS, ("route",)))
+query_duration = _register(Histogram(
+    "db_query_duration_seconds", "Duração de cada consulta SQL.", QUERY_BUCKETS))
+menu_render_duration = _register(Histogram(
+    "menu_render_duration_seconds", "Tempo de montar o HTML do cardápio (cache miss).", LATENCY_BUCKETS))
+menu_page_cache = _register(Counter(
+    "menu_page_cache_total", "Páginas do cardápio servidas do cache (hit) ou montadas (miss).", ("result",)))
+
+
+# Consultas da requisição atual: [quantidade, segundos]
+_request_db: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    query_duration.observe(elapsed)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # Consulta que falhou não chega ao after_cursor_execute: sem isso o início
+    # dela ficaria na pilha da conexão (e a próxima consulta mediria errado)
+    conn = exception_context.connection
+    if conn is not None and exception_context.statement is not None:
+        starts = conn.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Mede as consultas de um engine síncrono (para o assíncrono, passe .sync_engine)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_label(scope, root_path: str) -> str:
+    route = scope.get("route")
+    if route is not None:
+        # Modelo da rota ("/admin/toggle/{product_id}"), nunca o caminho com o id
+        return route.path
+    if scope.get("root_path", "") != root_path:
+        # Mount (ex.: /static)
+        return scope["root_path"][len(root_path):]
+    # 404: caminhos arbitrários não viram séries novas
+    return "other"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI puro: conta e cronometra cada requisição HTTP pela rota."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        root_path = scope.get("root_path", "")
+        status = 500
+        streaming = False
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        requests_in_flight.inc()
+
+        async def send_with_metrics(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # SSE fica aberta por horas: sai da latência e das requisições em andamento
+                if dict(message.get("headers", ())).get(b"content-type", b"").startswith(b"text/event-stream"):
+                    streaming = True
+                    requests_in_flight.dec()
+                    streams_open.inc()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _request_db.reset(token)
+            route = _route_label(scope, root_path)
+            requests_total.inc(scope["method"], route, str(status))
+            if streaming:
+                streams_open.dec()
+            else:
+                requests_in_flight.dec()
+                request_duration.observe(time.perf_counter() - start, scope["method"], route)
+                request_queries.observe(db[0], route)
+                request_db_duration.observe(db[1], route)
+
+
+def _pool_families() -> List[Tuple[str, str, str, List[Sample]]]:
+    """Estado dos pools (ver database.pool_status) no formato das outras métricas."""
+    status = pool_status()
+    pools = [("reader" if "writer" in status else "app", status)]
+    if "writer" in status:
+        pools.append(("writer", status["writer"]))
+    checked_out, waits, timeouts = [], [], []
+    for name, pool in pools:
+        label = (("pool", name),)
+        if "checked_out" in pool:
+            checked_out.append(("db_pool_checked_out", label, pool["checked_out"]))
+        # wait_buckets do PoolStats já são acumulados
+        for limit, count in zip(PoolStats.WAIT_BUCKETS, pool["wait_buckets"].values()):
+            waits.append(("db_pool_wait_seconds_bucket", label + (("le", _format_value(limit)),), count))
+        waits.append(("db_pool_wait_seconds_bucket", label + (("le", "+Inf"),), pool["checkouts"]))
+        waits.append(("db_pool_wait_seconds_sum", label, pool["wait_seconds_sum"]))
+        waits.append(("db_pool_wait_seconds_count", label, pool["checkouts"]))
+        timeouts.append(("db_pool_timeouts_total", label, pool["timeouts"]))
+    return [
+        ("db_pool_checked_out", "gauge", "Conexões do pool em uso.", checked_out),
+        ("db_pool_wait_seconds", "histogram", "Espera por uma conexão do pool (checkout).", waits),
+        ("db_pool_timeouts_total", "counter", "Checkouts que estouraram o pool_timeout.", timeouts),
+    ]
+
+
+def collect() -> List[Tuple[str, str, str, List[Sample]]]:
+    """(nome, tipo, ajuda, amostras) de todas as métricas deste processo."""
+    families = [(m.name, m.kind, m.help, m.samples()) for m in registry]
+    families.extend(_pool_families())
+    families.append(("process_workers", "gauge", "Workers somados nesta resposta.", [("process_workers", (), 1)]))
+    return families
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def write_snapshot() -> None:
+    path = _snapshot_path(os.getpid())
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(collect(), f)
+    os.replace(tmp, path)
+
+
+def _other_workers() -> Iterator[list]:
+    # Retratos de workers que pararam de atualizar (morreram/reiniciaram) são descartados
+    stale = time.time() - 3 * METRICS_SNAPSHOT_SECONDS
+    own = f"{os.getpid()}.json"
+    for name in os.listdir(METRICS_DIR):
+        if not name.endswith(".json") or name == own:
+            continue
+        path = os.path.join(METRICS_DIR, name)
+        try:
+            if os.path.getmtime(path) < stale:
+                os.remove(path)
+                continue
+            with open(path) as f:
+                yield json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def _merge(snapshots) -> List[Tuple[str, str, str, List[Sample]]]:
+    """Soma as amostras iguais (mesmo nome e labels) de todos os workers."""
+    families: Dict[str, Tuple[str, str, Dict[tuple, float]]] = {}
+    for snapshot in snapshots:
+        for name, kind, help, samples in snapshot:
+            _, _, merged = families.setdefault(name, (kind, help, {}))
+            for sample_name, labels, value in samples:
+                key = (sample_name, tuple(tuple(pair) for pair in labels))
+                merged[key] = merged.get(key, 0) + value
+    return [
+        (name, kind, help, [(sample_name, labels, value) for (sample_name, labels), value in merged.items()])
+        for name, (kind, help, merged) in families.items()
+    ]
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> bytes:
+    """Formato texto do Prometheus (text/plain; version=0.0.4)."""
+    snapshots = [collect()]
+    if METRICS_DIR:
+        snapshots.extend(_other_workers())
+    lines = []
+    for name, kind, help, samples in _merge(snapshots):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for sample_name, labels, value in samples:
+            if labels:
+                pairs = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                sample_name = f"{sample_name}{{{pairs}}}"
+            lines.append(f"{sample_name} {_format_value(value)}")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def snapshot_loop() -> None:
+    """Grava o retrato deste worker em METRICS_DIR até ser cancelada."""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    try:
+        while True:
+            try:
+                await asyncio.to_thread(write_snapshot)
+            except OSError as e:
+                logger.warning(f"Não foi possível gravar as métricas em {METRICS_DIR}: {e}")
+            await asyncio.sleep(METRICS_SNAPSHOT_SECONDS)
+    finally:
+        try:
+            os.remove(_snapshot_path(os.getpid()))
+        except OSError:
+            pass
@@ -0,0 +1,42 @@
+from sqlalchemy import inspect, text
+
+from database import engine
+from models import Base
+
+# Cria order_items e acrescenta as colunas/índices novos de orders em bancos já
+# existentes (create_all só cria tabelas novas, não adiciona colunas)
+def migrate_orders():
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    columns = [c["name"] for c in inspector.get_columns("orders")]
+    indexes = [i["name"] for i in inspector.get_indexes("orders")]
+
+    with engine.begin() as conn:
+        if "idempotency_key" in columns:
+            print("Column 'idempotency_key' already exists.")
+        else:
+            print("Adding 'idempotency_key' column to 'orders' table...")
+            conn.execute(text("ALTER TABLE orders ADD COLUMN idempotency_key VARCHAR"))
+            if "tenant_id" in columns:
+                conn.execute(text("CREATE UNIQUE INDEX uq_orders_tenant_idempotency_key ON orders (tenant_id, idempotency_key)"))
+            else:
+                # Banco anterior aos restaurantes: migrate_tenants troca pelo índice por restaurante
+                conn.execute(text("CREATE UNIQUE INDEX ix_orders_idempotency_key ON orders (idempotency_key)"))
+
+        if "change_seq" in columns:
+            print("Column 'change_seq' already exists.")
+        else:
+            print("Adding 'change_seq' column to 'orders' table...")
+            conn.execute(text("ALTER TABLE orders ADD COLUMN change_seq INTEGER"))
+            # Pedidos antigos entram no cursor na ordem em que foram criados
+            conn.execute(text("UPDATE orders SET change_seq = id"))
+            conn.execute(text("CREATE UNIQUE INDEX ix_orders_change_seq ON orders (change_seq)"))
+
+        if "ix_orders_status_created_at" not in indexes:
+            print("Creating index 'ix_orders_status_created_at'...")
+            conn.execute(text("CREATE INDEX ix_orders_status_created_at ON orders (status, created_at)"))
+    print("Migration successful!")
+
+if __name__ == "__main__":
+    migrate_orders()
@@ -0,0 +1,15 @@
+from database import engine
+from models import Base
+from search import ensure_search_index
+
+# Cria (ou reconstrói do zero) o índice de busca de produtos. O startup da
+# aplicação já cria o que faltar; isto serve para forçar a reconstrução.
+def migrate_search():
+    Base.metadata.create_all(bind=engine)
+    print(f"Rebuilding product search index ({engine.dialect.name})...")
+    with engine.begin() as conn:
+        ensure_search_index(conn, rebuild=True)
+    print("Migration successful!")
+
+if __name__ == "__main__":
+    migrate_search()
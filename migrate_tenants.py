@@ -0,0 +1,55 @@
+from sqlalchemy import inspect, text
+
+from database import engine
+from models import Base, DEFAULT_TENANT_ID
+from tenants import ensure_default_tenant
+
+TENANT_TABLES = ("categories", "products", "orders")
+
+# Cria a tabela tenants e acrescenta tenant_id a categories/products/orders em
+# bancos já existentes: tudo o que já estava no banco fica no restaurante padrão
+def migrate_tenants():
+    Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        # Antes das colunas: no Postgres a chave estrangeira exige o restaurante 1
+        ensure_default_tenant(conn)
+
+        for table in TENANT_TABLES:
+            columns = [c["name"] for c in inspector.get_columns(table)]
+            if "tenant_id" in columns:
+                print(f"Column 'tenant_id' already exists in '{table}'.")
+                continue
+            print(f"Adding 'tenant_id' column to '{table}' table...")
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN tenant_id INTEGER NOT NULL DEFAULT {DEFAULT_TENANT_ID} REFERENCES tenants (id)"
+            ))
+            conn.execute(text(f"CREATE INDEX ix_{table}_tenant_id ON {table} (tenant_id)"))
+
+        # Nome de categoria deixa de ser único no banco inteiro: passa a ser por restaurante
+        indexes = {i["name"]: i for i in inspector.get_indexes("categories")}
+        if indexes.get("ix_categories_name", {}).get("unique"):
+            print("Replacing unique index 'ix_categories_name' with 'uq_categories_tenant_name'...")
+            conn.execute(text("DROP INDEX ix_categories_name"))
+            conn.execute(text("CREATE INDEX ix_categories_name ON categories (name)"))
+        if "uq_categories_tenant_name" not in indexes:
+            conn.execute(text("CREATE UNIQUE INDEX uq_categories_tenant_name ON categories (tenant_id, name)"))
+
+        order_indexes = [i["name"] for i in inspector.get_indexes("orders")]
+        if "ix_orders_tenant_status_created_at" not in order_indexes:
+            print("Creating index 'ix_orders_tenant_status_created_at'...")
+            conn.execute(text("CREATE INDEX ix_orders_tenant_status_created_at ON orders (tenant_id, status, created_at)"))
+
+        # Idempotency-Key também passa a ser única por restaurante: a mesma chave
+        # em outro restaurante não pode bater no índice do banco inteiro
+        if "ix_orders_idempotency_key" in order_indexes:
+            print("Dropping unique index 'ix_orders_idempotency_key'...")
+            conn.execute(text("DROP INDEX ix_orders_idempotency_key"))
+        if "uq_orders_tenant_idempotency_key" not in order_indexes:
+            print("Creating index 'uq_orders_tenant_idempotency_key'...")
+            conn.execute(text("CREATE UNIQUE INDEX uq_orders_tenant_idempotency_key ON orders (tenant_id, idempotency_key)"))
+    print("Migration successful!")
+
+if __name__ == "__main__":
+    migrate_tenants()
@@ -1,20 +1,45 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Index, JSON, text
 from sqlalchemy.orm import relationship
 from database import Base
 from datetime import datetime
 
+# Restaurante de uma instalação com um só cliente (e dos dados anteriores aos tenants)
+DEFAULT_TENANT_ID = 1
+
+class Tenant(Base):
+    __tablename__ = "tenants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Identificador na URL: /t/<slug>/
+    slug = Column(String, unique=True, index=True, nullable=False)
+    name = Column(String, nullable=False)
+    # Domínio próprio do restaurante (sem porta), ex.: cardapio.restaurante.com.br
+    host = Column(String, unique=True, index=True, nullable=True)
+    # Textos, cores e imagem da página; chaves ausentes usam tenants.DEFAULT_BRANDING
+    branding = Column(JSON, nullable=True)
+
+def tenant_column():
+    return Column(Integer, ForeignKey("tenants.id"), nullable=False, index=True, default=DEFAULT_TENANT_ID, server_default=text(str(DEFAULT_TENANT_ID)))
+
 class Category(Base):
     __tablename__ = "categories"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
+    tenant_id = tenant_column()
+    name = Column(String, index=True)
     
     products = relationship("Product", back_populates="category")
 
+    __table_args__ = (
+        # Nomes de categoria se repetem entre restaurantes, nunca dentro de um
+        Index("uq_categories_tenant_name", "tenant_id", "name", unique=True),
+    )
+
 class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = tenant_column()
     name = Column(String, index=True)
     description = Column(String)
     price = Column(Float)
@@ -25,12 +50,47 @@ class Product(Base):
 
     category = relationship("Category", back_populates="products")
 
+# Fluxo de um pedido, na ordem em que os estados podem avançar
+ORDER_STATUSES = ["Pendente", "Preparando", "Pronto", "Entregue"]
+# Estados exibidos na tela da cozinha
+KITCHEN_STATUSES = ["Pendente", "Preparando"]
+
 class Order(Base):
     __tablename__ = "orders"
 
     id = Column(Integer, primary_key=True, index=True)
+    tenant_id = tenant_column()
     customer_name = Column(String)
     customer_phone = Column(String)
     total_amount = Column(Float)
     status = Column(String, default="Pendente") # Pendente, Preparando, Pronto, Entregue
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Chave enviada pelo cliente (Idempotency-Key): reenvios do mesmo pedido não duplicam.
+    # Única por restaurante (ver uq_orders_tenant_idempotency_key)
+    idempotency_key = Column(String, nullable=True)
+    # Cursor de alterações: recebe um número novo e crescente a cada inserção ou mudança de status
+    change_seq = Column(Integer, unique=True, index=True, nullable=True)
+
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Fila da cozinha: WHERE status IN (...) ORDER BY created_at
+        Index("ix_orders_status_created_at", "status", "created_at"),
+        # Fila da cozinha de um restaurante
+        Index("ix_orders_tenant_status_created_at", "tenant_id", "status", "created_at"),
+        # Dois restaurantes podem receber a mesma chave; o mesmo restaurante, não
+        Index("uq_orders_tenant_idempotency_key", "tenant_id", "idempotency_key", unique=True),
+    )
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"))
+    # Nome e preço copiados no momento do pedido: alterações no cardápio não mudam pedidos antigos
+    product_name = Column(String)
+    unit_price = Column(Float)
+    quantity = Column(Integer)
+
+    order = relationship("Order", back_populates="items")
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+
+from PIL import Image, features
+
+from database import SessionLocal
+from models import Product
+from bus import notify_all_menus_changed
+from assets import HASH_LENGTH, STATIC_DIR, STATIC_PREFIX, static_path
+from image_variants import OPTIMIZED_DIR, MANIFEST_PATH, VARIANT_WIDTHS, load_manifest
+
+QUALITY = {"avif": 55, "webp": 75}
+
+
+def slugify(name):
+    # Nomes sem acentos/espaços: evita problemas em srcset e em servidores de CDN
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def content_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+def available_formats():
+    return [fmt for fmt in ("avif", "webp") if features.check(fmt)]
+
+
+def optimize_image(source_path, formats=None):
+    """Gera as variantes redimensionadas de uma imagem e retorna a entrada do manifesto.
+
+    Pode ser chamada diretamente ao receber um upload.
+    """
+    formats = formats or available_formats()
+    os.makedirs(OPTIMIZED_DIR, exist_ok=True)
+    # Hash do conteúdo no nome: "Coca Cola.jpg" e "coca-cola.png" viram o mesmo slug,
+    # mas nunca compartilham variantes (e a foto trocada no lugar gera arquivos novos)
+    stem = f"{slugify(os.path.splitext(os.path.basename(source_path))[0])}-{content_hash(source_path)}"
+
+    with Image.open(source_path) as im:
+        im.load()
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA" if im.mode in ("P", "LA", "PA") else "RGB")
+        width, height = im.size
+
+        # Nunca amplia: a própria largura original entra como maior variante
+        widths = [w for w in VARIANT_WIDTHS if w < width] + [min(width, VARIANT_WIDTHS[-1])]
+
+        entry = {"width": width, "height": height, "variants": {}}
+        for fmt in formats:
+            entry["variants"][fmt] = []
+            for w in widths:
+                out_path = os.path.join(OPTIMIZED_DIR, f"{stem}-{w}.{fmt}")
+                # Reaproveita variantes já geradas a partir do mesmo conteúdo
+                if not os.path.exists(out_path):
+                    h = round(height * w / width)
+                    resized = im if w == width else im.resize((w, h), Image.LANCZOS)
+                    resized.save(out_path, fmt.upper(), quality=QUALITY[fmt])
+                url = STATIC_PREFIX + os.path.relpath(out_path, STATIC_DIR).replace(os.sep, "/")
+                entry["variants"][fmt].append([w, url])
+    return entry
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def optimize_images():
+    db = SessionLocal()
+    image_urls = {p.image_url for p in db.query(Product).all() if p.image_url}
+    db.close()
+
+    formats = available_formats()
+    print(f"Formatos disponíveis: {formats}")
+    manifest = dict(load_manifest())
+
+    for image_url in sorted(image_urls):
+        if static_path(image_url) is None:
+            # Imagens externas (ex.: unsplash) ficam como estão
+            continue
+        source_path = os.path.join(STATIC_DIR, static_path(image_url))
+        if not os.path.exists(source_path):
+            print(f"Arquivo não encontrado: {source_path}")
+            continue
+
+        entry = optimize_image(source_path, formats)
+        smallest_url = entry["variants"][formats[0]][0][1]
+        before = os.path.getsize(source_path)
+        after = os.path.getsize(os.path.join(STATIC_DIR, static_path(smallest_url)))
+        print(f"{source_path}: {before // 1024} KB -> {after // 1024} KB ({smallest_url})")
+        manifest[image_url] = entry
+
+    save_manifest(manifest)
+    notify_all_menus_changed()
+    print(f"Total de imagens otimizadas: {len(manifest)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Uso pontual: python optimize_images.py static/images/foto.png
+        manifest = dict(load_manifest())
+        for path in sys.argv[1:]:
+            manifest[STATIC_PREFIX + os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")] = optimize_image(path)
+        save_manifest(manifest)
+        notify_all_menus_changed()
+    else:
+        optimize_images()
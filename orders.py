@@ -0,0 +1,184 @@
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import func, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from bus import bus
+from database import get_async_db
+from models import ORDER_STATUSES, Order, OrderItem, Product
+from tenants import TenantConfig, get_tenant
+
+router = APIRouter(prefix="/api/orders", tags=["orders"])
+
+MAX_ITEMS_PER_ORDER = 100
+# Chave do advisory lock que serializa a numeração de change_seq no Postgres
+CHANGE_SEQ_LOCK = 0x6F726473
+
+
+class OrderItemIn(BaseModel):
+    product_id: int
+    quantity: int = Field(ge=1, le=99)
+    # Preço exibido ao cliente; se divergir do cardápio atual o pedido é recusado
+    unit_price: Optional[float] = None
+
+
+class OrderIn(BaseModel):
+    customer_name: str = Field(min_length=1, max_length=120)
+    customer_phone: str = Field(min_length=1, max_length=40)
+    items: List[OrderItemIn] = Field(min_length=1, max_length=MAX_ITEMS_PER_ORDER)
+
+
+class OrderStatusIn(BaseModel):
+    status: str
+
+
+def serialize_order(order: Order) -> dict:
+    return {
+        "id": order.id,
+        "customer_name": order.customer_name,
+        "customer_phone": order.customer_phone,
+        "status": order.status,
+        "total_amount": order.total_amount,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "items": [
+            {
+                "product_id": item.product_id,
+                "product_name": item.product_name,
+                "unit_price": item.unit_price,
+                "quantity": item.quantity,
+            }
+            for item in order.items
+        ],
+    }
+
+
+async def next_change_seq(db: AsyncSession):
+    """Próximo valor do cursor da cozinha, para usar dentro da transação de escrita.
+
+    No SQLite as escritas já são serializadas. No Postgres um advisory lock (solto
+    no commit) garante que os números são confirmados em ordem: um leitor nunca vê
+    o 11 antes de o 10 existir, então não perde alterações ao avançar o cursor.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CHANGE_SEQ_LOCK})
+    return select(func.coalesce(func.max(Order.change_seq), 0) + 1).scalar_subquery()
+
+
+async def notify_kitchen(order_id: int, tenant_id: int) -> None:
+    await bus.publish({"type": "order", "id": order_id, "tenant": tenant_id})
+
+
+async def find_order(db: AsyncSession, *criteria) -> Optional[Order]:
+    result = await db.execute(select(Order).options(selectinload(Order.items)).where(*criteria))
+    return result.scalar_one_or_none()
+
+
+@router.post("", status_code=201)
+async def create_order(
+    payload: OrderIn,
+    idempotency_key: Optional[str] = Header(default=None, max_length=100),
+    db: AsyncSession = Depends(get_async_db),
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    # Reenvio (duplo toque, rede instável): devolve o pedido já criado
+    if idempotency_key:
+        existing = await find_order(db, Order.idempotency_key == idempotency_key, Order.tenant_id == tenant.id)
+        if existing is not None:
+            return JSONResponse(serialize_order(existing), status_code=200)
+
+    # Soma linhas repetidas do mesmo produto
+    quantities: Dict[int, int] = {}
+    expected_prices: Dict[int, float] = {}
+    for item in payload.items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        if item.unit_price is not None:
+            expected_prices[item.product_id] = item.unit_price
+
+    # Uma única consulta valida todos os itens (produtos de outro restaurante contam como inexistentes)
+    result = await db.execute(
+        select(Product.id, Product.name, Product.price, Product.is_available)
+        .where(Product.id.in_(quantities), Product.tenant_id == tenant.id)
+    )
+    products = {row.id: row for row in result}
+    # Encerra a transação de leitura antes de escrever: no SQLite, promover uma
+    # leitura a escrita com outro escritor ativo falha na hora com "database is locked"
+    await db.rollback()
+
+    missing = sorted(set(quantities) - set(products))
+    if missing:
+        raise HTTPException(status_code=404, detail={"error": "product_not_found", "product_ids": missing})
+    unavailable = sorted(pid for pid, p in products.items() if p.is_available is False)
+    if unavailable:
+        raise HTTPException(status_code=409, detail={"error": "product_unavailable", "product_ids": unavailable})
+    changed = {
+        pid: products[pid].price
+        for pid, price in expected_prices.items()
+        if round(price, 2) != round(products[pid].price or 0.0, 2)
+    }
+    if changed:
+        raise HTTPException(status_code=409, detail={"error": "price_changed", "prices": changed})
+
+    items = [
+        OrderItem(product_id=pid, product_name=products[pid].name, unit_price=products[pid].price or 0.0, quantity=qty)
+        for pid, qty in quantities.items()
+    ]
+    order = Order(
+        tenant_id=tenant.id,
+        customer_name=payload.customer_name,
+        customer_phone=payload.customer_phone,
+        total_amount=round(sum(i.unit_price * i.quantity for i in items), 2),
+        status=ORDER_STATUSES[0],
+        idempotency_key=idempotency_key,
+        change_seq=await next_change_seq(db),
+        items=items,
+    )
+    db.add(order)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Duas requisições com a mesma chave ao mesmo tempo: a outra venceu
+        await db.rollback()
+        existing = await find_order(db, Order.idempotency_key == idempotency_key, Order.tenant_id == tenant.id) if idempotency_key else None
+        if existing is None:
+            raise
+        return JSONResponse(serialize_order(existing), status_code=200)
+    await notify_kitchen(order.id, tenant.id)
+    return serialize_order(order)
+
+
+@router.get("/{order_id}")
+async def get_order(order_id: int, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    order = await find_order(db, Order.id == order_id, Order.tenant_id == tenant.id)
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return serialize_order(order)
+
+
+@router.post("/{order_id}/status")
+async def update_order_status(order_id: int, payload: OrderStatusIn, db: AsyncSession = Depends(get_async_db), tenant: TenantConfig = Depends(get_tenant)):
+    if payload.status not in ORDER_STATUSES:
+        raise HTTPException(status_code=422, detail=f"Invalid status. Expected one of: {', '.join(ORDER_STATUSES)}")
+
+    # Pedidos só avançam (Pendente -> Preparando -> Pronto -> Entregue). Um único
+    # UPDATE condicional, sem SELECT ... FOR UPDATE: nenhuma trava fica presa entre
+    # leitura e escrita, e se outro tablet mudou antes o rowcount vem 0
+    earlier = ORDER_STATUSES[:ORDER_STATUSES.index(payload.status)]
+    result = await db.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.tenant_id == tenant.id, Order.status.in_(earlier))
+        .values(status=payload.status, change_seq=await next_change_seq(db))
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        current = (await db.execute(select(Order.status).where(Order.id == order_id, Order.tenant_id == tenant.id))).scalar_one_or_none()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(status_code=409, detail=f"Cannot move order from {current} to {payload.status}")
+    await db.commit()
+    await notify_kitchen(order_id, tenant.id)
+    return {"status": "success", "id": order_id, "order_status": payload.status}
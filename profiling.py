@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # opcional: só para PROFILE_REPORT=pyinstrument
+    PyinstrumentProfiler = None
+
+logger = logging.getLogger(__name__)
+
+# Modo de profiling, desligado por padrão:
+# PROFILE_REQUESTS=1 perfila todas as requisições; com PROFILE_TOKEN só as que
+# mandarem o cabeçalho "X-Profile: <token>" (admin em produção).
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "0") == "1"
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+# Relatório por requisição em PROFILE_DIR: "cprofile", "pyinstrument" ou vazio (só Server-Timing)
+PROFILE_REPORT = os.getenv("PROFILE_REPORT", "").lower()
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Trecho do SQL mais lento guardado no relatório
+STATEMENT_PREVIEW = 300
+
+ENABLED = PROFILE_REQUESTS or PROFILE_TOKEN is not None
+
+if ENABLED and PROFILE_REPORT == "pyinstrument" and PyinstrumentProfiler is None:
+    logger.warning("PROFILE_REPORT=pyinstrument, mas o pyinstrument não está instalado: só Server-Timing")
+
+
+class RequestProfile:
+    """Tempo por fase de uma requisição: SQL (via eventos do engine) e trechos marcados com phase()."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = ""
+
+    def add_query(self, seconds: float, statement: str) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self, total: float) -> str:
+        # Server-Timing aparece no DevTools (aba Network > Timing); total x TTFB = rede
+        entries = [f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"']
+        entries.extend(f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.phases.items())
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+    def summary(self, total: float) -> str:
+        lines = [
+            f"total: {total * 1000:.2f} ms",
+            f"db: {self.queries} consultas, {self.db_seconds * 1000:.2f} ms",
+        ]
+        if self.queries:
+            lines.append(f"  mais lenta ({self.slowest_seconds * 1000:.2f} ms): {self.slowest_statement[:STATEMENT_PREVIEW]}")
+        lines.extend(f"{name}: {seconds * 1000:.2f} ms" for name, seconds in self.phases.items())
+        return "\n".join(lines)
+
+
+_current: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("request_profile", default=None)
+_NO_PHASE = nullcontext()
+
+
+@contextmanager
+def _timed_phase(name: str) -> Iterator[None]:
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.phases[name] = profile.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def _no_phase(name: str):
+    return _NO_PHASE
+
+
+# Marca um trecho da requisição ("html", "encode"). Desligado, é um nullcontext compartilhado
+phase = _timed_phase if ENABLED else _no_phase
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["profile_query_start"].pop()
+    profile = _current.get()
+    if profile is not None:
+        profile.add_query(elapsed, statement)
+
+
+def instrument_engine(engine) -> None:
+    """Registra os eventos de SQL (só chamado com o profiling ligado)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class _ReportProfiler:
+    """cProfile ou pyinstrument em volta de uma requisição."""
+
+    # cProfile é global ao interpretador: uma requisição por vez, as outras ficam só com Server-Timing
+    _cprofile_lock = threading.Lock()
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._profiler = None
+
+    def start(self) -> bool:
+        if self.kind == "pyinstrument":
+            if PyinstrumentProfiler is None:
+                return False
+            # async_mode: só conta o tempo desta tarefa, não o das outras requisições
+            self._profiler = PyinstrumentProfiler(async_mode="enabled")
+            self._profiler.start()
+            return True
+        if not self._cprofile_lock.acquire(blocking=False):
+            return False
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return True
+
+    def stop(self) -> None:
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            return
+        self._profiler.disable()
+        self._cprofile_lock.release()
+
+    def write(self, base_path: str, header: str) -> str:
+        if self.kind == "pyinstrument":
+            report = self._profiler.output_text(unicode=True, show_all=False)
+        else:
+            self._profiler.dump_stats(base_path + ".prof")
+            out = io.StringIO()
+            pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            report = out.getvalue()
+        with open(base_path + ".txt", "w") as f:
+            f.write(header + "\n\n" + report)
+        return base_path + ".txt"
+
+
+_report_counter = itertools.count(1)
+
+
+def _report_base_path(scope) -> str:
+    slug = re.sub(r"[^0-9A-Za-z]+", "-", scope["path"]).strip("-") or "root"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_report_counter)}-{scope['method']}-{slug}"
+    return os.path.join(PROFILE_DIR, name)
+
+
+def _write_report(profiler: _ReportProfiler, scope, header: str) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = profiler.write(_report_base_path(scope), header)
+    logger.info(f"Profile de {scope['method']} {scope['path']} em {path}")
+
+
+class ProfilingMiddleware:
+    """Perfila as requisições escolhidas: Server-Timing na resposta e, opcionalmente, um relatório em disco.
+
+    Só é montado com o profiling ligado (ver ENABLED em main.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if PROFILE_REQUESTS:
+            return True
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return hmac.compare_digest(value, PROFILE_TOKEN.encode())
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = _ReportProfiler(PROFILE_REPORT) if PROFILE_REPORT else None
+        if profiler is not None and not profiler.start():
+            profiler = None
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            total = time.perf_counter() - start
+            _current.reset(token)
+            if profiler is not None:
+                profiler.stop()
+                header = f"{scope['method']} {scope['path']}?{scope['query_string'].decode()}\n{profile.summary(total)}"
+                try:
+                    await asyncio.to_thread(_write_report, profiler, scope, header)
+                except OSError as e:
+                    logger.warning(f"Não foi possível gravar o profile em {PROFILE_DIR}: {e}")
@@ -0,0 +1,201 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api import JSONBytes, dump_json, parse_fields, product_rows
+from database import get_async_db
+from models import Product
+from tenants import TenantConfig, get_tenant
+from text_match import fold_text
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Palavras consideradas por busca (o resto é ignorado)
+MAX_TERMS = 8
+# Resultados ranqueados por busca, por grupo (ver SQLITE_SEARCH)
+RANK_CANDIDATES = 200
+
+# SQLite: índice FTS5 "external content" sobre products, mantido por triggers.
+# unicode61 remove_diacritics 2 indexa "Guaraná" como "guarana"; prefix='1 2 3'
+# guarda os prefixos curtos prontos para a busca enquanto o cliente digita.
+SQLITE_TRIGGERS = {
+    "products_fts_ai": """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts (rowid, name, description, sub_category)
+            VALUES (new.id, new.name, new.description, new.sub_category);
+        END""",
+    "products_fts_ad": """
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, sub_category)
+            VALUES ('delete', old.id, old.name, old.description, old.sub_category);
+        END""",
+    "products_fts_au": """
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, sub_category ON products BEGIN
+            INSERT INTO products_fts (products_fts, rowid, name, description, sub_category)
+            VALUES ('delete', old.id, old.name, old.description, old.sub_category);
+            INSERT INTO products_fts (rowid, name, description, sub_category)
+            VALUES (new.id, new.name, new.description, new.sub_category);
+        END""",
+}
+SQLITE_FTS_TABLE = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, sub_category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )"""
+# Peso de cada coluna no bm25 (mesma ordem da tabela): nome > sub-categoria > descrição.
+# O bm25 é calculado linha a linha: ranquear uma busca ampla ("produto", "des")
+# que casa com 10 mil produtos custa 20-30 ms. Só recebem bm25 os primeiros
+# :candidates produtos que casam pelo nome (o peso maior) mais os primeiros
+# :candidates que casam em qualquer coluna. Com até :candidates resultados (as
+# buscas específicas, as que precisam de ordem) todos são ranqueados; numa busca
+# ampla os que casam pelo nome têm prioridade sobre os que casam só na descrição.
+# Os candidatos já vêm filtrados pelo restaurante (o índice é do banco inteiro).
+# CROSS JOIN fixa o FTS como tabela externa e o "+" em +rowid impede que o FTS
+# refaça o MATCH para cada id da lista (centenas de ms).
+SQLITE_SEARCH = text("""
+    SELECT rowid AS id
+    FROM products_fts
+    WHERE products_fts MATCH :query AND +rowid IN (
+        SELECT id FROM (
+            SELECT products_fts.rowid AS id
+            FROM products_fts CROSS JOIN products ON products.id = products_fts.rowid
+            WHERE products_fts MATCH :name_query AND products.tenant_id = :tenant
+            LIMIT :candidates
+        )
+        UNION
+        SELECT id FROM (
+            SELECT products_fts.rowid AS id
+            FROM products_fts CROSS JOIN products ON products.id = products_fts.rowid
+            WHERE products_fts MATCH :query AND products.tenant_id = :tenant
+            LIMIT :candidates
+        )
+    )
+    ORDER BY bm25(products_fts, 10.0, 1.0, 4.0), rowid
+    LIMIT :limit
+""")
+
+# Postgres: índices de expressão, atualizados pelo próprio banco em qualquer
+# escrita (ORM, menu.py, SQL manual), sem coluna nem trigger para manter.
+# unaccent não é IMMUTABLE: search_fold fixa o dicionário para poder ser indexado.
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION search_fold(value text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, value)) $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION product_search_vector(name text, description text, sub_category text) RETURNS tsvector
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$
+        SELECT setweight(to_tsvector('simple', coalesce(search_fold(name), '')), 'A')
+            || setweight(to_tsvector('simple', coalesce(search_fold(sub_category), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(search_fold(description), '')), 'C')
+    $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_products_search
+    ON products USING gin (product_search_vector(name, description, sub_category))
+    """,
+    # Trigramas do nome: encontra "guarana antartica" escrito com erro ("guarana antartca")
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (search_fold(name) gin_trgm_ops)",
+]
+# Mesmos grupos de candidatos do SQLite: ":*A" casa só com o peso A (o nome)
+POSTGRES_SEARCH = text("""
+    SELECT id
+    FROM products
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id FROM products
+            WHERE tenant_id = :tenant
+              AND product_search_vector(name, description, sub_category) @@ to_tsquery('simple', :name_query)
+            LIMIT :candidates
+        ) AS name_matches
+        UNION
+        SELECT id FROM (
+            SELECT id FROM products
+            WHERE tenant_id = :tenant
+              AND (product_search_vector(name, description, sub_category) @@ to_tsquery('simple', :query)
+                   OR search_fold(name) % :text)
+            LIMIT :candidates
+        ) AS matches
+    )
+    ORDER BY ts_rank(product_search_vector(name, description, sub_category), to_tsquery('simple', :query))
+             + similarity(search_fold(name), :text) DESC,
+             id
+    LIMIT :limit
+""")
+
+
+def ensure_search_index(conn, rebuild: bool = False) -> None:
+    """Cria o índice de busca se faltar (idempotente, roda no startup).
+
+    No SQLite, triggers ausentes (banco antigo ou tabela products recriada)
+    significam que o índice pode estar desatualizado: ele é reconstruído.
+    """
+    if conn.dialect.name == "postgresql":
+        for statement in POSTGRES_DDL:
+            conn.execute(text(statement))
+        return
+
+    existing = set(inspect(conn).get_table_names())
+    triggers = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'")).scalars())
+    conn.execute(text(SQLITE_FTS_TABLE))
+    missing = [name for name in SQLITE_TRIGGERS if name not in triggers]
+    for name in missing:
+        conn.execute(text(SQLITE_TRIGGERS[name]))
+    if rebuild or missing or "products_fts" not in existing:
+        conn.execute(text("INSERT INTO products_fts (products_fts) VALUES ('rebuild')"))
+
+
+def search_terms(q: str) -> List[str]:
+    # fold_text deixa só [0-9a-z] e espaços: nenhum operador do FTS5/tsquery passa
+    return fold_text(q).split()[:MAX_TERMS]
+
+
+async def search_product_ids(db: AsyncSession, tenant_id: int, terms: List[str], limit: int) -> List[int]:
+    """Ids em ordem de relevância; todas as palavras precisam aparecer (como prefixo)."""
+    if db.get_bind().dialect.name == "postgresql":
+        query = " & ".join(f"{term}:*" for term in terms)
+        name_query = " & ".join(f"{term}:*A" for term in terms)
+        params = {
+            "query": query, "name_query": name_query, "text": " ".join(terms),
+            "tenant": tenant_id, "candidates": RANK_CANDIDATES, "limit": limit,
+        }
+        result = await db.execute(POSTGRES_SEARCH, params)
+    else:
+        query = " ".join(f'"{term}"*' for term in terms)
+        params = {
+            "query": query, "name_query": f"name : ({query})",
+            "tenant": tenant_id, "candidates": RANK_CANDIDATES, "limit": limit,
+        }
+        result = await db.execute(SQLITE_SEARCH, params)
+    return list(result.scalars())
+
+
+@router.get("")
+async def search_products(
+    q: str = "",
+    limit: int = DEFAULT_LIMIT,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    tenant: TenantConfig = Depends(get_tenant),
+):
+    names = parse_fields(fields)
+    limit = max(1, min(limit, MAX_LIMIT))
+    terms = search_terms(q)
+    if not terms:
+        return JSONBytes(dump_json({"items": []}))
+
+    ids = await search_product_ids(db, tenant.id, terms, limit)
+    if not ids:
+        return JSONBytes(dump_json({"items": []}))
+    # Mesmos campos de /api/products, na ordem de relevância
+    rows = {product_id: item for product_id, _, item in await product_rows(db, tenant.id, names, [Product.id.in_(ids)])}
+    return JSONBytes(dump_json({"items": [rows[i] for i in ids if i in rows]}))
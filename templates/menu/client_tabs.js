@@ -0,0 +1,91 @@
+// Modo de abas no cliente: cada card existe uma única vez no HTML e as abas/filtros
+            // mostram ou escondem cards a partir do índice embutido (#menu-index)
+            const MENU_INDEX = JSON.parse(document.getElementById('menu-index').textContent);
+            // Página aberta por link direto (?cat=&sub=): só essa fatia do cardápio está no HTML
+            const MENU_SLICE = MENU_INDEX.slice;
+            let currentTab = MENU_SLICE ? MENU_SLICE.cat : 'all';
+            let currentSubCat = MENU_SLICE && MENU_SLICE.sub ? MENU_SLICE.sub : 'all';
+            let visibleIds = null; // null = todos os cards visíveis
+
+            function menuFilterIds() {
+                let ids = currentTab === 'all' ? null : new Set(MENU_INDEX.cats[currentTab] || []);
+                if (currentSubCat !== 'all') {
+                    const sub = MENU_INDEX.subs[currentSubCat] || [];
+                    ids = new Set(ids ? sub.filter(id => ids.has(id)) : sub);
+                }
+                return ids;
+            }
+
+            function menuUrl(tab, subCat) {
+                if (tab === 'all') return '{{ base_path }}/';
+                return '{{ base_path }}/?cat=' + encodeURIComponent(tab) + (subCat === 'all' ? '' : '&sub=' + encodeURIComponent(subCat));
+            }
+
+            // Fora da fatia carregada os cards não estão na página: abre a URL correspondente
+            function outsideSlice(tab, subCat) {
+                if (!MENU_SLICE) return false;
+                return tab !== MENU_SLICE.cat || (MENU_SLICE.sub !== null && subCat !== MENU_SLICE.sub);
+            }
+
+            function setCardVisible(id, isVisible) {
+                const card = document.getElementById('product-card-' + id);
+                if (card) card.style.display = isVisible ? '' : 'none';
+            }
+
+            function applyMenuFilter() {
+                const next = menuFilterIds();
+                // Entre dois filtros só toca nos cards cuja visibilidade muda
+                if (visibleIds === null && next === null) {
+                    return;
+                } else if (visibleIds === null || next === null) {
+                    document.querySelectorAll('.product-card').forEach(c => {
+                        c.style.display = next === null ? '' : 'none';
+                    });
+                    if (next !== null) next.forEach(id => setCardVisible(id, true));
+                } else {
+                    visibleIds.forEach(id => { if (!next.has(id)) setCardVisible(id, false); });
+                    next.forEach(id => { if (!visibleIds.has(id)) setCardVisible(id, true); });
+                }
+                visibleIds = next;
+                if (window.ScrollTrigger) ScrollTrigger.refresh();
+            }
+
+            function switchTab(id) {
+                id = String(id);
+                if (outsideSlice(id, 'all')) {
+                    location.href = menuUrl(id, 'all');
+                    return;
+                }
+                const btns = document.querySelectorAll('.tab-btn');
+                btns.forEach(el => {
+                    el.classList.remove('bg-brand-orange', 'text-white', 'shadow-[0_5px_15px_rgba(255,107,0,0.2)]');
+                    el.classList.add('text-neutral-400', 'hover:bg-brand-orange/10', 'hover:text-brand-orange');
+                });
+
+                const activeBtn = document.getElementById('tab-btn-' + id);
+                if (activeBtn) {
+                    activeBtn.classList.add('bg-brand-orange', 'text-white', 'shadow-[0_5px_15px_rgba(255,107,0,0.2)]');
+                    activeBtn.classList.remove('text-neutral-400', 'hover:bg-brand-orange/10', 'hover:text-brand-orange');
+                }
+
+                document.querySelectorAll('.subcat-bar').forEach(bar => {
+                    bar.style.display = bar.id === 'subcat-bar-' + id ? '' : 'none';
+                });
+
+                currentTab = id;
+                filterSubCat('all');
+            }
+
+            function filterSubCat(s) {
+                if (outsideSlice(currentTab, s)) {
+                    location.href = menuUrl(currentTab, s);
+                    return;
+                }
+                document.querySelectorAll('.subcat-btn').forEach(b => {
+                    if (b.dataset.subcat === s) b.classList.add('bg-brand-orange', 'text-white');
+                    else b.classList.remove('bg-brand-orange', 'text-white');
+                });
+
+                currentSubCat = s;
+                applyMenuFilter();
+            }
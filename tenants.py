@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from starlette.responses import PlainTextResponse, RedirectResponse
+
+from database import AsyncSessionLocal
+from models import DEFAULT_TENANT_ID, Tenant
+
+logger = logging.getLogger(__name__)
+
+# Um processo e um pool de conexões atendem vários restaurantes. O restaurante
+# da requisição vem do prefixo /t/<slug>/ ou, sem prefixo, do cabeçalho Host
+# (domínio próprio); sem nenhum dos dois, do restaurante DEFAULT_TENANT.
+TENANT_PATH_PREFIX = "/t/"
+SLUG_PATTERN = re.compile(r"^[a-z0-9][a-z0-9-]{0,62}$")
+DEFAULT_TENANT_SLUG = "default"
+# Vazio: Host desconhecido recebe 404 em vez do restaurante padrão
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", DEFAULT_TENANT_SLUG)
+# Restaurantes novos ou alterados em outro processo aparecem em no máximo isso
+# (menu.py tenant avisa os workers pelo barramento na hora)
+TENANT_CACHE_SECONDS = float(os.getenv("TENANT_CACHE_SECONDS", "30"))
+# Rotas do processo, não de um restaurante: não resolvem tenant
+SHARED_PATHS = ("/static/", "/metrics", "/admin/pool", "/docs", "/redoc", "/openapi.json")
+
+# Página do template original: restaurantes sem branding ficam exatamente assim
+DEFAULT_BRANDING = {
+    "tagline": "Cardápio Digital",
+    "hero_subtitle": "Qualidade e sabor em cada detalhe.",
+    "hero_image": "https://images.unsplash.com/photo-1594041680534-e8c8cdebd679?auto=format&fit=crop&q=80&w=2000",
+    "address": ["Rua x, 000", "Cidade x"],
+    "hours": ["Segunda a Sábado", "17:30 às 22:30"],
+    "contact": "xxxx-xxxx",
+    "brand_color": "#FF6B00",
+    "brand_color_light": "#FFF0E6",
+}
+# Linhas separadas por <br/> na página
+MULTILINE_KEYS = ("address", "hours")
+# Entram em CSS/JS sem escape: só cores hexadecimais
+COLOR_KEYS = ("brand_color", "brand_color_light")
+COLOR_PATTERN = re.compile(r"^#[0-9A-Fa-f]{3,8}$")
+
+
+def merge_branding(slug: str, name: str, branding: Optional[dict]) -> dict:
+    """Branding do banco sobre o padrão; chaves desconhecidas ou valores inválidos são ignorados."""
+    merged = dict(DEFAULT_BRANDING, name=name)
+    for key, value in (branding or {}).items():
+        if key not in DEFAULT_BRANDING or value is None:
+            logger.warning(f"Branding de '{slug}': chave desconhecida ignorada: {key}")
+            continue
+        if key in MULTILINE_KEYS:
+            value = value.splitlines() if isinstance(value, str) else [str(line) for line in value]
+        elif key in COLOR_KEYS and not COLOR_PATTERN.match(str(value)):
+            logger.warning(f"Branding de '{slug}': cor inválida em {key}: {value!r}")
+            continue
+        else:
+            value = str(value)
+        merged[key] = value
+    return merged
+
+
+class TenantConfig:
+    """Restaurante já carregado: compartilhado por todas as requisições dele."""
+
+    __slots__ = ("id", "slug", "name", "host", "branding")
+
+    def __init__(self, id: int, slug: str, name: str, host: Optional[str] = None, branding: Optional[dict] = None):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.host = host
+        self.branding = merge_branding(slug, name, branding)
+
+
+# Usado fora de uma requisição (benchmarks, scripts) e em bancos sem a tabela tenants
+DEFAULT_TENANT_CONFIG = TenantConfig(DEFAULT_TENANT_ID, DEFAULT_TENANT_SLUG, "Sua Empresa")
+
+
+def normalize_host(host: str) -> str:
+    host = host.strip().lower()
+    # Remove a porta (inclusive de "[::1]:8000")
+    if host.startswith("["):
+        return host[: host.find("]") + 1]
+    return host.split(":", 1)[0]
+
+
+def ensure_default_tenant(conn) -> None:
+    """Cria o restaurante padrão (id 1), dono dos dados anteriores aos tenants. Idempotente."""
+    dialect_insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    result = conn.execute(
+        dialect_insert(Tenant)
+        .values(id=DEFAULT_TENANT_ID, slug=DEFAULT_TENANT_SLUG, name=DEFAULT_TENANT_CONFIG.name)
+        .on_conflict_do_nothing()
+    )
+    if result.rowcount and conn.dialect.name == "postgresql":
+        # Id explícito não avança a sequência: o próximo restaurante receberia o 1
+        conn.execute(text("SELECT setval(pg_get_serial_sequence('tenants', 'id'), (SELECT max(id) FROM tenants))"))
+
+
+class TenantRegistry:
+    """Todos os restaurantes em memória, por slug e por host, recarregados a cada TENANT_CACHE_SECONDS.
+
+    Centenas de restaurantes cabem numa consulta: nenhuma requisição vai ao banco
+    só para descobrir de quem é.
+    """
+
+    def __init__(self, ttl: float = TENANT_CACHE_SECONDS):
+        self.ttl = ttl
+        self._by_slug: Dict[str, TenantConfig] = {}
+        self._by_host: Dict[str, TenantConfig] = {}
+        # Horário da última carga bem-sucedida; None = nunca carregou ou foi invalidado
+        self._loaded_at: Optional[float] = None
+        # Carga em andamento, compartilhada por todas as requisições que chegarem durante ela
+        self._loading: Optional[asyncio.Task] = None
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    async def _load(self) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                tenants = [
+                    TenantConfig(t.id, t.slug, t.name, t.host, t.branding)
+                    for t in (await db.execute(select(Tenant))).scalars()
+                ]
+        except Exception as e:
+            logger.error(f"Não foi possível carregar os restaurantes: {e}")
+            return
+        self._by_slug = {t.slug: t for t in tenants}
+        self._by_host = {normalize_host(t.host): t for t in tenants if t.host}
+        self._loaded_at = time.monotonic()
+
+    async def _fresh(self) -> None:
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.ttl:
+            return
+        loop = asyncio.get_running_loop()
+        # Uma carga por vez (a de outro event loop, ex.: benchmarks com asyncio.run, não serve)
+        if self._loading is None or self._loading.done() or self._loading.get_loop() is not loop:
+            self._loading = loop.create_task(self._load())
+        # Lista expirada, mas carregada: responde com ela enquanto a nova carga roda.
+        # Sem lista válida (partida a frio, invalidate) todos esperam a mesma carga;
+        # shield: uma requisição cancelada não cancela a carga das outras
+        if self._loaded_at is None:
+            await asyncio.shield(self._loading)
+
+    async def by_slug(self, slug: str) -> Optional[TenantConfig]:
+        await self._fresh()
+        return self._by_slug.get(slug)
+
+    async def by_host(self, host: str) -> Optional[TenantConfig]:
+        await self._fresh()
+        return self._by_host.get(normalize_host(host))
+
+
+registry = TenantRegistry()
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class TenantMiddleware:
+    """Resolve o restaurante de cada requisição e o guarda no estado dela.
+
+    Com o prefixo /t/<slug>, o prefixo passa para o root_path: as rotas continuam
+    as mesmas ("/", "/api/menu", ...) e os links da página recebem o prefixo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket") or scope["path"].startswith(SHARED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        path = scope["path"][len(root_path):] if scope["path"].startswith(root_path) else scope["path"]
+        base_path = ""
+        if path.startswith(TENANT_PATH_PREFIX):
+            slug = path[len(TENANT_PATH_PREFIX):].split("/", 1)[0]
+            tenant = await registry.by_slug(slug)
+            base_path = TENANT_PATH_PREFIX + slug
+            if tenant is not None and path == base_path:
+                # "/t/slug" -> "/t/slug/": sem a barra a rota "/" não casa
+                query = scope["query_string"].decode("latin-1")
+                location = root_path + base_path + "/" + (f"?{query}" if query else "")
+                await RedirectResponse(location, status_code=307)(scope, receive, send)
+                return
+        else:
+            tenant = await registry.by_host(_header(scope, b"host"))
+            if tenant is None and DEFAULT_TENANT:
+                tenant = await registry.by_slug(DEFAULT_TENANT)
+
+        if tenant is None:
+            await PlainTextResponse("Restaurante não encontrado", status_code=404)(scope, receive, send)
+            return
+        # Alterado no próprio scope: os middlewares de fora (métricas) veem a rota casada
+        scope["root_path"] = root_path + base_path
+        state = scope.setdefault("state", {})
+        state["tenant"] = tenant
+        state["tenant_base_path"] = base_path
+        await self.app(scope, receive, send)
+
+
+def get_tenant(request: Request) -> TenantConfig:
+    """Dependência das rotas: restaurante resolvido pelo TenantMiddleware."""
+    tenant = request.scope.get("state", {}).get("tenant")
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return tenant
+
+
+def tenant_base_path(request: Request) -> str:
+    """Prefixo dos links da página ("" no domínio próprio, "/t/<slug>" no caminho)."""
+    return request.scope.get("state", {}).get("tenant_base_path", "")
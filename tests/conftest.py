@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+# database.py lê DATABASE_URL no import: o banco temporário precisa vir antes de qualquer módulo do app
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+_fd, DB_PATH = tempfile.mkstemp(prefix="tests-", suffix=".db")
+os.close(_fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ["MENU_VERSION_FILE"] = DB_PATH + ".version"
+os.environ["EVENT_BUS"] = "memory"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    for suffix in ("", "-wal", "-shm", ".version"):
+        if os.path.exists(DB_PATH + suffix):
+            os.remove(DB_PATH + suffix)
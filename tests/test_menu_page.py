@@ -0,0 +1,119 @@
+"""Página do cardápio nos dois modos de abas: mesmos produtos, mesmos cards, seções certas."""
+import asyncio
+import json
+import logging
+import re
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from benchmarks.common import seed_catalog
+
+CARD_ID = re.compile(r'<div id="product-card-(\d+)"')
+SECTION = re.compile(r'<div id="tab-content-([^"]+)" class="tab-content')
+MENU_INDEX = re.compile(r'<script type="application/json" id="menu-index">(.*?)</script>', re.S)
+
+
+def render_root(tab_mode: str) -> str:
+    import menu_cache
+    import menu_page
+    from database import async_engine, async_write_engine
+    from main import app
+
+    async def run():
+        # Conexões abertas antes do seed ainda veem o esquema anterior
+        await async_engine.dispose()
+        await async_write_engine.dispose()
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get("/")
+                response.raise_for_status()
+                return response.text
+
+    previous = menu_page.TAB_MODE
+    menu_page.TAB_MODE = tab_mode
+    # A página em cache é a do outro modo
+    menu_cache.bump_menu_version()
+    try:
+        return asyncio.run(run())
+    finally:
+        menu_page.TAB_MODE = previous
+
+
+def sections(html: str) -> dict:
+    """id da aba -> ids dos cards dentro dela, na ordem da página."""
+    starts = [(m.group(1), m.start()) for m in SECTION.finditer(html)]
+    # A última aba vai até o fim da página (depois dela não há mais cards)
+    ends = [start for _, start in starts[1:]] + [len(html)]
+    return {
+        tab: [int(i) for i in CARD_ID.findall(html, start, end)]
+        for (tab, start), end in zip(starts, ends)
+    }
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    from database import engine
+    from models import Category, Product
+
+    seed_catalog(40)
+    with engine.connect() as conn:
+        categories = dict(conn.execute(select(Category.id, Category.name)).all())
+        products = conn.execute(select(Product).order_by(Product.id)).all()
+    return categories, products
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_server_mode_has_one_section_per_category(catalog):
+    categories, products = catalog
+    html = render_root("server")
+    found = sections(html)
+
+    assert MENU_INDEX.search(html) is None
+    assert list(found)[0] == "all"
+    assert sorted(found["all"]) == [p.id for p in products]
+    assert set(found) == {"all"} | {str(cat_id) for cat_id in categories}
+    for cat_id in categories:
+        expected = [pid for pid in found["all"] if next(p for p in products if p.id == pid).category_id == cat_id]
+        assert found[str(cat_id)] == expected
+
+
+def test_server_mode_card_markup(catalog):
+    categories, products = catalog
+    html = render_root("server")
+    for product in products:
+        cards = re.findall(
+            rf'<div id="product-card-{product.id}".*?<h4[^>]*>([^<]*)</h4>', html, re.S
+        )
+        # Uma vez em "Todos" e outra na aba da categoria, com o mesmo HTML
+        assert cards == [product.name, product.name]
+        start = html.index(f'<div id="product-card-{product.id}"')
+        card = html[start:html.index("</h4>", start)]
+        assert f'data-subcat="{product.sub_category or ""}"' in card
+        assert f">{categories[product.category_id]}</span>" in card
+        assert f"R$ {product.price:.2f}</span>" in card
+        assert ("opacity-50 grayscale select-none" in card) is (not product.is_available)
+        if product.image_url:
+            assert f'alt="{product.name}"' in card
+        else:
+            assert "FOTO DO SEU PRODUTO" in card
+
+
+def test_client_mode_lists_the_same_products(catalog):
+    categories, products = catalog
+    server = sections(render_root("server"))
+    client_html = render_root("client")
+    client = sections(client_html)
+
+    # Um único bloco de cards; as abas vêm do índice JSON
+    assert list(client) == ["all"]
+    assert client["all"] == server["all"]
+    index = json.loads(MENU_INDEX.search(client_html).group(1))
+    assert index["cats"] == {str(cat_id): server[str(cat_id)] for cat_id in categories}
@@ -0,0 +1,56 @@
+"""A página do cardápio faz o mesmo número de consultas com 5 ou 500 produtos (sem N+1)."""
+import asyncio
+import logging
+
+import httpx
+import pytest
+from sqlalchemy import event
+
+from benchmarks.common import seed_catalog
+
+
+def count_root_queries(n_products: int) -> int:
+    import menu_cache
+    from database import async_engine, async_write_engine
+    from main import app
+
+    seed_catalog(n_products)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def run():
+        # Conexões abertas antes do seed ainda veem o esquema anterior
+        await async_engine.dispose()
+        await async_write_engine.dispose()
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                # Primeira requisição carrega os restaurantes; a medida é a de uma página nova
+                (await client.get("/")).raise_for_status()
+                menu_cache.bump_menu_version()
+                event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+                try:
+                    response = await client.get("/")
+                finally:
+                    event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+                response.raise_for_status()
+                assert response.text.count('class="product-card ') == n_products
+
+    asyncio.run(run())
+    return len(statements)
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_root_query_count_does_not_grow_with_catalog():
+    small = count_root_queries(5)
+    large = count_root_queries(500)
+    # categorias, sub-categorias e produtos (0 seria um acerto de cache: a página não foi gerada)
+    assert small == large
+    assert 0 < small <= 3
@@ -0,0 +1,155 @@
+"""Pedidos: Idempotency-Key, validação dos itens, transições de status e o cursor change_seq."""
+import asyncio
+import logging
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from benchmarks.common import seed_catalog
+
+
+def run_with_client(scenario):
+    """Roda scenario(client, products) num cardápio novo; products: id -> disponível."""
+    from database import async_engine, async_write_engine, engine
+    from main import app
+    from models import Product
+
+    seed_catalog(20)
+    with engine.connect() as conn:
+        products = dict(conn.execute(select(Product.id, Product.is_available)).all())
+
+    async def run():
+        # Conexões abertas antes do seed ainda veem o esquema anterior
+        await async_engine.dispose()
+        await async_write_engine.dispose()
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await scenario(client, products)
+
+    return asyncio.run(run())
+
+
+def change_seqs() -> dict:
+    from database import engine
+    from models import Order
+
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Order.id, Order.change_seq)).all())
+
+
+def order_payload(*product_ids, quantity=1) -> dict:
+    return {
+        "customer_name": "Cliente",
+        "customer_phone": "0000-0000",
+        "items": [{"product_id": pid, "quantity": quantity} for pid in product_ids],
+    }
+
+
+def available(products: dict) -> int:
+    return next(pid for pid, is_available in products.items() if is_available)
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def test_same_idempotency_key_returns_the_same_order():
+    async def scenario(client, products):
+        payload = order_payload(available(products), quantity=2)
+        headers = {"Idempotency-Key": "pedido-1"}
+        first = await client.post("/api/orders", json=payload, headers=headers)
+        again = await client.post("/api/orders", json=payload, headers=headers)
+        other = await client.post("/api/orders", json=payload, headers={"Idempotency-Key": "pedido-2"})
+        return first, again, other
+
+    first, again, other = run_with_client(scenario)
+    assert first.status_code == 201
+    assert again.status_code == 200
+    assert again.json() == first.json()
+    assert other.status_code == 201
+    assert other.json()["id"] != first.json()["id"]
+    assert len(change_seqs()) == 2
+
+
+def test_concurrent_requests_with_the_same_key_create_one_order():
+    async def scenario(client, products):
+        payload = order_payload(available(products))
+        headers = {"Idempotency-Key": "toque-duplo"}
+        return await asyncio.gather(*(client.post("/api/orders", json=payload, headers=headers) for _ in range(5)))
+
+    responses = run_with_client(scenario)
+    assert sorted(r.status_code for r in responses) == [200, 200, 200, 200, 201]
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert len(change_seqs()) == 1
+
+
+def test_unknown_or_unavailable_product_is_rejected():
+    async def scenario(client, products):
+        unavailable = next(pid for pid, is_available in products.items() if not is_available)
+        unknown = max(products) + 1
+        return (
+            await client.post("/api/orders", json=order_payload(available(products), unknown)),
+            await client.post("/api/orders", json=order_payload(available(products), unavailable)),
+            unknown,
+            unavailable,
+        )
+
+    missing, sold_out, unknown, unavailable = run_with_client(scenario)
+    assert missing.status_code == 404
+    assert missing.json()["detail"] == {"error": "product_not_found", "product_ids": [unknown]}
+    assert sold_out.status_code == 409
+    assert sold_out.json()["detail"] == {"error": "product_unavailable", "product_ids": [unavailable]}
+    assert change_seqs() == {}
+
+
+def test_changed_price_is_rejected():
+    async def scenario(client, products):
+        payload = order_payload(available(products))
+        payload["items"][0]["unit_price"] = 0.01
+        return await client.post("/api/orders", json=payload)
+
+    response = run_with_client(scenario)
+    assert response.status_code == 409
+    assert response.json()["detail"]["error"] == "price_changed"
+
+
+def test_illegal_status_transition_is_rejected():
+    async def scenario(client, products):
+        order_id = (await client.post("/api/orders", json=order_payload(available(products)))).json()["id"]
+        url = f"/api/orders/{order_id}/status"
+        return [
+            (await client.post(url, json={"status": status})).status_code
+            for status in ("Pronto", "Preparando", "Pronto", "Pendente", "Cancelado")
+        ] + [(await client.post("/api/orders/999999/status", json={"status": "Pronto"})).status_code]
+
+    # Pular etapas é permitido; voltar, repetir o status atual ou status desconhecido não
+    assert run_with_client(scenario) == [200, 409, 409, 409, 422, 404]
+
+
+def test_change_seq_increases_with_every_change():
+    seen = []
+
+    async def scenario(client, products):
+        ids = []
+        for _ in range(3):
+            ids.append((await client.post("/api/orders", json=order_payload(available(products)))).json()["id"])
+            seen.append(max(change_seqs().values()))
+        for status in ("Preparando", "Pronto"):
+            (await client.post(f"/api/orders/{ids[0]}/status", json={"status": status})).raise_for_status()
+            seen.append(change_seqs()[ids[0]])
+        # Transição recusada não consome número
+        assert (await client.post(f"/api/orders/{ids[0]}/status", json={"status": "Pendente"})).status_code == 409
+        seen.append(max(change_seqs().values()))
+        return ids
+
+    ids = run_with_client(scenario)
+    assert seen[:-1] == list(range(seen[0], seen[0] + 5))
+    assert seen[-1] == seen[-2]
+    # Cada pedido tem o seu número: o mais recente alterado é o maior
+    seqs = change_seqs()
+    assert len(set(seqs.values())) == len(ids)
+    assert seqs[ids[0]] == max(seqs.values())
@@ -0,0 +1,85 @@
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Candidatos avaliados por busca, escolhidos pelo número de trigramas em comum
+CANDIDATES = 50
+# Trigramas em mais que esta fração das chaves não são usados para achar candidatos
+COMMON_FRACTION = 0.05
+COMMON_MIN = 50
+
+
+def fold_text(text: str) -> str:
+    """Minúsculas, sem acentos e só letras/números separados por um espaço.
+
+    "Guaraná Antártica 1L" -> "guarana antartica 1l". NFKD também iguala nomes
+    de arquivo gravados em NFD (macOS) aos nomes do banco em NFC.
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", ascii_text.lower()).strip()
+
+
+def trigrams(folded: str) -> Set[str]:
+    """Trigramas de cada palavra com as bordas marcadas (como o pg_trgm)."""
+    grams = set()
+    for word in folded.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Índice invertido trigrama -> chaves, para busca aproximada de nomes.
+
+    Cada consulta só olha as chaves que compartilham algum trigrama com ela,
+    então o custo acompanha o número de candidatos e não o tamanho do catálogo.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, List[Hashable]] = defaultdict(list)
+        self._grams: Dict[Hashable, Set[str]] = {}
+
+    def add(self, key: Hashable, text: str) -> None:
+        grams = trigrams(fold_text(text))
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings[gram].append(key)
+
+    def search(self, text: str, limit: int = 3) -> List[Tuple[float, Hashable]]:
+        """Melhores (score, chave), score entre 0 e 1, em ordem decrescente.
+
+        score = média entre o Dice dos trigramas (nomes parecidos no todo) e a
+        fração do menor dos dois contida no outro ("romeu" -> "Romeu e
+        Julieta", "queijo coalho" -> "Queijo"); o Dice desempata a favor do
+        nome exato.
+        """
+        grams = trigrams(fold_text(text))
+        if not grams:
+            return []
+        # Trigramas presentes em boa parte do catálogo ("350ml", "refrigerante")
+        # não ajudam a escolher candidatos e dominariam o custo: ficam de fora da
+        # contagem, mas entram no score exato abaixo
+        common = max(COMMON_MIN, len(self._grams) * COMMON_FRACTION)
+        selective = [g for g in grams if len(self._postings.get(g, ())) <= common] or list(grams)
+        # Counter.update conta a lista de postings inteira em C
+        shared: Counter = Counter()
+        for gram in selective:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for key, _ in shared.most_common(CANDIDATES):
+            n = len(grams & self._grams[key])
+            score = 0.5 * (2 * n / (len(grams) + len(self._grams[key]))) + 0.5 * (n / min(len(grams), len(self._grams[key])))
+            scored.append((score, key))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+
+def build_index(items: Iterable[Tuple[Hashable, str]]) -> TrigramIndex:
+    index = TrigramIndex()
+    for key, text in items:
+        index.add(key, text)
+    return index